@@ -0,0 +1,60 @@
+"""Cost of checkpointing one cycle: log append vs full atomic rewrite.
+
+    python benchmarks/bench_checkpoint.py --tenants 1000 --cycles 5000
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from checkpoint import CheckpointStore  # noqa: E402
+
+
+def full_rewrite(path, state):
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as file:
+        json.dump(state, file)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp_path, path)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--tenants', type=int, default=1000)
+    parser.add_argument('--cycles', type=int, default=5000)
+    args = parser.parse_args()
+    tokens = [f'token-{i}' for i in range(args.tenants)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = CheckpointStore(os.path.join(directory, 'checkpoint.log'))
+        for token in tokens:
+            store.save_date(token, 0)
+            store.save_status(token, '1', 'reviewing')
+        start = time.perf_counter()
+        for cycle in range(1, args.cycles + 1):
+            store.save_date(tokens[cycle % args.tenants], cycle)
+        append = (time.perf_counter() - start) / args.cycles
+        store.close()
+
+        state = {
+            'dates': dict(store.dates), 'statuses': dict(store.statuses)
+        }
+        path = os.path.join(directory, 'state.json')
+        rewrites = max(1, args.cycles // 50)
+        start = time.perf_counter()
+        for cycle in range(rewrites):
+            state['dates'][tokens[0]] = cycle
+            full_rewrite(path, state)
+        rewrite = (time.perf_counter() - start) / rewrites
+
+    print(f'log append:   {append * 1e6:10.1f} us/cycle')
+    print(f'full rewrite: {rewrite * 1e6:10.1f} us/cycle')
+
+
+if __name__ == '__main__':
+    main()
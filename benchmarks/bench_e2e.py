@@ -0,0 +1,119 @@
+"""End-to-end load benchmark against the local fake servers.
+
+Scripts random status changes in the fake Practicum API while the
+engine polls every tenant, and reports status change -> message
+delivered latency, polls per second and traced memory per tenant.
+
+    python benchmarks/bench_e2e.py --tenants 500 --duration 20
+"""
+import argparse
+import asyncio
+import os
+import random
+import re
+import sys
+import time
+import tracemalloc
+
+import telegram
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import homework  # noqa: E402
+from engine import PollingEngine, Subscription  # noqa: E402
+from ratelimit import RateLimiter  # noqa: E402
+from scheduler import AdaptiveSchedule  # noqa: E402
+from tests.fake_servers import FakePracticum, FakeTelegram  # noqa: E402
+
+NAME = re.compile(r'работы "([^"]+)"')
+
+
+def percentile(values, share):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(share * len(values)))]
+
+
+async def script_changes(practicum, tokens, count, duration, changed_at):
+    statuses = ('reviewing', 'approved', 'rejected')
+    for number in range(count):
+        token = random.choice(tokens)
+        name = f'{token}-hw{number}'
+        changed_at[name] = practicum.set_status(
+            token, name, random.choice(statuses)
+        )
+        await asyncio.sleep(duration / count)
+
+
+async def run(engine, practicum, tokens, args, changed_at):
+    engine_task = asyncio.ensure_future(engine.run_forever())
+    await script_changes(
+        practicum, tokens, args.changes, args.duration, changed_at
+    )
+    await asyncio.sleep(args.interval * 3)
+    engine_task.cancel()
+    await asyncio.gather(engine_task, return_exceptions=True)
+    await engine.outbox.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--tenants', type=int, default=200)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--changes', type=int, default=200)
+    parser.add_argument('--interval', type=float, default=0.5)
+    parser.add_argument('--concurrency', type=int, default=20)
+    parser.add_argument('--practicum-latency', type=float, default=0.0)
+    parser.add_argument('--telegram-latency', type=float, default=0.0)
+    args = parser.parse_args()
+    homework.logger.disabled = True
+
+    practicum = FakePracticum(latency=args.practicum_latency).start()
+    telegram_api = FakeTelegram(latency=args.telegram_latency).start()
+    homework.ENDPOINT = practicum.endpoint
+    tokens = [f'token-{number}' for number in range(args.tenants)]
+    for token in tokens:
+        practicum.add_token(token)
+
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    bot = telegram.Bot(token='123:fake', base_url=telegram_api.base_url)
+    engine = PollingEngine(
+        bot,
+        [Subscription(token, (str(number),))
+         for number, token in enumerate(tokens)],
+        concurrency=args.concurrency,
+    )
+    engine.outbox.limiter = RateLimiter(global_rate=10 ** 6, chat_rate=10 ** 6)
+    for tenant in engine.tenants:
+        tenant.schedule = AdaptiveSchedule(
+            base=args.interval, min_interval=args.interval,
+            max_interval=args.interval,
+        )
+
+    changed_at = {}
+    started = time.perf_counter()
+    asyncio.run(run(engine, practicum, tokens, args, changed_at))
+    elapsed = time.perf_counter() - started
+    memory = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    practicum.stop()
+    telegram_api.stop()
+
+    latencies = []
+    for message in telegram_api.messages:
+        for name in NAME.findall(message.text):
+            if name in changed_at:
+                latencies.append(message.received - changed_at.pop(name))
+    print(f'tenants:          {args.tenants}')
+    print(f'polls/sec:        {practicum.requests / elapsed:,.1f}')
+    print(f'delivered:        {len(latencies)}/{args.changes}')
+    if latencies:
+        for share in (0.5, 0.95, 0.99):
+            label = f'latency p{int(share * 100)}:'
+            print(f'{label:<18}{percentile(latencies, share) * 1e3:,.1f} ms')
+        print(f'latency max:      {max(latencies) * 1e3:,.1f} ms')
+    print(f'memory/tenant:    {memory / args.tenants:,.0f} B')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""How many tenants one core can poll per RETRY_TIME window.
+
+Fetch and send are replaced by fakes with a fixed latency, so the numbers
+show the engine's own overhead plus the configured concurrency limit.
+
+    python benchmarks/bench_engine.py --tenants 2000 --latency 0.05
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine import PollingEngine, Subscription  # noqa: E402
+from homework import RETRY_TIME, logger  # noqa: E402
+
+
+def make_fetch(latency):
+    def fetch(token, current_timestamp):
+        time.sleep(latency)
+        return {
+            'homeworks': [{'homework_name': token, 'status': 'reviewing'}],
+            'current_date': current_timestamp,
+        }
+    return fetch
+
+
+def send(bot, chat_id, message):
+    pass
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--tenants', type=int, default=1000)
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--concurrency', type=int, default=50)
+    args = parser.parse_args()
+    logger.disabled = True
+
+    subscriptions = [
+        Subscription(f'token-{i}', (str(i),)) for i in range(args.tenants)
+    ]
+    engine = PollingEngine(
+        None, subscriptions, concurrency=args.concurrency,
+        fetch=make_fetch(args.latency), send=send
+    )
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    asyncio.run(engine.poll_all())
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+    engine._executor.shutdown()
+
+    cpu_per_poll = cpu / args.tenants
+    print(f'tenants:            {args.tenants}')
+    print(f'wall time:          {wall:.3f} s')
+    print(f'cpu per poll:       {cpu_per_poll * 1e6:.1f} us')
+    print(f'cpu-bound capacity: {RETRY_TIME / cpu_per_poll:,.0f} tenants '
+          f'per {RETRY_TIME} s')
+    print(f'io-bound capacity:  '
+          f'{RETRY_TIME * args.tenants / wall:,.0f} tenants per '
+          f'{RETRY_TIME} s at concurrency {args.concurrency}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""Fan-out throughput of one status to many chats via the fake Telegram.
+
+    python benchmarks/bench_fanout.py --recipients 1000 --workers 1 8 32
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import telegram
+from telegram.utils.request import Request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine import PollingEngine, Subscription  # noqa: E402
+from homework import logger  # noqa: E402
+from ratelimit import RateLimiter  # noqa: E402
+from tests.fake_servers import FakeTelegram  # noqa: E402
+
+
+def fetch(token, current_timestamp):
+    return {
+        'homeworks': [{'homework_name': 'hw', 'status': 'approved'}],
+        'current_date': current_timestamp,
+    }
+
+
+def fan_out(telegram_api, recipients, workers):
+    bot = telegram.Bot(
+        token='123:fake', base_url=telegram_api.base_url,
+        request=Request(con_pool_size=workers + 1)
+    )
+    chat_ids = tuple(str(number) for number in range(1, recipients + 1))
+    engine = PollingEngine(
+        bot, [Subscription('token', chat_ids)], fetch=fetch,
+        send_workers=workers
+    )
+    engine.outbox.limiter = RateLimiter(global_rate=10 ** 6, chat_rate=10 ** 6)
+    started = time.perf_counter()
+    asyncio.run(engine.poll_all())
+    elapsed = time.perf_counter() - started
+    engine._executor.shutdown()
+    return engine.outbox.sent / elapsed, engine.outbox.failed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--recipients', type=int, default=1000)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--latency', type=float, default=0.005)
+    args = parser.parse_args()
+    logger.disabled = True
+    with FakeTelegram(latency=args.latency) as telegram_api:
+        for workers in args.workers:
+            rate, failed = fan_out(telegram_api, args.recipients, workers)
+            print(f'workers {workers:>3}: {rate:8,.0f} messages/s, '
+                  f'{failed} failed')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""Startup replay and per-message cost of the notification ledger.
+
+    python benchmarks/bench_ledger.py --notifications 1000000
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ledger import NotificationLedger, notification_key  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--notifications', type=int, default=1_000_000)
+    parser.add_argument('--sends', type=int, default=10000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'ledger.log')
+        with open(path, 'w', encoding='utf-8') as file:
+            for number in range(args.notifications):
+                key = notification_key(number % 5000, number, 'approved',
+                                       '2022-01-01T00:00:00Z')
+                file.write(json.dumps(['c', key], separators=(',', ':')))
+                file.write('\n')
+        size = os.path.getsize(path)
+
+        started = time.perf_counter()
+        ledger = NotificationLedger(path, compact_every=10 ** 9)
+        replayed = time.perf_counter() - started
+
+        keys = [notification_key('chat', number, 'approved', None)
+                for number in range(args.sends)]
+        started = time.perf_counter()
+        for key in keys:
+            ledger.claim(key)
+            ledger.commit(key)
+        send = (time.perf_counter() - started) / args.sends
+        started = time.perf_counter()
+        for key in keys:
+            ledger.claim(key)
+        duplicate = (time.perf_counter() - started) / args.sends
+        ledger.close()
+
+    print(f'log:              {args.notifications:,} notifications, '
+          f'{size / 2 ** 20:.1f} MiB')
+    print(f'startup replay:   {replayed:.3f} s')
+    print(f'claim + commit:   {send * 1e6:.1f} us per message')
+    print(f'duplicate check:  {duplicate * 1e6:.2f} us per message')
+
+
+if __name__ == '__main__':
+    main()
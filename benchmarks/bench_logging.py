@@ -0,0 +1,82 @@
+"""Latency a log call adds to the caller, inline vs background handler.
+
+The target stream sleeps on every write to stand in for a slow stdout
+(a pipe to a busy log collector). Half of the records are the idle
+'No new statuses' debug line, which the background pipeline samples.
+
+    python benchmarks/bench_logging.py --records 2000 --write-delay 0.001
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from homework import LOG_FORMAT  # noqa: E402
+from logpipe import background_handler, stop_listener  # noqa: E402
+
+
+class SlowStream:
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.lines = 0
+
+    def write(self, text):
+        time.sleep(self.delay)
+        self.lines += text.count('\n')
+
+    def flush(self):
+        pass
+
+
+def run(logger, records):
+    latencies = []
+    for number in range(records):
+        started = time.perf_counter()
+        if number % 2:
+            logger.debug('No new statuses from Master')
+        else:
+            logger.info(f'Polled token-{number}')
+        latencies.append(time.perf_counter() - started)
+    latencies.sort()
+    return latencies
+
+
+def report(name, latencies, stream):
+    p50 = latencies[len(latencies) // 2]
+    p99 = latencies[int(len(latencies) * 0.99)]
+    print(f'{name:11} p50: {p50 * 1e6:8.1f} us  p99: {p99 * 1e6:8.1f} us  '
+          f'total: {sum(latencies):6.2f} s  lines written: {stream.lines}')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--records', type=int, default=2000)
+    parser.add_argument('--write-delay', type=float, default=0.001)
+    args = parser.parse_args()
+
+    logger = logging.getLogger('bench')
+    logger.setLevel(logging.DEBUG)
+    logger.propagate = False
+
+    stream = SlowStream(args.write_delay)
+    inline = logging.StreamHandler(stream)
+    inline.setFormatter(logging.Formatter(LOG_FORMAT))
+    logger.handlers = [inline]
+    report('inline', run(logger, args.records), stream)
+
+    stream = SlowStream(args.write_delay)
+    handler, listener = background_handler(
+        logging.StreamHandler(stream), LOG_FORMAT
+    )
+    logger.handlers = [handler]
+    latencies = run(logger, args.records)
+    stop_listener(listener)
+    report('background', latencies, stream)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""Memory kept per tracked homework: API dicts vs `Homework` records.
+
+Every tenant gets its answer decoded from JSON, like a real response,
+and the bot keeps what polling and /history keep: the homeworks in the
+status cache and the last status of each one. Measured with tracemalloc
+after the answers themselves are gone.
+
+    python benchmarks/bench_memory.py --tenants 5000 --homeworks 20
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from homework import (  # noqa: E402
+    HOMEWORK_STATUSES, check_homeworks, homework_key, parse_homeworks
+)
+
+STATUSES = list(HOMEWORK_STATUSES)
+
+
+def answer(tenant, homeworks) -> bytes:
+    return json.dumps({
+        'homeworks': [{
+            'id': tenant * homeworks + number,
+            'status': STATUSES[number % len(STATUSES)],
+            'homework_name': f'student{tenant}__hw{number:02d}.zip',
+            'reviewer_comment': 'Хорошая работа, но есть пара замечаний.',
+            'date_updated': f'2022-01-{number % 28 + 1:02d}T10:00:00Z',
+            'lesson_name': f'Спринт {number % 16 + 1}',
+        } for number in range(homeworks)],
+        'current_date': 1640995200,
+    }).encode()
+
+
+def tracked(parse, tenants, homeworks):
+    """Status cache entries and last statuses of every tenant."""
+    cache, statuses = {}, {}
+    for tenant in range(tenants):
+        parsed = parse(json.loads(answer(tenant, homeworks)))
+        cache[tenant] = {homework_key(item): item for item in parsed}
+        statuses[tenant] = {
+            key: item['status'] for key, item in cache[tenant].items()
+        }
+    return cache, statuses
+
+
+def measure(parse, tenants, homeworks) -> float:
+    gc.collect()
+    tracemalloc.start()
+    kept = tracked(parse, tenants, homeworks)
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    return size / (tenants * homeworks)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--tenants', type=int, default=2000)
+    parser.add_argument('--homeworks', type=int, default=20)
+    args = parser.parse_args()
+
+    before = measure(check_homeworks, args.tenants, args.homeworks)
+    after = measure(parse_homeworks, args.tenants, args.homeworks)
+    total = args.tenants * args.homeworks
+    print(f'tracked homeworks: {total:,}')
+    print(f'API dicts:         {before:.0f} B each '
+          f'({before * total / 2 ** 20:.1f} MiB)')
+    print(f'Homework records:  {after:.0f} B each '
+          f'({after * total / 2 ** 20:.1f} MiB)')
+    print(f'saved:             {1 - after / before:.0%}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+"""Overhead of the metrics instrumentation per polling cycle and scrape.
+
+    python benchmarks/bench_metrics.py --cycles 200000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import metrics  # noqa: E402
+
+
+def instrumented_cycle():
+    metrics.POLLS.inc()
+    started = time.perf_counter()
+    metrics.record_fetch(started)
+    started = time.perf_counter()
+    metrics.PARSE_SECONDS.observe(time.perf_counter() - started)
+    started = time.perf_counter()
+    metrics.record_send(started)
+
+
+def bare_cycle():
+    pass
+
+
+def per_call(func, count):
+    start = time.perf_counter()
+    for _ in range(count):
+        func()
+    return (time.perf_counter() - start) / count
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--cycles', type=int, default=200000)
+    args = parser.parse_args()
+    overhead = (
+        per_call(instrumented_cycle, args.cycles)
+        - per_call(bare_cycle, args.cycles)
+    )
+    scrape = per_call(metrics.REGISTRY.render, 1000)
+    print(f'instrumentation: {overhead * 1e6:.2f} us per polling cycle')
+    print(f'scrape render:   {scrape * 1e6:.1f} us')
+
+
+if __name__ == '__main__':
+    main()
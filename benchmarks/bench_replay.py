@@ -0,0 +1,90 @@
+"""Replay throughput of a recorded answer log versus its real-time span.
+
+Without `--log` a production-shaped log is synthesised first: one answer
+per tenant every RETRY_TIME seconds, mostly idle, some with a status
+change. With `--log` a real `RECORD_FILE` is replayed instead.
+
+    python benchmarks/bench_replay.py --answers 100000
+    python benchmarks/bench_replay.py --log answers.log.gz
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from homework import HOMEWORK_STATUSES, RETRY_TIME, logger  # noqa: E402
+from replay import Recorder, read_recordings, replay  # noqa: E402
+
+
+class Clock:
+
+    def __init__(self):
+        self.now = 1_600_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+def synthesise(path, answers, tenants, change_rate):
+    rng = random.Random(0)
+    clock = Clock()
+    recorder = Recorder(path, clock=clock)
+    statuses = list(HOMEWORK_STATUSES)
+    for number in range(answers):
+        clock.now += RETRY_TIME / tenants
+        homeworks = []
+        if rng.random() < change_rate:
+            homeworks.append({
+                'id': number, 'homework_name': f'hw{number}.zip',
+                'status': rng.choice(statuses),
+                'reviewer_comment': 'Всё хорошо, но можно лучше. ' * 3,
+                'date_updated': '2022-01-01T00:00:00Z',
+            })
+        recorder.record(
+            f'token-{number % tenants}', int(clock.now), 200,
+            json.dumps({'homeworks': homeworks, 'current_date': clock.now})
+        )
+    recorder.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--log')
+    parser.add_argument('--answers', type=int, default=100000)
+    parser.add_argument('--tenants', type=int, default=1000)
+    parser.add_argument('--change-rate', type=float, default=0.05)
+    args = parser.parse_args()
+    logger.disabled = True
+
+    path = args.log
+    if path is None:
+        path = os.path.join(tempfile.mkdtemp(), 'answers.log.gz')
+        synthesise(path, args.answers, args.tenants, args.change_rate)
+
+    recordings = list(read_recordings(path))
+    started = time.perf_counter()
+    stats = replay(recordings, lambda message: None)
+    elapsed = time.perf_counter() - started
+    span = recordings[-1].recorded_at - recordings[0].recorded_at
+
+    print(f'log:          {path} ({os.path.getsize(path):,} B)')
+    print(f'answers:      {stats["answers"]:,}')
+    print(f'messages:     {stats["messages"]:,}')
+    failures = {
+        name: count for name, count in stats.items()
+        if name not in ('answers', 'messages')
+    }
+    print(f'failures:     {failures}')
+    print(f'replay time:  {elapsed:.3f} s '
+          f'({stats["answers"] / elapsed:,.0f} answers/s)')
+    print(f'recorded:     {span:,.0f} s, '
+          f'{span / elapsed:,.0f}x faster than real time')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""Polling throughput of the supervisor mode for a growing number of workers.
+
+Every tenant is polled back to back. The fake fetch sleeps for the API
+latency and then decodes a realistic JSON answer, so one process is
+bound by its concurrency limit and by one core; the polls per second
+should grow with the number of workers until the cores run out.
+
+    python benchmarks/bench_sharding.py --tenants 2000 --workers 1 2 4
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from functools import partial
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine import PollingEngine, Subscription  # noqa: E402
+from homework import logger  # noqa: E402
+from scheduler import AdaptiveSchedule  # noqa: E402
+from supervisor import Supervisor, run_worker  # noqa: E402
+
+
+class BackToBackEngine(PollingEngine):
+
+    def add_tenant(self, subscription):
+        tenant = super().add_tenant(subscription)
+        tenant.schedule = AdaptiveSchedule(
+            base=0, min_interval=0, max_interval=0
+        )
+        return tenant
+
+
+def make_body(homeworks):
+    return json.dumps({
+        'homeworks': [
+            {'id': number, 'homework_name': f'hw-{number}.zip',
+             'status': 'approved', 'reviewer_comment': 'Отлично! ' * 10}
+            for number in range(homeworks)
+        ],
+        'current_date': 0,
+    })
+
+
+def send(bot, chat_id, message):
+    pass
+
+
+def make_engine(index, polls, body, latency, concurrency):
+    def fetch(token, current_timestamp):
+        time.sleep(latency)
+        answer = json.loads(body)
+        polls[index] += 1
+        return answer
+    return BackToBackEngine(
+        None, [], concurrency=concurrency, fetch=fetch, send=send
+    )
+
+
+def measure(workers, subscriptions, args, body):
+    lease_dir = tempfile.mkdtemp()
+    supervisor = Supervisor(workers, None)
+    polls = supervisor.context.Array('q', workers, lock=False)
+    supervisor.target = partial(
+        run_worker, subscriptions=subscriptions,
+        make_engine=partial(
+            make_engine, polls=polls, body=body, latency=args.latency,
+            concurrency=args.concurrency
+        ),
+        lease_dir=lease_dir, interval=0.2
+    )
+    supervisor.start()
+    try:
+        time.sleep(args.warmup)
+        before = sum(polls)
+        time.sleep(args.duration)
+        return (sum(polls) - before) / args.duration
+    finally:
+        supervisor.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--tenants', type=int, default=2000)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--concurrency', type=int, default=10)
+    parser.add_argument('--homeworks', type=int, default=20)
+    parser.add_argument('--warmup', type=float, default=2)
+    parser.add_argument('--duration', type=float, default=5)
+    args = parser.parse_args()
+    logger.disabled = True
+
+    subscriptions = [
+        Subscription(f'token-{number}', (str(number),))
+        for number in range(args.tenants)
+    ]
+    body = make_body(args.homeworks)
+    print(f'cores: {os.cpu_count()}, tenants: {args.tenants}, '
+          f'latency: {args.latency * 1000:.0f} ms, '
+          f'concurrency per worker: {args.concurrency}')
+    baseline = None
+    for workers in args.workers:
+        rate = measure(workers, subscriptions, args, body)
+        baseline = baseline or rate
+        print(f'workers: {workers:3}  polls/s: {rate:9,.0f}  '
+              f'speedup: {rate / baseline:5.2f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+"""Import time of `homework` and of the bot's heavy dependencies.
+
+Uses `python -X importtime` in fresh interpreters and reports the
+cumulative import time of each module, best of --runs.
+
+    python benchmarks/bench_startup.py --runs 5
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULES = ('homework', 'engine', 'telegram', 'requests', 'dotenv')
+
+
+def import_time(module) -> int:
+    """Cumulative import time in microseconds."""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=ROOT_DIR, capture_output=True, text=True, check=True
+    )
+    for line in result.stderr.splitlines():
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if name.strip() == module:
+            return int(cumulative)
+    raise RuntimeError(f'{module} is missing in -X importtime output')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+    for module in MODULES:
+        best = min(import_time(module) for _ in range(args.runs))
+        print(f'{module:<10} {best / 1000:8.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""Peak memory of parsing a long history: `json.loads` vs `HomeworkStream`.
+
+    python benchmarks/bench_stream.py --homeworks 100000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from homework import logger, parse_status  # noqa: E402
+from jsonstream import CHUNK_SIZE, HomeworkStream  # noqa: E402
+
+
+def make_body(count) -> bytes:
+    return json.dumps({
+        'homeworks': [
+            {
+                'id': number,
+                'status': 'approved',
+                'homework_name': f'user__homework_{number}.zip',
+                'reviewer_comment': 'Всё нравится',
+                'date_updated': '2022-02-13T14:40:57Z',
+                'lesson_name': 'Итоговый проект',
+            }
+            for number in range(count)
+        ],
+        'current_date': 1644760000,
+    }, ensure_ascii=False).encode()
+
+
+def chunks(body):
+    for start in range(0, len(body), CHUNK_SIZE):
+        yield body[start:start + CHUNK_SIZE]
+
+
+def full(body):
+    for homework in json.loads(body)['homeworks']:
+        parse_status(homework)
+
+
+def streamed(body):
+    for homework in HomeworkStream(chunks(body)):
+        parse_status(homework)
+
+
+def measure(func, body):
+    tracemalloc.start()
+    started = time.perf_counter()
+    func(body)
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--homeworks', type=int, default=100000)
+    args = parser.parse_args()
+    logger.disabled = True
+    body = make_body(args.homeworks)
+    print(f'body: {len(body) / 2 ** 20:.1f} MiB, '
+          f'{args.homeworks} homeworks')
+    for name, func in (('json.loads', full), ('stream', streamed)):
+        peak, elapsed = measure(func, body)
+        print(f'{name:<11} peak {peak / 2 ** 20:8.2f} MiB, {elapsed:.2f} s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""Load and analytics time of a timeline with millions of transitions.
+
+The columns are synthesised with NumPy straight into the store format:
+students submit homeworks, wait hours in `reviewing`, get rejected about
+a third of the time and resubmit. `homework_name` carries the student
+login, so grouping by homework gives about one group per submission;
+lessons are shared by every student. The append path is timed
+separately through `TimelineStore.append`.
+
+    python benchmarks/bench_timeline.py --transitions 5000000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from timeline import (  # noqa: E402
+    COLUMNS, DTYPES, STATUSES, TimelineStore, analyze, load
+)
+
+
+def synthesise(path, transitions, homeworks_per_student):
+    rng = np.random.default_rng(0)
+    # Каждая работа: reviewing -> вердикт, пока не примут
+    rounds = transitions // 2
+    works = rounds // 2
+    store = TimelineStore(path)
+    for number in range(homeworks_per_student):
+        store._code(f'lesson {number:02d}')
+    for number in range(works):
+        store._code(f'student{number // homeworks_per_student}'
+                    f'__hw{number % homeworks_per_student:02d}.zip')
+    store.close()
+
+    work = np.sort(rng.integers(0, works, rounds))
+    start = rng.uniform(0, 90 * 86400, works)[work]
+    review = rng.exponential(6 * 3600, rounds)
+    rework = rng.exponential(24 * 3600, rounds)
+    submitted = start + np.cumsum(review + rework) - (review + rework)
+    rejected = rng.random(rounds) < 0.35
+    last = np.r_[work[1:] != work[:-1], True]
+    rejected[last] = False
+
+    columns = {
+        'time': np.stack([submitted, submitted + review], 1).ravel(),
+        'tenant': np.repeat(work // homeworks_per_student, 2),
+        'homework': np.repeat(work, 2),
+        'name': np.repeat(homeworks_per_student + work, 2),
+        'lesson': np.repeat(work % homeworks_per_student, 2),
+        'status': np.stack([
+            np.full(rounds, STATUSES.index('reviewing')),
+            np.where(rejected, STATUSES.index('rejected'),
+                     STATUSES.index('approved')),
+        ], 1).ravel(),
+    }
+    for name, typecode in COLUMNS.items():
+        columns[name].astype(DTYPES[typecode]).tofile(
+            os.path.join(path, f'{name}.{typecode}')
+        )
+    return len(columns['time'])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--transitions', type=int, default=2_000_000)
+    parser.add_argument('--homeworks', type=int, default=20)
+    parser.add_argument('--appends', type=int, default=20000)
+    args = parser.parse_args()
+    path = tempfile.mkdtemp()
+
+    rows = synthesise(path, args.transitions, args.homeworks)
+    size = sum(os.path.getsize(os.path.join(path, name))
+               for name in os.listdir(path))
+    started = time.perf_counter()
+    columns, strings = load(path)
+    loaded = time.perf_counter() - started
+    started = time.perf_counter()
+    results = analyze(columns, strings)
+    analyzed = time.perf_counter() - started
+    started = time.perf_counter()
+    lessons = analyze(columns, strings, by='lesson')
+    by_lesson = time.perf_counter() - started
+    started = time.perf_counter()
+    analyze(columns, strings, by='all')
+    overall = time.perf_counter() - started
+
+    store = TimelineStore(tempfile.mkdtemp())
+    homework = {'id': 1, 'homework_name': 'hw', 'lesson_name': 'lesson',
+                'status': 'approved', 'date_updated': '2022-01-01T00:00:00Z'}
+    started = time.perf_counter()
+    for number in range(args.appends):
+        store.append(f'token-{number % 100}', homework, 0)
+    appended = time.perf_counter() - started
+    store.close()
+
+    sample = lessons['lesson 00']
+    print(f'transitions:      {rows:,} ({size / rows:.0f} B each on disk)')
+    print(f'load:             {loaded:.3f} s')
+    print(f'analyze by hw:    {analyzed:.3f} s ({len(results)} groups)')
+    print(f'analyze by lesson:{by_lesson:.3f} s ({len(lessons)} groups)')
+    print(f'analyze overall:  {overall:.3f} s')
+    print(f'append:           {appended / args.appends * 1e6:.1f} us/row')
+    print(f'lesson 00:        {sample["reviews"]:,} reviews, '
+          f'rejected {sample["rejection_rate"]:.1%}, review p50 '
+          f'{sample["review_p50"]:.1f} h, turnaround p90 '
+          f'{sample["turnaround_p90"]:.1f} h')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""Per-request cost of a fresh connection vs the pooled keep-alive session.
+
+Runs against the local fake Practicum API. Pass --cert/--key to serve
+TLS and include the handshake in the comparison.
+
+    python benchmarks/bench_transport.py --requests 500
+"""
+import argparse
+import os
+import ssl
+import sys
+import time
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tests.fake_servers import FakePracticum  # noqa: E402
+from transport import HttpTransport  # noqa: E402
+
+HEADERS = {'Authorization': 'OAuth token'}
+
+
+def measure(get, url, count):
+    start = time.perf_counter()
+    for _ in range(count):
+        get(url, headers=HEADERS, params={'from_date': 0}).json()
+    return (time.perf_counter() - start) / count
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=300)
+    parser.add_argument('--cert')
+    parser.add_argument('--key')
+    args = parser.parse_args()
+
+    practicum = FakePracticum()
+    practicum.add_token('token')
+    url = practicum.endpoint
+    verify = True
+    if args.cert:
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(args.cert, args.key)
+        server = practicum._server
+        server.socket = context.wrap_socket(server.socket, server_side=True)
+        url = url.replace('http://', 'https://')
+        verify = False
+    practicum.start()
+
+    def fresh_get(url, **kwargs):
+        return requests.get(url, verify=verify, **kwargs)
+
+    transport = HttpTransport()
+
+    def pooled_get(url, **kwargs):
+        return transport.get(url, verify=verify, **kwargs)
+
+    fresh = measure(fresh_get, url, args.requests)
+    pooled = measure(pooled_get, url, args.requests)
+    practicum.stop()
+    print(f'fresh connection: {fresh * 1e3:.3f} ms/request')
+    print(f'pooled session:   {pooled * 1e3:.3f} ms/request')
+    print(f'saved:            {(fresh - pooled) * 1e3:.3f} ms/request '
+          f'({fresh / pooled:.1f}x)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""Timing wheel cost per operation and the poll rate it produces.
+
+The rate part drives the real `AdaptiveSchedule` and `TimingWheel` on a
+fake clock: every tenant starts at once, as after a restart, and is
+polled every RETRY_TIME. Without phases all polls land in the same
+second of every interval; with them the rate stays flat.
+
+    python benchmarks/bench_wheel.py --tenants 20000 --intervals 3
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from homework import RETRY_TIME  # noqa: E402
+from scheduler import (  # noqa: E402
+    AdaptiveSchedule, TimingWheel, jitter, phase
+)
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def operation_cost(keys) -> dict:
+    wheel = TimingWheel(resolution=0.1)
+    now = wheel.clock()
+    tokens = [f'token-{number}' for number in range(keys)]
+    dues = [now + phase(token) * RETRY_TIME for token in tokens]
+    costs = {}
+    for name, shift in (('schedule', 0), ('reschedule', 60),
+                        ('cancel', None)):
+        started = time.perf_counter()
+        if shift is None:
+            for token in tokens:
+                wheel.cancel(token)
+        else:
+            for token, due in zip(tokens, dues):
+                wheel.schedule(token, due + shift)
+        costs[name] = (time.perf_counter() - started) / keys
+    return costs
+
+
+def poll_rate(tenants, intervals, spread) -> Counter:
+    """Polls per second of simulated time."""
+    clock = FakeClock()
+    wheel = TimingWheel(resolution=0.1, clock=clock)
+    schedules = {}
+    for number in range(tenants):
+        token = f'token-{number}'
+        schedule = AdaptiveSchedule(base=RETRY_TIME, min_interval=RETRY_TIME,
+                                    clock=clock)
+        schedules[token] = schedule
+        delay = schedule.start_at(phase(token)) if spread else 0
+        wheel.schedule(token, clock.now + delay)
+    cycles = Counter()
+    polls = Counter()
+    end = intervals * RETRY_TIME
+    while clock.now < end:
+        for token in wheel.advance():
+            polls[int(clock.now)] += 1
+            cycles[token] += 1
+            shift = jitter(token, cycles[token]) if spread else 0
+            wheel.schedule(
+                token, clock.now + schedules[token].delay(shift)
+            )
+        clock.now += wheel.resolution
+    return polls
+
+
+def describe(polls, start, end) -> str:
+    rates = [polls.get(second, 0) for second in range(start, end)]
+    mean = statistics.mean(rates)
+    return (f'peak {max(rates):>6}/s, mean {mean:6.1f}/s, '
+            f'stdev {statistics.pstdev(rates) / mean:5.1%} of mean, '
+            f'idle seconds {rates.count(0)}')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--tenants', type=int, default=20000)
+    parser.add_argument('--intervals', type=int, default=3)
+    args = parser.parse_args()
+
+    for keys in (10_000, 100_000, 1_000_000):
+        costs = operation_cost(keys)
+        print(f'{keys:>9,} keys: ' + ', '.join(
+            f'{name} {cost * 1e6:.2f} us' for name, cost in costs.items()
+        ))
+    # Первый интервал — разгон, сравниваем установившийся режим
+    start, end = int(RETRY_TIME), int(args.intervals * RETRY_TIME)
+    for spread in (False, True):
+        polls = poll_rate(args.tenants, args.intervals, spread)
+        label = 'phase + jitter' if spread else 'all at once   '
+        print(f'{label} {args.tenants:,} tenants: '
+              f'{describe(polls, start, end)}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""Circuit breaker around calls to the Practicum API."""
+import os
+import threading
+import time
+from http import HTTPStatus
+
+import metrics
+from exceptions import ApiConnectionFailed, CircuitOpenError
+from homework import logger
+
+
+BREAKER_FAILURES = int(os.getenv('BREAKER_FAILURES', 5))
+BREAKER_RESET = float(os.getenv('BREAKER_RESET', 60))
+
+CLOSED = 'closed'
+HALF_OPEN = 'half_open'
+OPEN = 'open'
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+def is_upstream_failure(error) -> bool:
+    """Errors that say the endpoint itself is unhealthy.
+
+    401/404 and broken answers concern one token or one response, so
+    they do not trip the breaker.
+    """
+    if isinstance(error, ApiConnectionFailed):
+        return (error.status_code >= HTTPStatus.INTERNAL_SERVER_ERROR
+                or error.status_code == HTTPStatus.TOO_MANY_REQUESTS)
+    # Импорт тут: requests нужен только после первого запроса
+    import requests
+
+    return isinstance(error, (requests.ConnectionError, requests.Timeout))
+
+
+class CircuitBreaker:
+    """Closed -> open after `failure_threshold` upstream failures in a row.
+
+    While open, calls fail fast with `CircuitOpenError`. After
+    `reset_timeout` one probe call is let through (half-open): success
+    closes the circuit, failure opens it again.
+    """
+
+    def __init__(self, name, failure_threshold=BREAKER_FAILURES,
+                 reset_timeout=BREAKER_RESET, clock=time.monotonic) -> None:
+        """Starts closed; `name` only shows in logs and errors."""
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def _set_state(self, state) -> None:
+        self.state = state
+        metrics.CIRCUIT_STATE.set(STATE_VALUES[state])
+
+    def before_call(self) -> None:
+        """Raises `CircuitOpenError` unless the call may go through."""
+        with self._lock:
+            if self.state == CLOSED:
+                return
+            retry_in = self.opened_at + self.reset_timeout - self.clock()
+            if self.state == OPEN and retry_in <= 0:
+                self._set_state(HALF_OPEN)
+                logger.info(f'Circuit for {self.name} half-open, probing')
+                return
+        metrics.CIRCUIT_SKIPPED.inc()
+        raise CircuitOpenError(self.name, max(retry_in, 0))
+
+    def record_success(self) -> None:
+        """Closes the circuit and resets the failure count."""
+        with self._lock:
+            self.failures = 0
+            if self.state != CLOSED:
+                self._set_state(CLOSED)
+                logger.info(f'Circuit for {self.name} closed')
+
+    def record_failure(self) -> None:
+        """Counts a failure; opens at the threshold or after a failed probe."""
+        with self._lock:
+            self.failures += 1
+            if (self.state == HALF_OPEN
+                    or self.failures >= self.failure_threshold):
+                if self.state != OPEN:
+                    logger.warning(
+                        f'Circuit for {self.name} opened after '
+                        f'{self.failures} failures'
+                    )
+                self._set_state(OPEN)
+                self.opened_at = self.clock()
+
+    def call(self, func, *args, **kwargs):
+        """Runs `func`; only upstream failures count against the circuit."""
+        self.before_call()
+        try:
+            result = func(*args, **kwargs)
+        except Exception as error:
+            if is_upstream_failure(error):
+                self.record_failure()
+            else:
+                self.record_success()
+            raise
+        self.record_success()
+        return result
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(endpoint) -> CircuitBreaker:
+    """One breaker per endpoint, shared by all tenants."""
+    with _breakers_lock:
+        breaker = _breakers.get(endpoint)
+        if breaker is None:
+            breaker = _breakers[endpoint] = CircuitBreaker(endpoint)
+        return breaker
@@ -0,0 +1,140 @@
+"""Durable `current_date` and last notified statuses of every tenant."""
+import hashlib
+import json
+import os
+import sys
+
+
+CHECKPOINT_FILE = os.getenv('CHECKPOINT_FILE', 'checkpoint.log')
+CHECKPOINT_FSYNC = os.getenv('CHECKPOINT_FSYNC', '') == '1'
+COMPACT_EVERY = 1000
+
+
+def tenant_key(token) -> str:
+    """Tokens are never written to disk, only their digest."""
+    return hashlib.sha256(token.encode()).hexdigest()[:16]
+
+
+class CheckpointState:
+    """Read-only replay of a checkpoint log.
+
+    Lets a sharded worker pick up the state of a tenant that another
+    worker, alive or dead, has been checkpointing.
+    """
+
+    def __init__(self, path=CHECKPOINT_FILE) -> None:
+        """Replays the log at `path`; a missing one is an empty state."""
+        self.path = path
+        self.dates = {}
+        self.statuses = {}
+        self._records = 0
+        self.clean = self._load()
+
+    def _load(self) -> bool:
+        """Replays the log; False if it has to be rewritten."""
+        if not os.path.exists(self.path):
+            return False
+        clean = True
+        with open(self.path, encoding='utf-8') as file:
+            for line in file:
+                try:
+                    self._apply(json.loads(line))
+                except (ValueError, IndexError):
+                    clean = False
+                    continue
+                self._records += 1
+        return clean
+
+    def _apply(self, record) -> None:
+        if record[0] == 'd':
+            self.dates[record[1]] = record[2]
+        elif record[0] == 's':
+            status = record[3]
+            if isinstance(status, str):
+                # Иначе у каждой строки лога своя копия статуса
+                status = sys.intern(status)
+            self.statuses.setdefault(record[1], {})[record[2]] = status
+        else:
+            raise ValueError(record[0])
+
+    def current_date(self, token):
+        """Last checkpointed `current_date` or None."""
+        return self.dates.get(tenant_key(token))
+
+    def last_statuses(self, token) -> dict:
+        """Last notified status of every homework of the tenant."""
+        return dict(self.statuses.get(tenant_key(token), {}))
+
+
+class CheckpointStore(CheckpointState):
+    """Append-only log of state changes, compacted by atomic rename.
+
+    A cycle only appends the records that changed (one short line plus a
+    flush), so checkpointing costs microseconds. The log is rewritten to
+    a temporary file and `os.replace`d over the old one when it grows
+    past `compact_every` records; a torn last line left by a crash is
+    dropped on load.
+    """
+
+    def __init__(self, path=CHECKPOINT_FILE, compact_every=COMPACT_EVERY,
+                 fsync=CHECKPOINT_FSYNC) -> None:
+        """Loads the log, rewriting it if it was torn or missing."""
+        self.compact_every = compact_every
+        self.fsync = fsync
+        self._file = None
+        super().__init__(path)
+        if not self.clean:
+            self.compact()
+        self._file = open(self.path, 'a', encoding='utf-8')
+
+    def save_date(self, token, current_date) -> None:
+        """Appends the `current_date` of a tenant if it changed."""
+        key = tenant_key(token)
+        if self.dates.get(key) != current_date:
+            self._append(['d', key, current_date])
+
+    def save_status(self, token, homework, status) -> None:
+        """Appends the last notified status of a homework if it changed."""
+        key = tenant_key(token)
+        if self.statuses.get(key, {}).get(homework) != status:
+            self._append(['s', key, homework, status])
+
+    def _append(self, record) -> None:
+        self._apply(record)
+        self._file.write(json.dumps(record, separators=(',', ':')) + '\n')
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+        self._records += 1
+        if self._records > self.compact_every:
+            self.compact()
+
+    def _snapshot(self):
+        for key, current_date in self.dates.items():
+            yield ['d', key, current_date]
+        for key, statuses in self.statuses.items():
+            for homework, status in statuses.items():
+                yield ['s', key, homework, status]
+
+    def compact(self) -> None:
+        """Atomically replaces the log with the live state only."""
+        tmp_path = f'{self.path}.tmp'
+        records = 0
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            for record in self._snapshot():
+                file.write(json.dumps(record, separators=(',', ':')) + '\n')
+                records += 1
+            file.flush()
+            os.fsync(file.fileno())
+        if self._file is not None:
+            self._file.close()
+        os.replace(tmp_path, self.path)
+        self._records = records
+        # Чтобы лог не сжимался на каждой записи при большом состоянии
+        self.compact_every = max(self.compact_every, 2 * records)
+        if self._file is not None:
+            self._file = open(self.path, 'a', encoding='utf-8')
+
+    def close(self) -> None:
+        """Closes the log file."""
+        self._file.close()
@@ -0,0 +1,172 @@
+"""/status and /history answered from a local cache of API answers."""
+import os
+import threading
+import time
+
+from homework import (
+    HOMEWORK_STATUSES, homework_key, logger, parse_homeworks,
+    request_homeworks
+)
+
+
+BOT_COMMANDS = os.getenv('BOT_COMMANDS', '') == '1'
+STATUS_CACHE_TTL = float(os.getenv('STATUS_CACHE_TTL', 300))
+MESSAGE_MAX_LENGTH = 4096
+
+
+class _Call:
+    __slots__ = ('event', 'result', 'error')
+
+    def __init__(self) -> None:
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Concurrent calls with the same key share one execution."""
+
+    def __init__(self) -> None:
+        """Starts with no calls in flight."""
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, func):
+        """Result of `func`, run once for all concurrent callers of `key`."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if leader:
+            try:
+                call.result = func()
+            except Exception as error:
+                call.error = error
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.event.set()
+        else:
+            call.event.wait()
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+
+class StatusCache:
+    """Full homework history per token, kept for `ttl` seconds.
+
+    Misses are loaded with `from_date=0` through a single flight, so a
+    burst of commands makes one API request. The polling engine merges
+    fresh transitions into entries that are already cached.
+    """
+
+    def __init__(self, fetch=request_homeworks, ttl=STATUS_CACHE_TTL,
+                 clock=time.monotonic) -> None:
+        """Starts empty; entries are loaded on first use."""
+        self.fetch = fetch
+        self.ttl = ttl
+        self.clock = clock
+        self._entries = {}
+        self._flight = SingleFlight()
+
+    def homeworks(self, token) -> list:
+        """Homeworks of the token owner, most recently updated first."""
+        entry = self._entries.get(token)
+        if entry is not None and self.clock() - entry[0] < self.ttl:
+            return list(entry[1].values())
+        return self._flight.do(token, lambda: self._load(token))
+
+    def _load(self, token) -> list:
+        homeworks = parse_homeworks(self.fetch(token, 0))
+        self._entries[token] = (
+            self.clock(),
+            {homework_key(homework): homework for homework in homeworks},
+        )
+        return homeworks
+
+    def update(self, token, homeworks) -> None:
+        """Merges transitions seen by polling into a cached entry."""
+        entry = self._entries.get(token)
+        if entry is None:
+            return
+        loaded, cached = entry
+        fresh = {homework_key(homework): homework for homework in homeworks}
+        # Свежие работы в начало, как в ответе API
+        fresh.update(
+            (key, homework) for key, homework in cached.items()
+            if key not in fresh
+        )
+        self._entries[token] = (loaded, fresh)
+
+
+def describe(homework) -> str:
+    """Homework name and its status in words."""
+    status = homework.get('status')
+    verdict = HOMEWORK_STATUSES.get(status, f'Статус: {status}')
+    return f'"{homework.get("homework_name")}". {verdict}'
+
+
+class BotCommands:
+    """Handlers for /status and /history.
+
+    A chat sees the homeworks of the subscription it receives
+    notifications for.
+    """
+
+    def __init__(self, cache, subscriptions) -> None:
+        """Maps every subscribed chat to its token."""
+        self.cache = cache
+        self.tokens = {
+            chat_id: subscription.token
+            for subscription in subscriptions
+            for chat_id in subscription.chat_ids
+        }
+
+    def _homeworks(self, update):
+        token = self.tokens.get(str(update.effective_chat.id))
+        if token is None:
+            update.message.reply_text('Этот чат не подписан на статусы.')
+            return None
+        try:
+            return self.cache.homeworks(token)
+        except Exception as error:
+            logger.error(f'Command failed: {error}')
+            update.message.reply_text('Не удалось получить статусы.')
+            return None
+
+    def status(self, update, context) -> None:
+        """Replies with the most recently updated homework."""
+        homeworks = self._homeworks(update)
+        if homeworks is None:
+            return
+        if not homeworks:
+            update.message.reply_text('Работ на проверке пока нет.')
+            return
+        update.message.reply_text(f'Последняя работа {describe(homeworks[0])}')
+
+    def history(self, update, context) -> None:
+        """Replies with every homework that fits into one message."""
+        homeworks = self._homeworks(update)
+        if homeworks is None:
+            return
+        if not homeworks:
+            update.message.reply_text('Работ на проверке пока нет.')
+            return
+        lines = []
+        size = 0
+        for homework in homeworks:
+            line = describe(homework)
+            size += len(line) + 1
+            if size > MESSAGE_MAX_LENGTH:
+                break
+            lines.append(line)
+        update.message.reply_text('\n'.join(lines))
+
+    def register(self, dispatcher) -> None:
+        """Adds the /status and /history handlers."""
+        from telegram.ext import CommandHandler
+
+        dispatcher.add_handler(CommandHandler('status', self.status))
+        dispatcher.add_handler(CommandHandler('history', self.history))
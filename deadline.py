@@ -0,0 +1,59 @@
+"""One time budget per polling cycle, shared by fetch, parse and send."""
+import contextvars
+import os
+import time
+from contextlib import contextmanager
+
+from exceptions import DeadlineExceeded
+
+
+CYCLE_BUDGET = float(os.getenv('CYCLE_BUDGET', 60))
+
+_current = contextvars.ContextVar('deadline', default=None)
+
+
+class Deadline:
+    """Point on the monotonic clock by which a cycle must be done."""
+
+    def __init__(self, budget=CYCLE_BUDGET, clock=time.monotonic) -> None:
+        """Starts counting `budget` seconds now."""
+        self.budget = budget
+        self.clock = clock
+        self.expires = clock() + budget
+
+    def remaining(self) -> float:
+        """Seconds left, never negative."""
+        return max(0.0, self.expires - self.clock())
+
+    @property
+    def expired(self) -> bool:
+        """Whether the budget is spent."""
+        return self.clock() >= self.expires
+
+    def check(self, stage) -> None:
+        """Raises `DeadlineExceeded` once the budget is spent."""
+        if self.expired:
+            raise DeadlineExceeded(stage, self.budget)
+
+    def timeout(self, limit) -> float:
+        """`limit` cut down to the time that is left."""
+        return min(limit, self.remaining())
+
+
+def current():
+    """Deadline of the cycle being run or None outside of one.
+
+    The engine copies its context into the thread pool, so blocking
+    calls deep in `requests` and `telegram` see it too.
+    """
+    return _current.get()
+
+
+@contextmanager
+def applied(deadline):
+    """Makes `deadline` the `current` one inside the block."""
+    token = _current.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current.reset(token)
@@ -0,0 +1,83 @@
+"""Fingerprinted, time-windowed deduplication of failure reports."""
+import os
+import time
+from collections import OrderedDict
+from traceback import format_exception
+
+
+ERROR_WINDOW = float(os.getenv('ERROR_WINDOW', 3600))
+ERROR_LRU_SIZE = 32
+
+
+def fingerprint(error) -> tuple:
+    """Exception class plus the frame that raised it."""
+    tb = error.__traceback__
+    if tb is None:
+        return type(error).__qualname__, None, None
+    while tb.tb_next is not None:
+        tb = tb.tb_next
+    code = tb.tb_frame.f_code
+    return type(error).__qualname__, code.co_filename, tb.tb_lineno
+
+
+class _Seen:
+    __slots__ = ('since', 'repeats', 'label')
+
+    def __init__(self, since, label) -> None:
+        self.since = since
+        self.repeats = 0
+        self.label = label
+
+
+class ErrorDeduper:
+    """Reports each kind of failure once per `window` seconds.
+
+    Fingerprints live in an LRU of `size` entries. Repeats inside the
+    window are only counted; once it is over they are reported as a
+    single summary line.
+    """
+
+    def __init__(self, window=ERROR_WINDOW, size=ERROR_LRU_SIZE,
+                 clock=time.monotonic) -> None:
+        """Starts with no failures seen."""
+        self.window = window
+        self.size = size
+        self.clock = clock
+        self._seen = OrderedDict()
+
+    def report(self, error):
+        """Failure message to send, or None if it is a repeat."""
+        key = fingerprint(error)
+        now = self.clock()
+        seen = self._seen.get(key)
+        if seen is not None and now - seen.since < self.window:
+            seen.repeats += 1
+            self._seen.move_to_end(key)
+            return None
+        message = 'Сбой в работе программы:{} {}'.format(
+            error, ''.join(format_exception(
+                type(error), error, error.__traceback__
+            ))
+        )
+        if seen is not None and seen.repeats:
+            message = f'{self._summary(seen)}\n{message}'
+        self._seen[key] = _Seen(now, f'{type(error).__name__}: {error}')
+        self._seen.move_to_end(key)
+        if len(self._seen) > self.size:
+            self._seen.popitem(last=False)
+        return message
+
+    @staticmethod
+    def _summary(seen) -> str:
+        return f'Сбой повторился {seen.repeats} раз: {seen.label}'
+
+    def flush(self) -> list:
+        """Summaries of repeats whose window is over."""
+        now = self.clock()
+        summaries = []
+        for seen in self._seen.values():
+            if seen.repeats and now - seen.since >= self.window:
+                summaries.append(self._summary(seen))
+                seen.since = now
+                seen.repeats = 0
+        return summaries
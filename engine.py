@@ -0,0 +1,525 @@
+"""Asyncio engine polling many Practicum tokens from one process."""
+import asyncio
+import contextvars
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import List, NamedTuple, Tuple
+
+import metrics
+from commands import StatusCache
+from deadline import CYCLE_BUDGET, Deadline, applied
+from deduper import ErrorDeduper
+from exceptions import (
+    DeadlineExceeded, HomeworkStatusError, KeyNotExistsError
+)
+from homework import (
+    Homework, homework_key, logger, new_statuses, parse_homeworks,
+    parse_status, request_homeworks, send_to_chat, stream_homeworks
+)
+from liveness import HEARTBEAT_INTERVAL, Heartbeat
+from outbox import SEND_WORKERS, Outbox
+from policies import (
+    DEGRADE, RETRY, RETRY_ATTEMPTS, STOP, policy_for, retry_delay
+)
+from scheduler import AdaptiveSchedule, TimingWheel, jitter, phase
+
+
+MAX_CONCURRENT_POLLS = int(os.getenv('MAX_CONCURRENT_POLLS', 10))
+STREAM_RESPONSES = os.getenv('STREAM_RESPONSES', '') == '1'
+
+
+class Subscription(NamedTuple):
+    """Practicum token and the chats its statuses are sent to.
+
+    Failure reports go to the first chat only, the token owner's.
+    """
+
+    token: str
+    chat_ids: Tuple[str, ...]
+
+    @property
+    def owner_chat_id(self) -> str:
+        """Chat that receives failure reports."""
+        return self.chat_ids[0]
+
+
+def parse_chat_ids(value) -> Tuple[str, ...]:
+    """Accepts one id, a list of ids or a comma-separated string."""
+    if isinstance(value, (list, tuple)):
+        chat_ids = [str(chat_id).strip() for chat_id in value]
+    else:
+        chat_ids = str(value).split(',')
+    return tuple(chat_id.strip() for chat_id in chat_ids if chat_id.strip())
+
+
+class Tenant:
+    """Polling state of a single subscription."""
+
+    def __init__(self, subscription, current_timestamp,
+                 statuses=None) -> None:
+        """Polls from `current_timestamp` knowing `statuses` already."""
+        self.subscription = subscription
+        self.current_timestamp = current_timestamp
+        self.statuses = statuses or {}
+        self.errors = ErrorDeduper()
+        self.schedule = AdaptiveSchedule()
+        self.failures = 0
+        self.retry_in = None
+        self.stopped = False
+
+
+def load_subscriptions(path) -> List[Subscription]:
+    """Reads a JSON list of {"token": ..., "chat_ids": [...]} entries.
+
+    A single "chat_id" is accepted instead of "chat_ids".
+    """
+    with open(path, encoding='utf-8') as file:
+        entries = json.load(file)
+    subscriptions = []
+    for entry in entries:
+        if 'token' not in entry:
+            raise KeyNotExistsError('token')
+        chat_ids = parse_chat_ids(
+            entry.get('chat_ids', entry.get('chat_id', ''))
+        )
+        if not chat_ids:
+            raise KeyNotExistsError('chat_ids')
+        subscriptions.append(Subscription(entry['token'], chat_ids))
+    return subscriptions
+
+
+class PollingEngine:
+    """Polls every subscription concurrently with a bounded limit.
+
+    Blocking HTTP requests run in a thread pool, so at most
+    `concurrency` of them are in flight at once. Polling only queues
+    rendered messages; the outbox workers send them. With `stream` the
+    answer is parsed while it downloads and fed to `parse_status` one
+    homework at a time, which keeps `from_date=0` backfills flat in
+    memory.
+    """
+
+    def __init__(self, bot, subscriptions, concurrency=MAX_CONCURRENT_POLLS,
+                 fetch=None, send=send_to_chat, checkpoint=None,
+                 stream=STREAM_RESPONSES, send_workers=SEND_WORKERS,
+                 status_cache=None, timeline=None,
+                 cycle_budget=CYCLE_BUDGET, ledger=None,
+                 heartbeat=None) -> None:
+        """Adds a tenant for every subscription; nothing runs yet."""
+        self.bot = bot
+        self.concurrency = concurrency
+        self.stream = stream
+        self.fetch = fetch or (
+            stream_homeworks if stream else request_homeworks
+        )
+        self.send = send
+        self.checkpoint = checkpoint
+        self.status_cache = status_cache or StatusCache()
+        self.timeline = timeline
+        self.cycle_budget = cycle_budget
+        self.heartbeat = heartbeat or Heartbeat()
+        self.tenants = []
+        self.wheel = TimingWheel()
+        self._tasks = {}
+        self._waiting = {}
+        self._ticker = None
+        self._running = False
+        for subscription in subscriptions:
+            self.add_tenant(subscription)
+        self.outbox = Outbox(
+            self._send, workers=send_workers, ledger=ledger, run=self._call
+        )
+        metrics.OUTBOX_DEPTH.function = lambda: self.outbox.depth
+        self._executor = ThreadPoolExecutor(
+            max_workers=concurrency + self.outbox.workers
+        )
+        self._semaphore = None
+
+    def add_tenant(self, subscription) -> Tenant:
+        """Starts polling a subscription from its checkpoint, if any."""
+        current_timestamp = int(time.time())
+        tenant = Tenant(subscription, current_timestamp)
+        if self.checkpoint is not None:
+            token = subscription.token
+            tenant.current_timestamp = (
+                self.checkpoint.current_date(token) or current_timestamp
+            )
+            tenant.statuses = self.checkpoint.last_statuses(token)
+        self.tenants.append(tenant)
+        if self._running:
+            self._start(tenant)
+        return tenant
+
+    def remove_tenant(self, token) -> None:
+        """Stops polling a subscription; queued messages are still sent."""
+        for tenant in self.tenants:
+            if tenant.subscription.token == token:
+                self.tenants.remove(tenant)
+                break
+        task = self._tasks.pop(token, None)
+        if task is not None:
+            task.cancel()
+
+    def _start(self, tenant) -> None:
+        self._tasks[tenant.subscription.token] = asyncio.ensure_future(
+            self._run_tenant(tenant, spread=True)
+        )
+
+    async def _call(self, func, *args):
+        """Runs a blocking call in the engine thread pool.
+
+        The call sees the caller's context, the cycle deadline included,
+        and is tracked by the heartbeat while it runs.
+        """
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(
+            self._executor, context.run, self._tracked, func, *args
+        )
+
+    def _tracked(self, func, *args):
+        with self.heartbeat.running(getattr(func, '__name__', repr(func))):
+            return func(*args)
+
+    async def _within(self, deadline, stage, awaitable):
+        """Awaits no longer than the cycle has left."""
+        try:
+            return await asyncio.wait_for(awaitable, deadline.remaining())
+        except asyncio.TimeoutError:
+            raise DeadlineExceeded(stage, deadline.budget) from None
+
+    async def poll(self, tenant) -> None:
+        """One polling cycle for a single tenant."""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        subscription = tenant.subscription
+        for summary in tenant.errors.flush():
+            self.outbox.put(subscription.owner_chat_id, summary)
+        async with self._semaphore:
+            metrics.POLLS.inc()
+            # Бюджет считаем с момента, когда цикл получил слот
+            deadline = Deadline(self.cycle_budget)
+            started = time.perf_counter()
+            try:
+                with applied(deadline):
+                    if self.stream:
+                        await self._poll_stream(tenant, deadline)
+                    else:
+                        await self._poll_answer(tenant, deadline)
+            except Exception as error:
+                self._handle_failure(tenant, error)
+            else:
+                tenant.failures = 0
+            finally:
+                metrics.CYCLE_SECONDS.observe(time.perf_counter() - started)
+                self.heartbeat.beat(cycle=True)
+
+    def _handle_failure(self, tenant, error) -> None:
+        """Applies the policy of `policies.POLICIES` to a failed poll."""
+        action = policy_for(error)
+        if isinstance(error, DeadlineExceeded):
+            metrics.CYCLES_ABANDONED.inc(error.stage)
+        if action == DEGRADE:
+            # Дёшево пропускаем цикл: без трейсбека и сообщения в чат
+            logger.debug(error)
+            return
+        metrics.POLL_ERRORS.inc(type(error).__name__)
+        tenant.schedule.record_failure(error)
+        logger.exception(error)
+        owner_chat_id = tenant.subscription.owner_chat_id
+        if action == STOP:
+            self.outbox.put(owner_chat_id, f'Опрос остановлен: {error}')
+            self.stop_tenant(tenant)
+            return
+        if action == RETRY and tenant.failures < RETRY_ATTEMPTS:
+            tenant.retry_in = retry_delay(tenant.failures)
+            tenant.failures += 1
+            return
+        message = tenant.errors.report(error)
+        if message is not None:
+            self.outbox.put(owner_chat_id, message)
+
+    def stop_tenant(self, tenant) -> None:
+        """Stops polling a tenant from inside its own cycle."""
+        logger.critical(f'Polling of {tenant.subscription.owner_chat_id} '
+                        f'stopped')
+        tenant.stopped = True
+        if tenant in self.tenants:
+            self.tenants.remove(tenant)
+        self._tasks.pop(tenant.subscription.token, None)
+
+    async def _poll_answer(self, tenant, deadline) -> None:
+        started = time.perf_counter()
+        response = await self._within(deadline, 'fetch', self._call(
+            self.fetch, tenant.subscription.token, tenant.current_timestamp
+        ))
+        metrics.record_fetch(started)
+        started = time.perf_counter()
+        self._enqueue_changes(tenant, response, deadline)
+        metrics.PARSE_SECONDS.observe(time.perf_counter() - started)
+
+    async def _poll_stream(self, tenant, deadline) -> None:
+        started = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        since = tenant.current_timestamp
+        held, statuses, current_date = await self._within(
+            deadline, 'fetch',
+            self._call(self._stream_changes, tenant, loop, deadline)
+        )
+        metrics.record_fetch(started)
+        tenant.schedule.record_statuses(statuses)
+        tenant.current_timestamp = current_date
+        if held is None:
+            self._save(tenant, None, current_date)
+        else:
+            self._put(tenant, *held, current_date, deadline, since)
+
+    def _stream_changes(self, tenant, loop, deadline=None):
+        """Walks a streamed answer in a worker thread.
+
+        Homeworks are handled in answer order. Each message is queued
+        once the next change is found, so that the last one, returned
+        to the event loop, can carry the checkpoint of `current_date`.
+        """
+        since = tenant.current_timestamp
+        stream = self.fetch(tenant.subscription.token, since)
+        held = None
+        statuses = []
+        try:
+            for payload in stream:
+                if deadline is not None:
+                    deadline.check('fetch')
+                homework = Homework.from_api(payload)
+                key = homework_key(homework)
+                if tenant.statuses.get(key) == homework.status:
+                    continue
+                message, error = self._render(homework)
+                tenant.statuses[key] = homework.status
+                if error is not None:
+                    loop.call_soon_threadsafe(
+                        self._report, tenant, homework, error
+                    )
+                    continue
+                self._remember(tenant, homework)
+                statuses.append(homework.status)
+                if held is not None:
+                    loop.call_soon_threadsafe(
+                        self._put, tenant, *held, None, deadline, since
+                    )
+                held = (homework, message)
+        except Exception:
+            # Статус уже в индексе, значит сообщение надо отправить
+            if held is not None:
+                loop.call_soon_threadsafe(
+                    self._put, tenant, *held, None, deadline, since
+                )
+            raise
+        if held is None:
+            parse_status(None)
+        statuses.reverse()
+        return held, statuses, stream.fields['current_date']
+
+    def _enqueue_changes(self, tenant, response, deadline=None) -> None:
+        """Queues a message for every status transition in the answer."""
+        homeworks = parse_homeworks(response)
+        self.status_cache.update(tenant.subscription.token, homeworks)
+        changed = new_statuses(homeworks, tenant.statuses)
+        if not changed:
+            parse_status(None)
+        # Сначала рендерим всё: до проверки срока состояние не трогаем
+        rendered = [
+            (homework, *self._render(homework)) for homework in changed
+        ]
+        if deadline is not None:
+            # Дальше состояние меняется, бросить цикл можно только тут
+            deadline.check('parse')
+        messages = []
+        for homework, message, error in rendered:
+            if error is None:
+                messages.append((homework, message))
+            else:
+                self._report(tenant, homework, error)
+        tenant.schedule.record_statuses(
+            [homework.status for homework, _ in messages]
+        )
+        current_date = response['current_date']
+        since = tenant.current_timestamp
+        tenant.current_timestamp = current_date
+        if self.timeline is not None:
+            for homework, _ in messages:
+                self.timeline.append(
+                    tenant.subscription.token, homework, current_date
+                )
+        if not messages:
+            self._save(tenant, None, current_date)
+        for number, (homework, message) in enumerate(messages):
+            tenant.statuses[homework_key(homework)] = homework.status
+            # Дату сохраняем после последнего сообщения цикла
+            last = number == len(messages) - 1
+            self._put(
+                tenant, homework, message, current_date if last else None,
+                deadline, since
+            )
+
+    def _remember(self, tenant, homework) -> None:
+        """Puts a streamed transition into the timeline and status cache."""
+        if self.timeline is not None:
+            self.timeline.append(
+                tenant.subscription.token, homework, time.time()
+            )
+        self.status_cache.update(tenant.subscription.token, [homework])
+
+    @staticmethod
+    def _render(homework):
+        """`(message, None)`, or `(None, error)` for a broken homework."""
+        try:
+            return parse_status(homework), None
+        except (HomeworkStatusError, KeyNotExistsError) as error:
+            return None, error
+
+    def _report(self, tenant, homework, error) -> None:
+        """Reports a homework that cannot be rendered and moves past it.
+
+        Its status goes into the index like a sent one, so the same
+        answer does not fail again and hold back the other transitions.
+        """
+        logger.error(f'Homework {homework.key} skipped: {error}')
+        tenant.statuses[homework_key(homework)] = homework.status
+        self._save(tenant, homework, None)
+        message = tenant.errors.report(error)
+        if message is not None:
+            self.outbox.put(tenant.subscription.owner_chat_id, message)
+
+    def _put(self, tenant, homework, message, current_date, deadline=None,
+             since=None) -> None:
+        """Queues a status message that checkpoints itself once sent."""
+        self.outbox.put_many(
+            tenant.subscription.chat_ids, message,
+            on_sent=partial(self._save, tenant, homework, current_date),
+            on_dropped=partial(self._forget, tenant, homework, since,
+                               deadline),
+            deadline=deadline,
+            idempotency=(homework.key, homework.status, homework.date_updated)
+        )
+
+    def _forget(self, tenant, homework, since, deadline) -> None:
+        """Lets the next cycle find a transition nobody was told about."""
+        tenant.statuses.pop(homework_key(homework), None)
+        if since is not None:
+            tenant.current_timestamp = min(tenant.current_timestamp, since)
+        if deadline is not None and deadline.expired:
+            metrics.CYCLES_ABANDONED.inc('send')
+
+    def _save(self, tenant, homework, current_date) -> None:
+        """Checkpoints what has actually been sent."""
+        if self.checkpoint is None:
+            return
+        token = tenant.subscription.token
+        if homework is not None:
+            self.checkpoint.save_status(
+                token, homework_key(homework), homework.status
+            )
+        if current_date is not None:
+            self.checkpoint.save_date(token, current_date)
+
+    async def _send(self, chat_id, message) -> None:
+        started = time.perf_counter()
+        try:
+            await self._call(self.send, self.bot, chat_id, message)
+        except Exception as error:
+            metrics.SEND_ERRORS.inc(type(error).__name__)
+            raise
+        metrics.record_send(started)
+
+    async def poll_all(self) -> None:
+        """One polling cycle for every tenant, waiting for the sends."""
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self.outbox.start()
+        try:
+            await asyncio.gather(
+                *(self.poll(tenant) for tenant in self.tenants)
+            )
+            await self.outbox.join()
+        finally:
+            await self.outbox.stop()
+
+    async def _run_tenant(self, tenant, spread=False) -> None:
+        """Polls a tenant on its schedule until it is stopped.
+
+        With `spread` the first poll waits for the tenant's own phase of
+        the interval, so tenants started together do not poll together.
+        Every later poll is shifted by a deterministic jitter.
+        """
+        token = tenant.subscription.token
+        if spread:
+            await self._sleep(token, tenant.schedule.start_at(phase(token)))
+        cycle = 0
+        while not tenant.stopped:
+            await self.poll(tenant)
+            cycle += 1
+            delay = tenant.schedule.delay(jitter(token, cycle))
+            if tenant.retry_in is not None:
+                # Расписание сдвигаем всё равно, чтобы после удачного
+                # повтора не опросить сразу ещё раз
+                delay = min(delay, tenant.retry_in)
+                tenant.retry_in = None
+            await self._sleep(token, delay)
+
+    async def _sleep(self, token, delay) -> None:
+        """Waits on the timing wheel instead of a timer per tenant."""
+        future = asyncio.get_running_loop().create_future()
+        self._waiting[token] = future
+        self.wheel.schedule(token, self.wheel.clock() + delay)
+        if self._ticker is None or self._ticker.done():
+            self._ticker = asyncio.ensure_future(self._tick_forever())
+        try:
+            await future
+        finally:
+            self.wheel.cancel(token)
+            if self._waiting.get(token) is future:
+                del self._waiting[token]
+
+    async def _tick_forever(self) -> None:
+        while self._waiting:
+            for token in self.wheel.advance():
+                future = self._waiting.get(token)
+                if future is not None and not future.done():
+                    future.set_result(None)
+            await asyncio.sleep(self.wheel.next_tick())
+
+    async def run_forever(self) -> None:
+        """Polls all tenants until cancelled."""
+        logger.info(f'Polling {len(self.tenants)} subscriptions')
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self.outbox.start()
+        self._running = True
+        for tenant in self.tenants:
+            self._start(tenant)
+        beating = asyncio.ensure_future(self._beat_forever())
+        try:
+            # Тенанты добавляются и снимаются на ходу, ждём отмены
+            await asyncio.get_running_loop().create_future()
+        finally:
+            self._running = False
+            beating.cancel()
+            if self._ticker is not None:
+                self._ticker.cancel()
+            for task in self._tasks.values():
+                task.cancel()
+            self._tasks.clear()
+
+    async def _beat_forever(self) -> None:
+        """Beats between cycles: a long poll interval is not a stall."""
+        while True:
+            self.heartbeat.beat()
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+
+    def run(self) -> None:
+        """Blocking entry point for `main()`."""
+        try:
+            asyncio.run(self.run_forever())
+        finally:
+            self._executor.shutdown(wait=False)
@@ -67,3 +67,25 @@ class CheckTokensError(Exception):
         super().__init__(
             f'Failed beacause {var} is not set.'
         )
+
+
+class CircuitOpenError(Exception):
+    """Exception if a request is skipped by the open circuit breaker."""
+
+    def __init__(self, endpoint, retry_in) -> None:
+        self.endpoint = endpoint
+        self.retry_in = retry_in
+        super().__init__(
+            f'Circuit for {endpoint} is open, next probe in {retry_in:.0f} s'
+        )
+
+
+class DeadlineExceeded(Exception):
+    """Exception if a polling cycle runs out of its time budget."""
+
+    def __init__(self, stage, budget) -> None:
+        self.stage = stage
+        self.budget = budget
+        super().__init__(
+            f'Cycle budget of {budget:.0f} s ran out at {stage}'
+        )
@@ -1,15 +1,10 @@
+from functools import partial
 import logging
 from http import HTTPStatus
 import os
-import json
-import requests
 import sys
-import telegram
-import time
-from traceback import format_exc
-
-from dotenv import load_dotenv
 
+from deadline import current as current_deadline
 from exceptions import (
     ApiNotFoundError, ApiConnectionFailed, HomeworksNotListError,
     KeyNotExistsError, ResponseNotDictError, HomeworkStatusError,
@@ -17,27 +12,22 @@ from exceptions import (
 )
 
 
-load_dotenv()
-
-
 PRACTICUM_TOKEN = os.getenv('PRACTICUM_TOKEN')
 TELEGRAM_TOKEN = os.getenv('TELEGRAM_TOKEN')
 TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID')
+SUBSCRIPTIONS_FILE = os.getenv('SUBSCRIPTIONS_FILE')
 MANDATORY_ENV_VARS = ['PRACTICUM_TOKEN', 'TELEGRAM_TOKEN', 'TELEGRAM_CHAT_ID']
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
-handler = logging.StreamHandler(sys.stdout)
-handler.setLevel(logging.DEBUG)
-formatter = logging.Formatter(
-    '%(asctime)s - %(name)s - %(levelname)s.%(funcName)s: %(message)s'
-)
-handler.setFormatter(formatter)
-logger.addHandler(handler)
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s.%(funcName)s: %(message)s'
 
 
 RETRY_TIME = 555
-ENDPOINT = 'https://practicum.yandex.ru/api/user_api/homework_statuses/'
+ENDPOINT = os.getenv(
+    'PRACTICUM_ENDPOINT',
+    'https://practicum.yandex.ru/api/user_api/homework_statuses/'
+)
 HEADERS = {'Authorization': f'OAuth {PRACTICUM_TOKEN}'}
 
 
@@ -50,12 +40,24 @@ HOMEWORK_STATUSES = {
 
 def send_message(bot, message):
     """Sends a message to Telegram chat."""
+    send_to_chat(bot, TELEGRAM_CHAT_ID, message)
+
+
+def send_to_chat(bot, chat_id, message):
+    """Sends a message to the given Telegram chat."""
     if message is None:
         return
+    # Не дольше, чем осталось циклу, который отправляет сообщение
+    kwargs = {}
+    deadline = current_deadline()
+    if deadline is not None:
+        deadline.check('send')
+        kwargs['timeout'] = deadline.remaining()
     # Тут сделал логирование, исключение обработается потом в цикле, так?
     bot.send_message(
-        chat_id=TELEGRAM_CHAT_ID,
-        text=message
+        chat_id=chat_id,
+        text=message,
+        **kwargs
     )
     if 'Сбой' in message:
         logger.info('FAILURE message sending')
@@ -65,19 +67,81 @@ def send_message(bot, message):
 
 def get_api_answer(current_timestamp) -> dict:
     """Makes a request to API -> converts API answer to python."""
+    return request_homeworks(PRACTICUM_TOKEN, current_timestamp)
+
+
+def request_homeworks(token, current_timestamp) -> dict:
+    """Makes a request to API on behalf of the token owner."""
+    return _request(token, current_timestamp).json()
+
+
+def stream_homeworks(token, current_timestamp):
+    """Same request, but the answer is parsed while it is downloaded.
+
+    Returns a `HomeworkStream`: iterate it for the homeworks, then read
+    `current_date` from its `fields`.
+    """
+    from jsonstream import CHUNK_SIZE, HomeworkStream
+
+    from replay import get_recorder
+
+    response = _request(token, current_timestamp, stream=True)
+    chunks = response.iter_content(CHUNK_SIZE)
+    recorder = get_recorder()
+    if recorder is not None:
+        chunks = recorder.tee(
+            token, current_timestamp, response.status_code, chunks
+        )
+    return HomeworkStream(chunks)
+
+
+def _request(token, current_timestamp, **kwargs):
+    # Импорт тут, потому что эти модули сами импортируют logger отсюда
+    from breaker import get_breaker
+
+    return get_breaker(ENDPOINT).call(
+        _checked_get, token, current_timestamp, **kwargs
+    )
+
+
+def _checked_get(token, current_timestamp, **kwargs):
     # Наконец-то я понял! Спасибо!
     timestamp = current_timestamp
     params = {'from_date': timestamp}
-    response = requests.get(ENDPOINT, headers=HEADERS, params=params)
+    headers = {'Authorization': f'OAuth {token}'}
+    from replay import get_recorder
+    from transport import get_transport
+
+    response = get_transport().get(
+        ENDPOINT, headers=headers, params=params, **kwargs
+    )
+    stream = kwargs.get('stream')
+    recorder = get_recorder()
+    if recorder is not None and not stream:
+        recorder.record(
+            token, timestamp, response.status_code, response.text
+        )
+    if response.status_code != HTTPStatus.OK and stream:
+        response.close()
+        if recorder is not None:
+            recorder.record(token, timestamp, response.status_code, '')
     if response.status_code == HTTPStatus.NOT_FOUND:
         raise ApiNotFoundError
     if response.status_code != HTTPStatus.OK:
         raise ApiConnectionFailed(response.status_code)
-    return response.json()
+    return response
 
 
 def check_response(response) -> list:
     """Checking API answer."""
+    homeworks = check_homeworks(response)
+    if not homeworks:
+        return []
+    return homeworks[0]
+
+
+def check_homeworks(response) -> list:
+    """Checking API answer -> every homework in it."""
     if not isinstance(response, dict):
         raise ResponseNotDictError(response)
     if 'homeworks' not in response:
@@ -87,7 +151,96 @@ def check_response(response) -> list:
     homework = response.get('homeworks')
     if not isinstance(homework, list):
         raise HomeworksNotListError(homework)
-    return homework[0]
+    return homework
+
+
+# Одинаковые статусы всех работ ссылаются на эти строки
+_STATUSES = {status: status for status in HOMEWORK_STATUSES}
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class Homework:
+    """What the bot keeps of a homework from the API answer.
+
+    Parsed once from the payload; fields not listed here are dropped.
+    Statuses and lesson names are shared between records and `key` with
+    the status indexes, so a tracked homework costs well under half of
+    the payload dict with its own strings. Homework names carry the
+    student login and are not worth interning.
+
+    Read-only mapping access (`get`, `[]`, `in`) works like on the
+    payload, a missing field being one that is None.
+    """
+
+    __slots__ = (
+        'id', 'homework_name', 'lesson_name', 'status', 'date_updated', 'key'
+    )
+
+    def __init__(self, id=None, homework_name=None, lesson_name=None,
+                 status=None, date_updated=None) -> None:
+        """Interns the lesson and status strings shared by many records."""
+        self.id = id
+        self.homework_name = homework_name
+        self.lesson_name = _intern(lesson_name)
+        self.status = _STATUSES.get(status, status)
+        self.date_updated = date_updated
+        self.key = str(homework_name if id is None else id)
+
+    @classmethod
+    def from_api(cls, payload) -> 'Homework':
+        """Record of one item of the `homeworks` list."""
+        if isinstance(payload, cls):
+            return payload
+        if not isinstance(payload, dict):
+            raise KeyNotExistsError('homework_name')
+        return cls(
+            payload.get('id'), payload.get('homework_name'),
+            payload.get('lesson_name'), payload.get('status'),
+            payload.get('date_updated')
+        )
+
+    def get(self, field, default=None):
+        """Like `dict.get`: `default` for a missing or None field."""
+        value = getattr(self, field, None) if field in self.__slots__ else None
+        return default if value is None else value
+
+    def __getitem__(self, field):
+        """Like a dict: `KeyError` for a missing or None field."""
+        value = self.get(field)
+        if value is None:
+            raise KeyError(field)
+        return value
+
+    def __contains__(self, field) -> bool:
+        """Whether the field is present, i.e. not None."""
+        return self.get(field) is not None
+
+    def __repr__(self) -> str:
+        """Id, name and status, enough to tell records apart in logs."""
+        return (f'Homework(id={self.id!r}, '
+                f'homework_name={self.homework_name!r}, '
+                f'status={self.status!r})')
+
+
+def parse_homeworks(response) -> list:
+    """Checking API answer -> a `Homework` for every homework in it."""
+    return [Homework.from_api(homework)
+            for homework in check_homeworks(response)]
+
+
+def new_statuses(homeworks, last_statuses) -> list:
+    """Homeworks whose status differs from the last known one.
+
+    The API lists the newest changes first, so the result is reversed
+    to notify in the order things happened.
+    """
+    return [
+        homework for homework in reversed(homeworks)
+        if last_statuses.get(homework_key(homework)) != homework.get('status')
+    ]
 
 
 def parse_status(homework) -> str:
@@ -108,38 +261,154 @@ def parse_status(homework) -> str:
     return f'Изменился статус проверки работы "{homework_name}". {verdict}'
 
 
+def homework_key(homework) -> str:
+    """Identifies a homework across API answers."""
+    if isinstance(homework, Homework):
+        return homework.key
+    return str(homework.get('id', homework.get('homework_name')))
+
+
+def configure() -> None:
+    """Builds the runtime configuration: .env, tokens and logging.
+
+    Kept out of import time so that tests and one-shot tools do not pay
+    for python-dotenv and handler setup.
+    """
+    global PRACTICUM_TOKEN, TELEGRAM_TOKEN, TELEGRAM_CHAT_ID
+    global SUBSCRIPTIONS_FILE, ENDPOINT, HEADERS
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    PRACTICUM_TOKEN = os.getenv('PRACTICUM_TOKEN')
+    TELEGRAM_TOKEN = os.getenv('TELEGRAM_TOKEN')
+    TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID')
+    SUBSCRIPTIONS_FILE = os.getenv('SUBSCRIPTIONS_FILE')
+    ENDPOINT = os.getenv('PRACTICUM_ENDPOINT', ENDPOINT)
+    HEADERS = {'Authorization': f'OAuth {PRACTICUM_TOKEN}'}
+    setup_logging()
+
+
+def setup_logging() -> None:
+    """Sends records to stdout via the root logger.
+
+    The root logger is used because `python homework.py` runs this module
+    as `__main__` while the other modules import it as `homework`. Records
+    are sampled and queued in the caller's thread and written by a
+    background thread, so a slow stdout does not slow down polling.
+    """
+    from logpipe import background_handler
+
+    root = logging.getLogger()
+    if any(getattr(handler, 'homework_bot', False)
+           for handler in root.handlers):
+        return
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setLevel(logging.DEBUG)
+    handler, _ = background_handler(stream, LOG_FORMAT)
+    handler.homework_bot = True
+    root.addHandler(handler)
+
+
 def check_tokens() -> bool:
     """Checks the availability of env variables."""
     return PRACTICUM_TOKEN and TELEGRAM_TOKEN and TELEGRAM_CHAT_ID
 
 
+def build_engine(subscriptions, worker=None):
+    """Builds a `PollingEngine` with its bot, checkpoint and metrics server.
+
+    A sharded worker gets its own checkpoint file, recording file,
+    timeline store and metrics port, all suffixed with the worker index.
+    Every engine gets a watchdog; /healthz is served next to /metrics.
+    The notification ledger is shared, so that a tenant moving between
+    workers is not notified twice.
+    """
+    import telegram
+    from telegram.utils.request import Request
+
+    from checkpoint import CHECKPOINT_FILE, CheckpointStore
+    from engine import PollingEngine
+    from ledger import LEDGER_FILE, NotificationLedger
+    from liveness import HEALTH_PORT, Heartbeat, Watchdog
+    from metrics import METRICS_PORT, serve
+    from outbox import SEND_WORKERS
+
+    import replay
+    import timeline as timeline_module
+
+    checkpoint_file = CHECKPOINT_FILE
+    metrics_port = int(METRICS_PORT or HEALTH_PORT or 0)
+    if worker is not None:
+        checkpoint_file = f'{CHECKPOINT_FILE}.{worker}'
+        if replay.RECORD_FILE:
+            replay.RECORD_FILE = replay.worker_path(replay.RECORD_FILE, worker)
+        metrics_port = metrics_port and metrics_port + worker
+    heartbeat = Heartbeat()
+    watchdog = Watchdog(heartbeat).start()
+    if metrics_port:
+        serve(metrics_port, health=partial(heartbeat.health, watchdog.limit))
+    # По умолчанию в пуле одно соединение, воркеры ждали бы друг друга;
+    # ещё 8 нужны Updater для команд
+    bot = telegram.Bot(
+        token=TELEGRAM_TOKEN, request=Request(con_pool_size=SEND_WORKERS + 8)
+    )
+    timeline = None
+    if timeline_module.TIMELINE_DIR:
+        timeline_dir = timeline_module.TIMELINE_DIR
+        if worker is not None:
+            timeline_dir = os.path.join(timeline_dir, f'worker-{worker}')
+        timeline = timeline_module.TimelineStore(timeline_dir)
+    return PollingEngine(
+        bot, subscriptions, checkpoint=CheckpointStore(checkpoint_file),
+        timeline=timeline, ledger=NotificationLedger(LEDGER_FILE),
+        heartbeat=heartbeat
+    )
+
+
 def main() -> None:
     """The bot logic."""
+    configure()
     if not check_tokens():
         for var in MANDATORY_ENV_VARS:
             if var not in os.environ:
                 logger.critical(CheckTokensError(var))
                 raise CheckTokensError(var)
 
-    bot = telegram.Bot(token=TELEGRAM_TOKEN)
-    current_timestamp = int(time.time())
-    error_filter = None
-
-    while True:
-        try:
-            response = get_api_answer(current_timestamp)
-            current_timestamp = response['current_date']
-            homework = check_response(response)
-            message = parse_status(homework)
-            send_message(bot, message)
-            time.sleep(RETRY_TIME)
-        except (Exception, json.decoder.JSONDecodeError) as error:
-            logger.exception(error)
-            message = f'Сбой в работе программы:{error} {format_exc()}'
-            if message != error_filter:
-                error_filter = message
-                send_message(bot, message)
-            time.sleep(RETRY_TIME)
+    # Импорт тут, чтобы не было циклического импорта с engine.py
+    # и чтобы тяжёлые зависимости грузились только при запуске бота
+    from telegram.ext import Updater
+
+    from commands import BOT_COMMANDS, BotCommands
+    from engine import Subscription, load_subscriptions, parse_chat_ids
+    from supervisor import WORKER_PROCESSES, Supervisor, run_worker
+
+    subscriptions = [
+        Subscription(PRACTICUM_TOKEN, parse_chat_ids(TELEGRAM_CHAT_ID))
+    ]
+    if SUBSCRIPTIONS_FILE:
+        subscriptions = load_subscriptions(SUBSCRIPTIONS_FILE)
+    if WORKER_PROCESSES > 1:
+        Supervisor(
+            WORKER_PROCESSES,
+            partial(
+                run_worker, subscriptions=subscriptions,
+                make_engine=partial(build_engine, [])
+            )
+        ).run()
+        return
+    engine = build_engine(subscriptions)
+    updater = None
+    if BOT_COMMANDS:
+        updater = Updater(bot=engine.bot, use_context=True)
+        BotCommands(engine.status_cache, subscriptions).register(
+            updater.dispatcher
+        )
+        updater.start_polling()
+    try:
+        engine.run()
+    finally:
+        if updater is not None:
+            updater.stop()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,117 @@
+"""Incremental parsing of the homework statuses answer."""
+import codecs
+import json
+
+from exceptions import (
+    HomeworksNotListError, KeyNotExistsError, ResponseNotDictError
+)
+
+
+CHUNK_SIZE = 64 * 1024
+WHITESPACE = ' \t\n\r'
+
+_decoder = json.JSONDecoder()
+
+
+class HomeworkStream:
+    """Yields the `homeworks` of an answer one at a time.
+
+    `chunks` is any iterable of bytes, e.g. `response.iter_content()`.
+    Only the unparsed tail of the body is kept in memory. Other top-level
+    keys (`current_date`) end up in `fields` once iteration is over.
+    Raises the same exceptions as `check_homeworks`.
+    """
+
+    def __init__(self, chunks) -> None:
+        """Nothing is read until iteration starts."""
+        self.fields = {}
+        self._chunks = iter(chunks)
+        self._text = codecs.getincrementaldecoder('utf-8')()
+        self._buffer = ''
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self) -> bool:
+        """Reads one more chunk; False at the end of the body."""
+        if self._eof:
+            return False
+        try:
+            chunk = self._text.decode(next(self._chunks))
+        except StopIteration:
+            self._eof = True
+            chunk = self._text.decode(b'', final=True)
+        self._buffer = self._buffer[self._pos:] + chunk
+        self._pos = 0
+        return bool(chunk) or not self._eof
+
+    def _peek(self) -> str:
+        """Next significant character, or '' at the end of the body."""
+        while True:
+            while (self._pos < len(self._buffer)
+                   and self._buffer[self._pos] in WHITESPACE):
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                return ''
+
+    def _take(self, expected) -> str:
+        char = self._peek()
+        if char not in expected:
+            raise json.JSONDecodeError(
+                f'Expecting one of {expected!r}', self._buffer, self._pos
+            )
+        self._pos += 1
+        return char
+
+    def _value(self):
+        self._peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # Число в конце буфера могло оборваться на середине
+            if end == len(self._buffer) and self._fill():
+                continue
+            self._pos = end
+            return value
+
+    def __iter__(self):
+        """Parses the answer; can be iterated only once."""
+        if self._peek() != '{':
+            raise ResponseNotDictError(self._value())
+        self._pos += 1
+        found = False
+        if self._peek() == '}':
+            self._pos += 1
+        else:
+            while True:
+                key = self._value()
+                self._take(':')
+                if key == 'homeworks':
+                    found = True
+                    yield from self._homeworks()
+                else:
+                    self.fields[key] = self._value()
+                if self._take(',}') == '}':
+                    break
+        if not found:
+            raise KeyNotExistsError('homeworks')
+
+    def _homeworks(self):
+        if self._peek() != '[':
+            homeworks = self._value()
+            if homeworks:
+                raise HomeworksNotListError(homeworks)
+            return
+        self._pos += 1
+        if self._peek() == ']':
+            self._pos += 1
+            return
+        while True:
+            yield self._value()
+            if self._take(',]') == ']':
+                return
@@ -0,0 +1,199 @@
+"""Ledger of delivered notifications shared by every bot process."""
+import fcntl
+import hashlib
+import json
+import os
+import socket
+import threading
+import time
+
+from checkpoint import CHECKPOINT_FSYNC, COMPACT_EVERY
+from homework import logger
+
+
+LEDGER_FILE = os.getenv('LEDGER_FILE', 'ledger.log')
+# Сколько ждать отправку, начатую другим процессом, прежде чем повторить
+LEDGER_CLAIM_TTL = float(os.getenv('LEDGER_CLAIM_TTL', 300))
+
+# ["c","<16 hex>"]
+COMMIT_PREFIX = b'["c","'
+COMMIT_LENGTH = 24
+
+# claim() отвечает одним из трёх
+SENT = 'sent'
+BUSY = 'busy'
+CLAIMED = 'claimed'
+
+
+def notification_key(chat_id, homework, status, date_updated) -> str:
+    """Idempotency key of one status message to one chat."""
+    value = '\x1f'.join(
+        str(part) for part in (chat_id, homework, status, date_updated)
+    )
+    return hashlib.blake2b(value.encode(), digest_size=8).hexdigest()
+
+
+class NotificationLedger:
+    """Append-only log of claimed and committed notifications.
+
+    A message is claimed before it is sent and committed after, so a
+    crash in between leaves a claim instead of nothing. The log is
+    replayed into a set of sent keys and a dict of open claims, which
+    answer every check in O(1); records appended by other processes are
+    read from where this one stopped. Check and claim run under an
+    exclusive `flock`, so processes sharing the file never both send.
+    A claim older than `claim_ttl` is considered dead and is taken over:
+    after a crash the message goes out again rather than never.
+    `flock` does not exclude threads of one process, a mutex does.
+    """
+
+    def __init__(self, path=LEDGER_FILE, claim_ttl=LEDGER_CLAIM_TTL,
+                 compact_every=COMPACT_EVERY, fsync=CHECKPOINT_FSYNC,
+                 clock=time.time) -> None:
+        """Opens or creates the log and replays it."""
+        self.path = path
+        self.claim_ttl = claim_ttl
+        self.compact_every = compact_every
+        self.fsync = fsync
+        self.clock = clock
+        self.owner = f'{socket.gethostname()}:{os.getpid()}'
+        self.sent = set()
+        self.claims = {}
+        self._records = 0
+        self._mutex = threading.Lock()
+        self._lock = open(f'{path}.lock', 'a')
+        # Создаёт лог, если его ещё нет; _refresh откроет его заново
+        self._file = open(path, 'a', encoding='utf-8')
+        self._reader = None
+        self._offset = 0
+        self._inode = None
+        self._refresh()
+
+    def _apply(self, record) -> None:
+        kind, key = record[0], record[1]
+        if kind == 'c':
+            self.sent.add(key)
+            self.claims.pop(key, None)
+        elif kind == 'p':
+            self.claims[key] = (record[2], record[3])
+        elif kind == 'x':
+            self.claims.pop(key, None)
+        else:
+            raise ValueError(kind)
+
+    def _refresh(self) -> None:
+        """Applies what has been appended since the last read."""
+        inode = os.stat(self.path).st_ino
+        if inode != self._inode:
+            # Лог сжали и подменили, читаем новый с начала
+            if self._reader is not None:
+                self._reader.close()
+            self._reader = open(self.path, 'rb')
+            self._inode = inode
+            self._offset = 0
+            self._records = 0
+            self.sent.clear()
+            self.claims.clear()
+            self._file.close()
+            self._file = open(self.path, 'a', encoding='utf-8')
+        self._reader.seek(self._offset)
+        data = self._reader.read()
+        # Недописанную последнюю строку дочитаем в следующий раз
+        data = data[:data.rfind(b'\n') + 1]
+        self._offset += len(data)
+        for line in data.splitlines():
+            if len(line) == COMMIT_LENGTH and line.startswith(COMMIT_PREFIX):
+                # Почти весь лог такой, json.loads тут в разы медленнее
+                key = line[6:22].decode()
+                self.sent.add(key)
+                self.claims.pop(key, None)
+            else:
+                try:
+                    self._apply(json.loads(line))
+                except (ValueError, IndexError):
+                    continue
+            self._records += 1
+
+    def _append(self, record) -> None:
+        self._file.write(json.dumps(record, separators=(',', ':')) + '\n')
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+
+    def _locked(self, *records) -> None:
+        with self._mutex:
+            self._flocked(*records)
+
+    def _flocked(self, *records) -> None:
+        fcntl.flock(self._lock.fileno(), fcntl.LOCK_EX)
+        try:
+            self._refresh()
+            for record in records:
+                self._append(record)
+            self._refresh()
+            if self._records > self.compact_every:
+                self._compact()
+        finally:
+            fcntl.flock(self._lock.fileno(), fcntl.LOCK_UN)
+
+    def claim(self, key) -> str:
+        """`SENT`, `BUSY` (another process is sending it) or `CLAIMED`."""
+        if key in self.sent:
+            return SENT
+        with self._mutex:
+            return self._claim(key)
+
+    def _claim(self, key) -> str:
+        fcntl.flock(self._lock.fileno(), fcntl.LOCK_EX)
+        try:
+            self._refresh()
+            if key in self.sent:
+                return SENT
+            claim = self.claims.get(key)
+            if claim is not None and claim[0] != self.owner and (
+                    self.clock() - claim[1] < self.claim_ttl):
+                return BUSY
+            if claim is not None and claim[0] != self.owner:
+                logger.warning(f'Notification {key} claimed by {claim[0]} '
+                               f'was never committed, sending again')
+            self._append(['p', key, self.owner, self.clock()])
+            self._refresh()
+        finally:
+            fcntl.flock(self._lock.fileno(), fcntl.LOCK_UN)
+        return CLAIMED
+
+    def commit(self, key) -> None:
+        """Records a delivered notification."""
+        self._locked(['c', key])
+
+    def release(self, key) -> None:
+        """Gives up a claim whose message was not delivered."""
+        claim = self.claims.get(key)
+        if claim is not None and claim[0] == self.owner:
+            self._locked(['x', key])
+
+    def _snapshot(self):
+        for key in self.sent:
+            yield ['c', key]
+        for key, (owner, claimed) in self.claims.items():
+            yield ['p', key, owner, claimed]
+
+    def _compact(self) -> None:
+        """Rewrites the log with the live keys; the caller holds the lock."""
+        tmp_path = f'{self.path}.tmp'
+        records = 0
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            for record in self._snapshot():
+                file.write(json.dumps(record, separators=(',', ':')) + '\n')
+                records += 1
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, self.path)
+        self.compact_every = max(self.compact_every, 2 * records)
+        self._refresh()
+
+    def close(self) -> None:
+        """Closes the log and lock files."""
+        self._file.close()
+        self._reader.close()
+        self._lock.close()
@@ -0,0 +1,147 @@
+"""Heartbeat of the polling loop and a watchdog that notices it stop."""
+import os
+import sys
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+
+import metrics
+from homework import RETRY_TIME, logger
+
+
+# Зависанием считаем тишину дольше стольких RETRY_TIME
+WATCHDOG_MULTIPLE = float(os.getenv('WATCHDOG_MULTIPLE', 3))
+WATCHDOG_INTERVAL = float(os.getenv('WATCHDOG_INTERVAL', 30))
+# /healthz без METRICS_PORT; с ним отвечает сервер метрик
+HEALTH_PORT = os.getenv('HEALTH_PORT')
+HEARTBEAT_INTERVAL = 10
+
+
+class Heartbeat:
+    """Last sign of life of the event loop and its blocking calls.
+
+    The engine beats after every polling cycle and every
+    `HEARTBEAT_INTERVAL` seconds in between, so an idle bot still beats.
+    Calls sent to the thread pool are tracked while they run: a hung API
+    request stalls a thread while the loop keeps beating.
+    """
+
+    def __init__(self, clock=time.monotonic) -> None:
+        """Counts the first beat from now."""
+        self.clock = clock
+        self.last = clock()
+        self.cycles = 0
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def beat(self, cycle=False) -> None:
+        """Marks the loop alive; `cycle` also counts a finished cycle."""
+        self.last = self.clock()
+        if cycle:
+            self.cycles += 1
+
+    @contextmanager
+    def running(self, name):
+        """Tracks a blocking call for as long as it runs."""
+        token = object()
+        with self._lock:
+            self._calls[token] = (name, self.clock())
+        try:
+            yield
+        finally:
+            with self._lock:
+                del self._calls[token]
+
+    def oldest_call(self):
+        """`(name, seconds running)` of the longest running call or None."""
+        with self._lock:
+            calls = list(self._calls.values())
+        if not calls:
+            return None
+        name, started = min(calls, key=lambda call: call[1])
+        return name, self.clock() - started
+
+    def stall(self, limit):
+        """What has been stuck for longer than `limit` seconds, or None."""
+        silence = self.clock() - self.last
+        if silence > limit:
+            return f'no heartbeat for {silence:.0f} s'
+        call = self.oldest_call()
+        if call is not None and call[1] > limit:
+            return f'{call[0]} running for {call[1]:.0f} s'
+        return None
+
+    def health(self, limit) -> dict:
+        """Body of /healthz."""
+        stall = self.stall(limit)
+        return {
+            'status': 'stalled' if stall else 'ok',
+            'stall': stall,
+            'heartbeat_age': round(self.clock() - self.last, 3),
+            'cycles': self.cycles,
+            'last_fetch': metrics.LAST_FETCH_SUCCESS.value or None,
+            'last_send': metrics.LAST_SEND_SUCCESS.value or None,
+        }
+
+
+def thread_stacks() -> str:
+    """Stacks of every thread, like a Java thread dump."""
+    names = {thread.ident: thread.name for thread in threading.enumerate()}
+    parts = []
+    for ident, frame in sys._current_frames().items():
+        parts.append(f'Thread {names.get(ident, ident)}:\n')
+        parts.extend(traceback.format_stack(frame))
+    return ''.join(parts)
+
+
+class Watchdog:
+    """Daemon thread that dumps all stacks when the heartbeat stalls.
+
+    Reports once per stall and again only after the loop recovers.
+    """
+
+    def __init__(self, heartbeat, limit=WATCHDOG_MULTIPLE * RETRY_TIME,
+                 interval=WATCHDOG_INTERVAL) -> None:
+        """Checks nothing until `start`."""
+        self.heartbeat = heartbeat
+        self.limit = limit
+        self.interval = interval
+        self.stalled = False
+        self._stop = threading.Event()
+        self._thread = None
+
+    def check(self) -> None:
+        """Logs the stacks once when a stall begins and a line when it ends."""
+        stall = self.heartbeat.stall(self.limit)
+        if stall is None:
+            if self.stalled:
+                logger.warning('Polling loop recovered')
+            self.stalled = False
+            return
+        if self.stalled:
+            return
+        self.stalled = True
+        metrics.STALLS.inc()
+        logger.critical(f'Polling loop stalled: {stall}\n{thread_stacks()}')
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception as error:
+                logger.error(f'Watchdog error: {error}')
+
+    def start(self) -> 'Watchdog':
+        """Runs `check` every `interval` seconds in a daemon thread."""
+        self._thread = threading.Thread(
+            target=self._run, name='watchdog', daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stops the thread and waits for it."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
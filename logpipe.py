@@ -0,0 +1,183 @@
+"""Background log emission with sampling of repetitive records."""
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from logging.handlers import QueueHandler, QueueListener
+
+from deduper import fingerprint
+
+
+LOG_JSON = os.getenv('LOG_JSON', '') == '1'
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', 10000))
+LOG_SAMPLE_BURST = int(os.getenv('LOG_SAMPLE_BURST', 10))
+LOG_SAMPLE_WINDOW = float(os.getenv('LOG_SAMPLE_WINDOW', 60))
+SAMPLED_LEVELS = (logging.DEBUG, logging.ERROR)
+SAMPLER_SIZE = 1024
+
+
+def sample_key(record) -> tuple:
+    """Records of one kind: same place, same template or failure."""
+    if record.exc_info and record.exc_info[1] is not None:
+        return record.levelno, fingerprint(record.exc_info[1])
+    message = record.msg if isinstance(record.msg, str) else (
+        type(record.msg).__qualname__
+    )
+    return record.levelno, record.name, record.funcName, message
+
+
+class _Window:
+    __slots__ = ('since', 'passed', 'suppressed')
+
+    def __init__(self, since) -> None:
+        self.since = since
+        self.passed = 0
+        self.suppressed = 0
+
+
+class SamplingFilter(logging.Filter):
+    """Lets through `burst` records of a kind per `window` seconds.
+
+    Only DEBUG and ERROR are sampled: the idle-cycle debug line and the
+    traceback of a failing API. The first record after a window reports
+    how many were dropped in `record.suppressed`.
+    """
+
+    def __init__(self, burst=LOG_SAMPLE_BURST, window=LOG_SAMPLE_WINDOW,
+                 levels=SAMPLED_LEVELS, size=SAMPLER_SIZE,
+                 clock=time.monotonic) -> None:
+        """Starts with no kinds of records seen."""
+        super().__init__()
+        self.burst = burst
+        self.window = window
+        self.levels = levels
+        self.size = size
+        self.clock = clock
+        self._windows = OrderedDict()
+        self._lock = threading.Lock()
+
+    def filter(self, record) -> bool:
+        """False for a record over the burst of its kind."""
+        if record.levelno not in self.levels:
+            return True
+        key = sample_key(record)
+        now = self.clock()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window.since >= self.window:
+                suppressed = window.suppressed if window else 0
+                window = _Window(now)
+                self._windows[key] = window
+                if suppressed:
+                    record.suppressed = suppressed
+            self._windows.move_to_end(key)
+            if len(self._windows) > self.size:
+                self._windows.popitem(last=False)
+            if window.passed >= self.burst:
+                window.suppressed += 1
+                return False
+            window.passed += 1
+            return True
+
+
+class TextFormatter(logging.Formatter):
+    """`LOG_FORMAT` plus the number of sampled out records."""
+
+    def format(self, record) -> str:
+        """The usual line, with the suppressed count appended."""
+        text = super().format(record)
+        suppressed = getattr(record, 'suppressed', 0)
+        if suppressed:
+            text += f' [{suppressed} similar records suppressed]'
+        return text
+
+
+class JsonFormatter(logging.Formatter):
+    """One compact JSON object per line."""
+
+    def format(self, record) -> str:
+        """The record, its traceback and suppressed count as JSON."""
+        entry = {
+            'time': round(record.created, 3),
+            'level': record.levelname,
+            'logger': record.name,
+            'func': record.funcName,
+            'message': record.getMessage(),
+        }
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        suppressed = getattr(record, 'suppressed', 0)
+        if suppressed:
+            entry['suppressed'] = suppressed
+        return json.dumps(entry, ensure_ascii=False, separators=(',', ':'))
+
+
+class BackgroundHandler(QueueHandler):
+    """Puts records on a bounded queue and never waits for it.
+
+    Unlike `QueueHandler.prepare` nothing is formatted here, tracebacks
+    included: the listener thread does it. A full queue drops the
+    record and counts it in `dropped`.
+    """
+
+    def __init__(self, records) -> None:
+        """Puts records on `records`, a bounded queue."""
+        super().__init__(records)
+        self.dropped = 0
+
+    def prepare(self, record):
+        """The record as is; formatting is left to the listener."""
+        return record
+
+    def enqueue(self, record) -> None:
+        """Queues the record or drops it if the queue is full."""
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class BackgroundListener(QueueListener):
+    """Waits for room for its stop sentinel instead of failing."""
+
+    def enqueue_sentinel(self) -> None:
+        """Blocks until the sentinel fits into the queue."""
+        self.queue.put(self._sentinel)
+
+
+def stop_listener(listener) -> None:
+    """Writes out the queued records; safe to call twice."""
+    if listener._thread is not None:
+        listener.stop()
+
+
+def background_handler(target, fmt, json_lines=LOG_JSON,
+                       queue_size=LOG_QUEUE_SIZE, sampler=None):
+    """Handler for the caller's thread and the started listener.
+
+    Records reach `target` from the listener thread, formatted as text
+    with `fmt` or as JSON lines.
+    """
+    target.setFormatter(JsonFormatter() if json_lines else TextFormatter(fmt))
+    handler = BackgroundHandler(queue.Queue(queue_size))
+    handler.addFilter(sampler or SamplingFilter())
+    listener = BackgroundListener(
+        handler.queue, target, respect_handler_level=True
+    )
+    listener.start()
+    # Дописываем очередь при выходе, иначе пропадут последние записи
+    atexit.register(stop_listener, listener)
+
+    def restart_in_child():
+        # Поток-писатель не переживает fork, а замок очереди мог
+        # остаться захваченным: воркеру нужны свои
+        handler.queue = listener.queue = queue.Queue(queue_size)
+        listener._thread = None
+        listener.start()
+
+    os.register_at_fork(after_in_child=restart_in_child)
+    return handler, listener
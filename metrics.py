@@ -0,0 +1,248 @@
+"""Counters and latency histograms in Prometheus text format."""
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from homework import logger
+
+
+METRICS_PORT = os.getenv('METRICS_PORT')
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30
+)
+
+
+def _labels(names, values) -> str:
+    if not names:
+        return ''
+    pairs = ','.join(
+        f'{name}="{value}"' for name, value in zip(names, values)
+    )
+    return f'{{{pairs}}}'
+
+
+class Counter:
+    """Monotonic counter, optionally split by label values.
+
+    Incremented from the event loop and the thread pool while the
+    metrics server thread renders it, so both go through a lock.
+    """
+
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labels=()) -> None:
+        """Starts with no samples."""
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1) -> None:
+        """Adds `amount` to the series of `label_values`."""
+        with self._lock:
+            self.values[label_values] = (
+                self.values.get(label_values, 0) + amount
+            )
+
+    def samples(self):
+        """(name, value) of every labelled series."""
+        with self._lock:
+            values = list(self.values.items())
+        for label_values, value in values:
+            yield self.name + _labels(self.labels, label_values), value
+
+
+class Gauge:
+    """Last set value, or the result of `function` at scrape time."""
+
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, function=None) -> None:
+        """Starts at 0 unless `function` supplies the value."""
+        self.name = name
+        self.documentation = documentation
+        self.value = 0
+        self.function = function
+
+    def set(self, value) -> None:
+        """Replaces the value."""
+        self.value = value
+
+    def samples(self):
+        """The single (name, value) pair."""
+        value = self.function() if self.function else self.value
+        yield self.name, value
+
+
+class Histogram:
+    """Fixed-bucket histogram; `observe` is a bisect and two additions."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation,
+                 buckets=LATENCY_BUCKETS) -> None:
+        """Starts with every bucket empty."""
+        self.name = name
+        self.documentation = documentation
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value) -> None:
+        """Counts a value in the first bucket that holds it."""
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    @property
+    def count(self) -> int:
+        """Values observed so far."""
+        return sum(self.counts)
+
+    def samples(self):
+        """Cumulative buckets, then sum and count."""
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            yield f'{self.name}_bucket{{le="{bound}"}}', cumulative
+        yield f'{self.name}_bucket{{le="+Inf"}}', cumulative + self.counts[-1]
+        yield f'{self.name}_sum', self.sum
+        yield f'{self.name}_count', cumulative + self.counts[-1]
+
+
+class Registry:
+    """Metrics rendered together on `/metrics`."""
+
+    def __init__(self) -> None:
+        """Starts empty."""
+        self.metrics = {}
+
+    def register(self, metric):
+        """Adds a metric under its name and returns it."""
+        self.metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """Every metric in the Prometheus text format."""
+        lines = []
+        for metric in self.metrics.values():
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            for sample, value in metric.samples():
+                lines.append(f'{sample} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+POLLS = REGISTRY.register(Counter(
+    'homework_polls_total', 'Polling cycles started.'
+))
+POLL_ERRORS = REGISTRY.register(Counter(
+    'homework_poll_errors_total', 'Failed polling cycles by exception.',
+    labels=('error',)
+))
+FETCH_SECONDS = REGISTRY.register(Histogram(
+    'homework_fetch_seconds', 'Practicum API request latency.'
+))
+PARSE_SECONDS = REGISTRY.register(Histogram(
+    'homework_parse_seconds', 'Answer check and message rendering time.'
+))
+SEND_SECONDS = REGISTRY.register(Histogram(
+    'homework_send_seconds', 'Telegram send_message latency.'
+))
+SEND_ERRORS = REGISTRY.register(Counter(
+    'homework_send_errors_total', 'Failed Telegram sends by exception.',
+    labels=('error',)
+))
+MESSAGES_SENT = REGISTRY.register(Counter(
+    'homework_messages_sent_total', 'Messages delivered to Telegram.'
+))
+LAST_FETCH_SUCCESS = REGISTRY.register(Gauge(
+    'homework_last_fetch_success_timestamp_seconds',
+    'Unix time of the last successful API answer.'
+))
+LAST_SEND_SUCCESS = REGISTRY.register(Gauge(
+    'homework_last_send_success_timestamp_seconds',
+    'Unix time of the last successful Telegram send.'
+))
+CIRCUIT_STATE = REGISTRY.register(Gauge(
+    'homework_circuit_state',
+    'Practicum API circuit: 0 closed, 1 half-open, 2 open.'
+))
+CIRCUIT_SKIPPED = REGISTRY.register(Counter(
+    'homework_circuit_skipped_total', 'Fetches skipped by the open circuit.'
+))
+CYCLE_SECONDS = REGISTRY.register(Histogram(
+    'homework_cycle_seconds', 'Fetch and parse time of a polling cycle.'
+))
+CYCLES_ABANDONED = REGISTRY.register(Counter(
+    'homework_cycles_abandoned_total',
+    'Polling cycles that ran out of their deadline, by stage.',
+    labels=('stage',)
+))
+OUTBOX_DEPTH = REGISTRY.register(Gauge(
+    'homework_outbox_depth', 'Messages waiting to be sent.'
+))
+STALLS = REGISTRY.register(Counter(
+    'homework_stalls_total', 'Polling loop stalls noticed by the watchdog.'
+))
+
+
+def record_fetch(started) -> None:
+    """Observes a successful API request started at `started`."""
+    FETCH_SECONDS.observe(time.perf_counter() - started)
+    LAST_FETCH_SUCCESS.set(time.time())
+
+
+def record_send(started) -> None:
+    """Observes a delivered Telegram message started at `started`."""
+    SEND_SECONDS.observe(time.perf_counter() - started)
+    MESSAGES_SENT.inc()
+    LAST_SEND_SUCCESS.set(time.time())
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self) -> None:
+        if self.path == '/healthz' and self.server.health is not None:
+            health = self.server.health()
+            status = (HTTPStatus.OK if health['status'] == 'ok'
+                      else HTTPStatus.SERVICE_UNAVAILABLE)
+            self._reply(status, 'application/json', json.dumps(health))
+            return
+        if self.path != '/metrics':
+            self.send_error(HTTPStatus.NOT_FOUND)
+            return
+        self._reply(HTTPStatus.OK, 'text/plain; version=0.0.4',
+                    self.server.registry.render())
+
+    def _reply(self, status, content_type, text) -> None:
+        body = text.encode()
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+def serve(port, host=METRICS_HOST, registry=REGISTRY, health=None):
+    """Serves /metrics from a daemon thread; returns the server.
+
+    With `health`, a callable returning a dict with a "status" key,
+    /healthz answers it as JSON: 200 when the status is "ok", else 503.
+    """
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    server.registry = registry
+    server.health = health
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logger.info(f'Metrics on http://{host}:{server.server_port}/metrics')
+    return server
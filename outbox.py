@@ -0,0 +1,377 @@
+"""Outbound Telegram queue decoupled from the polling loop."""
+import asyncio
+import os
+import time
+import zlib
+from typing import Callable, NamedTuple, Optional
+
+from deadline import applied
+from exceptions import DeadlineExceeded
+from homework import logger
+from ledger import BUSY, SENT, notification_key
+from ratelimit import RateLimiter
+
+
+SEND_WORKERS = int(os.getenv('SEND_WORKERS', 2))
+SEND_RETRIES = int(os.getenv('SEND_RETRIES', 3))
+SEND_BACKOFF = float(os.getenv('SEND_BACKOFF', 1))
+MESSAGE_MAX_LENGTH = 4096
+SEPARATOR = '\n\n'
+
+
+class OutgoingMessage(NamedTuple):
+    """Rendered message waiting for delivery."""
+
+    chat_id: str
+    text: str
+    enqueued: float
+    on_sent: Optional[Callable[[], None]] = None
+    on_dropped: Optional[Callable[[], None]] = None
+    deadline: Optional[object] = None
+    # (homework, status, date_updated) для ключа в журнале отправок
+    idempotency: Optional[tuple] = None
+    broadcast: Optional['_Broadcast'] = None
+
+    @property
+    def key(self) -> Optional[str]:
+        """Ledger key of the message, None without `idempotency`."""
+        if self.idempotency is None:
+            return None
+        return notification_key(self.chat_id, *self.idempotency)
+
+
+class _Broadcast:
+    """Fires `on_sent` once every recipient is handled.
+
+    A recipient that could not be reached does not hold the others back;
+    the callback only needs one successful delivery. `on_dropped` fires
+    if nobody got the message. Recipients whose cycle deadline ran out
+    are different: once someone got the message, the transition will
+    not be found again, so they are queued once more without a deadline
+    and `on_sent` waits for them.
+    """
+
+    def __init__(self, outbox, recipients, on_sent,
+                 on_dropped=None) -> None:
+        self.outbox = outbox
+        self.left = recipients
+        self.delivered = 0
+        self.on_sent = on_sent
+        self.on_dropped = on_dropped
+        self.late = []
+
+    def sent(self) -> None:
+        """Counts a delivered recipient."""
+        self.delivered += 1
+        self._done()
+
+    def dropped(self) -> None:
+        """Counts a recipient given up for good."""
+        self._done()
+
+    def expired(self, message) -> None:
+        """Counts a recipient whose cycle ran out of time."""
+        self.late.append(message)
+        self._done()
+
+    def _done(self) -> None:
+        self.left -= 1
+        if self.left:
+            return
+        if self.delivered and self.late:
+            late, self.late = self.late, []
+            self.left = len(late)
+            for message in late:
+                self.outbox.requeue(message._replace(deadline=None))
+            return
+        callback = self.on_sent if self.delivered else self.on_dropped
+        if callback is not None:
+            callback()
+
+
+async def _in_thread(func, *args):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, func, *args)
+
+
+class Outbox:
+    """Queue of rendered messages served by dedicated workers.
+
+    Each chat always lands on the same worker, so messages to one chat
+    keep their order, and `workers` bounds how many chats are sent to at
+    once. Sends wait for the rate limiter; messages that pile
+    up for a chat meanwhile go out as one message of at most
+    `MESSAGE_MAX_LENGTH` characters. A failed send is retried `retries`
+    times with exponential backoff, a flood-control answer waits its
+    `retry_after` instead. `on_sent` runs only after a successful send.
+    A message that carries the `deadline` of its polling cycle is sent
+    within what is left of it or dropped, counted in `expired`. With a
+    `ledger`, a message with an `idempotency` key is claimed before the
+    send and committed after; one already delivered, even by another
+    process, is skipped and counted in `duplicates`. The ledger locks and
+    writes a file, so it is called through `run(func, *args)`, by default
+    the loop's thread pool, never on the event loop itself.
+    """
+
+    def __init__(self, send, workers=SEND_WORKERS, retries=SEND_RETRIES,
+                 backoff=SEND_BACKOFF, limiter=None, ledger=None,
+                 run=None) -> None:
+        """Nothing is sent until `start` runs the workers."""
+        self.send = send
+        self.ledger = ledger
+        self.run = run or _in_thread
+        self.workers = workers
+        self.retries = retries
+        self.backoff = backoff
+        self.limiter = limiter or RateLimiter()
+        self.sent = 0
+        self.failed = 0
+        self.expired = 0
+        self.duplicates = 0
+        self.coalesced = 0
+        self.send_latency = 0.0
+        self.max_send_latency = 0.0
+        self.queue_latency = 0.0
+        self.max_queue_latency = 0.0
+        # Счётчик, а не сумма по _pending: его читает поток /metrics
+        self.depth = 0
+        self._pending = {}
+        self._queues = []
+        self._tasks = []
+
+    def start(self) -> None:
+        """Starts the workers in the running event loop."""
+        self._queues = [asyncio.Queue() for _ in range(self.workers)]
+        self._tasks = [
+            asyncio.ensure_future(self._worker(queue))
+            for queue in self._queues
+        ]
+
+    async def stop(self) -> None:
+        """Cancels the workers; messages still queued stay unsent."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def join(self) -> None:
+        """Waits until everything queued so far is handled."""
+        for queue in self._queues:
+            await queue.join()
+
+    def _queue_for(self, chat_id):
+        index = zlib.crc32(str(chat_id).encode()) % len(self._queues)
+        return self._queues[index]
+
+    def put(self, chat_id, text, on_sent=None, on_dropped=None,
+            deadline=None, idempotency=None, broadcast=None) -> None:
+        """Queues a message; never blocks the caller."""
+        self.requeue(OutgoingMessage(
+            chat_id, text, time.monotonic(), on_sent, on_dropped, deadline,
+            idempotency, broadcast
+        ))
+
+    def requeue(self, message) -> None:
+        """Queues a message built before, e.g. one that has to go again."""
+        chat_id = message.chat_id
+        self.depth += 1
+        if chat_id in self._pending:
+            self._pending[chat_id].append(message)
+            return
+        self._pending[chat_id] = [message]
+        self._queue_for(chat_id).put_nowait(chat_id)
+
+    def put_many(self, chat_ids, text, on_sent=None, on_dropped=None,
+                 deadline=None, idempotency=None) -> None:
+        """Fans a message out to every chat; failures stay per recipient."""
+        if len(chat_ids) == 1:
+            self.put(
+                chat_ids[0], text, on_sent, on_dropped, deadline, idempotency
+            )
+            return
+        broadcast = _Broadcast(self, len(chat_ids), on_sent, on_dropped)
+        for chat_id in chat_ids:
+            self.put(
+                chat_id, text, broadcast.sent, broadcast.dropped, deadline,
+                idempotency, broadcast
+            )
+
+    def _take_batch(self, chat_id) -> list:
+        """Pops the pending messages of a chat that fit into one send."""
+        messages = self._pending.pop(chat_id)
+        size = len(messages[0].text)
+        count = 1
+        while count < len(messages):
+            size += len(SEPARATOR) + len(messages[count].text)
+            if size > MESSAGE_MAX_LENGTH:
+                break
+            count += 1
+        if count < len(messages):
+            self._pending[chat_id] = messages[count:]
+            self._queue_for(chat_id).put_nowait(chat_id)
+        self.depth -= count
+        return messages[:count]
+
+    async def _worker(self, queue) -> None:
+        while True:
+            chat_id = await queue.get()
+            try:
+                await self.limiter.acquire(chat_id)
+                batch = await self._drop_expired(
+                    chat_id, self._take_batch(chat_id)
+                )
+                batch = await self._claim(batch)
+                if batch:
+                    await self._deliver(chat_id, batch)
+            except Exception as error:
+                logger.error(f'Outbox worker error: {error}')
+            finally:
+                queue.task_done()
+
+    def _keys(self, batch) -> list:
+        if self.ledger is None:
+            return []
+        return [message.key for message in batch if message.key is not None]
+
+    def _claim_keys(self, keys) -> dict:
+        return {key: self.ledger.claim(key) for key in keys}
+
+    def _commit_keys(self, keys) -> None:
+        for key in keys:
+            self.ledger.commit(key)
+
+    def _release_keys(self, keys) -> None:
+        for key in keys:
+            self.ledger.release(key)
+
+    async def _drop(self, batch, expired=False) -> None:
+        keys = self._keys(batch)
+        if keys:
+            await self.run(self._release_keys, keys)
+        for message in batch:
+            if expired and message.broadcast is not None:
+                message.broadcast.expired(message)
+            elif message.on_dropped is not None:
+                message.on_dropped()
+
+    async def _claim(self, batch) -> list:
+        """Skips the messages the ledger already knows about."""
+        keys = self._keys(batch)
+        if not keys:
+            return batch
+        states = await self.run(self._claim_keys, keys)
+        claimed = []
+        for message in batch:
+            state = states.get(message.key)
+            if state not in (SENT, BUSY):
+                claimed.append(message)
+                continue
+            self.duplicates += 1
+            logger.info(f'Message to {message.chat_id} skipped: {state} '
+                        f'according to the ledger')
+            callback = message.on_sent if state == SENT else message.on_dropped
+            if callback is not None:
+                callback()
+        return claimed
+
+    async def _drop_expired(self, chat_id, batch) -> list:
+        """Drops the messages whose cycle ran out of time in the queue."""
+        expired = [
+            message for message in batch
+            if message.deadline is not None and message.deadline.expired
+        ]
+        if not expired:
+            return batch
+        self.expired += len(expired)
+        logger.warning(f'{len(expired)} messages to {chat_id} dropped: '
+                       f'cycle deadline passed in the queue')
+        await self._drop(expired, expired=True)
+        return [message for message in batch if message not in expired]
+
+    async def _send_within(self, deadline, chat_id, text) -> None:
+        if deadline is None:
+            await self.send(chat_id, text)
+            return
+        deadline.check('send')
+        with applied(deadline):
+            try:
+                await asyncio.wait_for(
+                    self.send(chat_id, text), deadline.remaining()
+                )
+            except asyncio.TimeoutError:
+                raise DeadlineExceeded('send', deadline.budget) from None
+
+    async def _deliver(self, chat_id, batch) -> None:
+        text = SEPARATOR.join(message.text for message in batch)
+        deadlines = [message.deadline for message in batch
+                     if message.deadline is not None]
+        deadline = min(deadlines, key=lambda deadline: deadline.expires,
+                       default=None)
+        attempt = 0
+        while True:
+            started = time.monotonic()
+            try:
+                await self._send_within(deadline, chat_id, text)
+            except Exception as error:
+                retry_after = getattr(error, 'retry_after', None)
+                delay = retry_after
+                if delay is None:
+                    delay = self.backoff * 2 ** attempt
+                if isinstance(error, DeadlineExceeded) or (
+                        deadline is not None
+                        and delay >= deadline.remaining()):
+                    self.expired += len(batch)
+                    logger.error(f'Message to {chat_id} dropped: {error}, '
+                                 f'no time left in the cycle')
+                    await self._drop(batch, expired=True)
+                    return
+                if retry_after is not None:
+                    logger.warning(f'Flood control, retry in {retry_after} s')
+                    self.limiter.pause(retry_after)
+                    await self.limiter.acquire(chat_id)
+                    continue
+                if attempt == self.retries:
+                    self.failed += len(batch)
+                    logger.error(f'Message to {chat_id} dropped: {error}')
+                    await self._drop(batch)
+                    return
+                attempt += 1
+                logger.warning(f'Send failed: {error}, retry in {delay} s')
+                await asyncio.sleep(delay)
+            else:
+                self._record(started, batch)
+                await self._commit(batch)
+                return
+
+    async def _commit(self, batch) -> None:
+        keys = self._keys(batch)
+        if keys:
+            await self.run(self._commit_keys, keys)
+        for message in batch:
+            if message.on_sent is not None:
+                message.on_sent()
+
+    def _record(self, started, batch) -> None:
+        now = time.monotonic()
+        self.sent += len(batch)
+        self.coalesced += len(batch) - 1
+        self.send_latency = now - started
+        self.max_send_latency = max(self.max_send_latency, self.send_latency)
+        self.queue_latency = now - batch[0].enqueued
+        self.max_queue_latency = max(
+            self.max_queue_latency, self.queue_latency
+        )
+
+    def stats(self) -> dict:
+        """Counters and latencies in one dict."""
+        return {
+            'depth': self.depth,
+            'sent': self.sent,
+            'failed': self.failed,
+            'duplicates': self.duplicates,
+            'coalesced': self.coalesced,
+            'send_latency': self.send_latency,
+            'max_send_latency': self.max_send_latency,
+            'queue_latency': self.queue_latency,
+            'max_queue_latency': self.max_queue_latency,
+        }
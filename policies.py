@@ -0,0 +1,72 @@
+"""What the engine does about each kind of polling failure."""
+import os
+import random
+from http import HTTPStatus
+from typing import Callable, NamedTuple, Optional, Type
+
+from breaker import is_upstream_failure
+from exceptions import (
+    ApiConnectionFailed, ApiNotFoundError, CheckTokensError,
+    CircuitOpenError, DeadlineExceeded, HomeworksNotListError,
+    HomeworkStatusError, KeyNotExistsError, ResponseNotDictError
+)
+
+
+RETRY_ATTEMPTS = int(os.getenv('RETRY_ATTEMPTS', 5))
+RETRY_BACKOFF = float(os.getenv('RETRY_BACKOFF', 2))
+RETRY_BACKOFF_MAX = float(os.getenv('RETRY_BACKOFF_MAX', 120))
+
+# Повторить через секунды с экспоненциальной паузой; когда попытки
+# кончились, сообщить владельцу и вернуться к расписанию
+RETRY = 'retry'
+# Тихо пропустить цикл и ждать по расписанию
+DEGRADE = 'degrade'
+# Сообщить владельцу один раз за окно дедупликации, опрос продолжается
+ALERT_ONCE = 'alert_once'
+# Сообщить владельцу и больше не опрашивать этот токен
+STOP = 'stop'
+
+
+def _auth_failure(error) -> bool:
+    return error.status_code in (HTTPStatus.UNAUTHORIZED, HTTPStatus.FORBIDDEN)
+
+
+class Rule(NamedTuple):
+    """`action` for `exception` instances for which `when` holds."""
+
+    exception: Type[BaseException]
+    action: str
+    when: Optional[Callable] = None
+
+
+# Первое подходящее правило выигрывает
+POLICIES = (
+    Rule(CircuitOpenError, DEGRADE),
+    Rule(DeadlineExceeded, RETRY),
+    Rule(ApiConnectionFailed, STOP, when=_auth_failure),
+    Rule(ApiConnectionFailed, RETRY, when=is_upstream_failure),
+    Rule(ApiConnectionFailed, ALERT_ONCE),
+    Rule(ApiNotFoundError, STOP),
+    Rule(CheckTokensError, STOP),
+    Rule(ResponseNotDictError, ALERT_ONCE),
+    Rule(KeyNotExistsError, ALERT_ONCE),
+    Rule(HomeworksNotListError, ALERT_ONCE),
+    Rule(HomeworkStatusError, ALERT_ONCE),
+    Rule(Exception, RETRY, when=is_upstream_failure),
+    Rule(Exception, ALERT_ONCE),
+)
+
+
+def policy_for(error, policies=POLICIES) -> str:
+    """Action of the first rule matching the error."""
+    for rule in policies:
+        if isinstance(error, rule.exception) and (
+                rule.when is None or rule.when(error)):
+            return rule.action
+    return ALERT_ONCE
+
+
+def retry_delay(attempt, backoff=RETRY_BACKOFF,
+                backoff_max=RETRY_BACKOFF_MAX) -> float:
+    """Full-jitter exponential pause before retry number `attempt`."""
+    return random.uniform(0, min(backoff_max, backoff * 2 ** attempt))
@@ -0,0 +1,94 @@
+"""Token buckets keeping sends under Telegram flood limits."""
+import asyncio
+import os
+import time
+
+
+TELEGRAM_GLOBAL_RATE = float(os.getenv('TELEGRAM_GLOBAL_RATE', 30))
+TELEGRAM_CHAT_RATE = float(os.getenv('TELEGRAM_CHAT_RATE', 1))
+MAX_CHAT_BUCKETS = 10000
+
+
+class TokenBucket:
+    """`rate` tokens per second, at most `capacity` saved up."""
+
+    def __init__(self, rate, capacity, now) -> None:
+        """Starts full at time `now`."""
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+
+    def _refill(self, now) -> None:
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.updated) * self.rate
+        )
+        self.updated = now
+
+    def delay(self, now) -> float:
+        """Seconds until a token is available."""
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0
+        return (1 - self.tokens) / self.rate
+
+    def take(self) -> None:
+        """Spends one token."""
+        self.tokens -= 1
+
+    def is_full(self, now) -> bool:
+        """Whether the bucket has refilled and can be forgotten."""
+        self._refill(now)
+        return self.tokens >= self.capacity
+
+
+class RateLimiter:
+    """Global and per-chat buckets plus the server's `retry_after`."""
+
+    def __init__(self, global_rate=TELEGRAM_GLOBAL_RATE,
+                 chat_rate=TELEGRAM_CHAT_RATE, clock=time.monotonic) -> None:
+        """Per-chat buckets are created on first use."""
+        self.clock = clock
+        self.chat_rate = chat_rate
+        self.global_bucket = TokenBucket(global_rate, global_rate, clock())
+        self.chat_buckets = {}
+        self.paused_until = 0.0
+
+    def _chat_bucket(self, chat_id, now) -> TokenBucket:
+        bucket = self.chat_buckets.get(chat_id)
+        if bucket is None:
+            if len(self.chat_buckets) >= MAX_CHAT_BUCKETS:
+                # Полные корзины ничего не помнят, их можно выкинуть
+                self.chat_buckets = {
+                    chat: bucket for chat, bucket in self.chat_buckets.items()
+                    if not bucket.is_full(now)
+                }
+            bucket = TokenBucket(self.chat_rate, 1, now)
+            self.chat_buckets[chat_id] = bucket
+        return bucket
+
+    def delay(self, chat_id) -> float:
+        """Seconds to wait before `chat_id` may be sent to; 0 takes a slot."""
+        now = self.clock()
+        chat_bucket = self._chat_bucket(chat_id, now)
+        wait = max(
+            self.paused_until - now,
+            self.global_bucket.delay(now),
+            chat_bucket.delay(now),
+        )
+        if wait <= 0:
+            self.global_bucket.take()
+            chat_bucket.take()
+        return wait
+
+    async def acquire(self, chat_id) -> None:
+        """Waits for a send slot to the chat and takes it."""
+        while True:
+            wait = self.delay(chat_id)
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+    def pause(self, seconds) -> None:
+        """Stops all sends for the time Telegram asked for."""
+        self.paused_until = max(self.paused_until, self.clock() + seconds)
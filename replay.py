@@ -0,0 +1,196 @@
+"""Recording of Practicum API answers and their offline replay.
+
+    RECORD_FILE=answers.log.gz python homework.py
+    python replay.py answers.log.gz --speed 100
+
+Tokens are stored as digests, bodies as they came over the wire.
+"""
+import argparse
+import gzip
+import json
+import os
+import threading
+import time
+from collections import Counter
+from http import HTTPStatus
+from typing import NamedTuple
+
+from checkpoint import tenant_key
+from exceptions import ApiConnectionFailed, ApiNotFoundError
+from homework import (
+    homework_key, new_statuses, parse_homeworks, parse_status
+)
+
+
+RECORD_FILE = os.getenv('RECORD_FILE')
+
+
+def _open(path, mode):
+    """A `.gz` log is a chain of gzip members, one per session."""
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+class Recording(NamedTuple):
+    """One API answer as it came over the wire."""
+
+    recorded_at: float
+    tenant: str
+    from_date: int
+    status_code: int
+    body: str
+
+    def answer(self) -> dict:
+        """The answer as `get_api_answer` returned it or raised."""
+        if self.status_code == HTTPStatus.NOT_FOUND:
+            raise ApiNotFoundError
+        if self.status_code != HTTPStatus.OK:
+            raise ApiConnectionFailed(self.status_code)
+        return json.loads(self.body)
+
+
+class Recorder:
+    """Appends every answer as one JSON line: tokens only as digests."""
+
+    def __init__(self, path=RECORD_FILE, clock=time.time) -> None:
+        """Opens `path` for appending; the file may be shared by sessions."""
+        self.path = path
+        self.clock = clock
+        self._file = _open(path, 'a')
+        self._lock = threading.Lock()
+
+    def record(self, token, from_date, status_code, body) -> None:
+        """Appends one answer and flushes it."""
+        line = json.dumps(
+            [round(self.clock(), 3), tenant_key(token), from_date,
+             status_code, body],
+            ensure_ascii=False, separators=(',', ':')
+        )
+        with self._lock:
+            self._file.write(line + '\n')
+            self._file.flush()
+
+    def tee(self, token, from_date, status_code, chunks):
+        """Passes a streamed body through and records what was read.
+
+        The parser stops at the closing brace, so the record is written
+        when the generator is closed, not only when it is exhausted.
+        """
+        body = []
+        try:
+            for chunk in chunks:
+                body.append(chunk)
+                yield chunk
+        finally:
+            self.record(
+                token, from_date, status_code,
+                b''.join(body).decode('utf-8', 'replace')
+            )
+
+    def close(self) -> None:
+        """Closes the log."""
+        self._file.close()
+
+
+def worker_path(path, worker) -> str:
+    """`answers.log.gz` of worker 2 is `answers.2.log.gz`."""
+    head, _, tail = os.path.basename(path).partition('.')
+    name = f'{head}.{worker}.{tail}' if tail else f'{head}.{worker}'
+    return os.path.join(os.path.dirname(path), name)
+
+
+_recorder = None
+_recorder_lock = threading.Lock()
+
+
+def get_recorder():
+    """Shared recorder if `RECORD_FILE` is set, otherwise None."""
+    global _recorder
+    if _recorder is None and RECORD_FILE:
+        with _recorder_lock:
+            if _recorder is None:
+                _recorder = Recorder(RECORD_FILE)
+    return _recorder
+
+
+def read_recordings(path):
+    """Recordings in log order; a torn tail is skipped."""
+    with _open(path, 'r') as file:
+        try:
+            for line in file:
+                try:
+                    yield Recording(*json.loads(line))
+                except (ValueError, TypeError):
+                    continue
+        except EOFError:
+            # Сессия записи не закрыла последний gzip-член
+            return
+
+
+def replay(recordings, sink, speed=None, on_error=None,
+           sleep=time.sleep) -> Counter:
+    """Feeds recorded answers through the checks the engine runs.
+
+    Every homework is parsed and compared with the statuses seen for its
+    tenant, so each transition gives one message, as in polling. Messages
+    go to `sink`, failures to `on_error(recording, error)`.
+    With `speed` the recorded pauses are kept, `speed` times shorter;
+    without it answers are replayed back to back. Returns counts of
+    answers, messages and failures by exception class.
+    """
+    stats = Counter()
+    statuses = {}
+    previous = None
+    for recording in recordings:
+        if speed and previous is not None:
+            sleep(max(0, recording.recorded_at - previous) / speed)
+        previous = recording.recorded_at
+        stats['answers'] += 1
+        last_statuses = statuses.setdefault(recording.tenant, {})
+        try:
+            homeworks = parse_homeworks(recording.answer())
+            changed = new_statuses(homeworks, last_statuses)
+            if not changed:
+                parse_status(None)
+            # Как в движке: ошибка в любой работе бросает весь ответ
+            messages = [parse_status(homework) for homework in changed]
+        except Exception as error:
+            stats[type(error).__name__] += 1
+            if on_error is not None:
+                on_error(recording, error)
+            continue
+        for homework, message in zip(changed, messages):
+            last_statuses[homework_key(homework)] = homework.status
+            stats['messages'] += 1
+            sink(message)
+    return stats
+
+
+def main():
+    """Replays a recorded log and prints the messages and stats."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('path')
+    parser.add_argument('--speed', type=float,
+                        help='keep recorded pauses, this many times shorter')
+    parser.add_argument('--quiet', action='store_true',
+                        help='do not print the messages')
+    args = parser.parse_args()
+
+    def sink(message):
+        if not args.quiet:
+            print(message)
+
+    def on_error(recording, error):
+        print(f'{recording.recorded_at} {recording.tenant}: {error!r}')
+
+    started = time.perf_counter()
+    stats = replay(
+        read_recordings(args.path), sink, speed=args.speed, on_error=on_error
+    )
+    elapsed = time.perf_counter() - started
+    print(f'{dict(stats)} in {elapsed:.3f} s')
+
+
+if __name__ == '__main__':
+    main()
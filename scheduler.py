@@ -0,0 +1,163 @@
+"""Adaptive polling cadence that does not drift, and the timer wheel."""
+import hashlib
+import os
+import time
+
+from exceptions import ApiConnectionFailed
+from homework import RETRY_TIME
+
+
+POLL_INTERVAL_MIN = float(os.getenv('POLL_INTERVAL_MIN', 60))
+POLL_INTERVAL_MAX = float(os.getenv('POLL_INTERVAL_MAX', 1800))
+IDLE_CYCLES = int(os.getenv('IDLE_CYCLES', 6))
+IDLE_FACTOR = 1.5
+FAILURE_FACTOR = 2
+# Доля интервала, на которую сдвигается каждый опрос
+POLL_JITTER = float(os.getenv('POLL_JITTER', 0.1))
+WHEEL_RESOLUTION = float(os.getenv('WHEEL_RESOLUTION', 0.1))
+WHEEL_SLOTS = 4096
+
+
+def phase(key, salt='') -> float:
+    """Stable pseudo-random fraction in [0, 1) for the key."""
+    digest = hashlib.blake2b(f'{key}{salt}'.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'big') / 2 ** 64
+
+
+def jitter(key, cycle, spread=POLL_JITTER) -> float:
+    """Deterministic shift of poll `cycle` of the key, within ±`spread`."""
+    return (2 * phase(key, f':{cycle}') - 1) * spread
+
+
+class AdaptiveSchedule:
+    """Decides when a tenant is polled next.
+
+    Due times are counted from the previous due time on a monotonic
+    clock, so request and send time do not stretch the period. The
+    interval drops to `min_interval` while a homework is under review,
+    grows after `idle_cycles` polls without changes and after every
+    `ApiConnectionFailed`, and never leaves [min_interval, max_interval].
+    """
+
+    def __init__(self, base=RETRY_TIME, min_interval=POLL_INTERVAL_MIN,
+                 max_interval=POLL_INTERVAL_MAX, idle_cycles=IDLE_CYCLES,
+                 clock=time.monotonic) -> None:
+        """Starts at `base` with the first poll due right away."""
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.base = self._bounded(base)
+        self.idle_cycles = idle_cycles
+        self.clock = clock
+        self.interval = self.base
+        self.next_due = clock()
+        self.last_status = None
+        self.idle = 0
+
+    def _bounded(self, interval) -> float:
+        return max(self.min_interval, min(self.max_interval, interval))
+
+    def record_statuses(self, statuses) -> None:
+        """Adjusts the interval after a successful poll."""
+        if statuses:
+            self.last_status = statuses[-1]
+            self.idle = 0
+        else:
+            self.idle += 1
+        if self.last_status == 'reviewing':
+            self.interval = self.min_interval
+        elif self.idle >= self.idle_cycles:
+            self.interval = self._bounded(self.interval * IDLE_FACTOR)
+        else:
+            self.interval = self.base
+
+    def record_failure(self, error) -> None:
+        """Backs off after an unhealthy API answer."""
+        if isinstance(error, ApiConnectionFailed):
+            self.interval = self._bounded(self.interval * FAILURE_FACTOR)
+
+    def start_at(self, phase) -> float:
+        """Moves the first poll `phase` of an interval ahead; the delay."""
+        self.next_due = self.clock() + phase * self.interval
+        return self.next_due - self.clock()
+
+    def delay(self, jitter=0.0) -> float:
+        """Seconds to sleep until the next due time.
+
+        `jitter`, a fraction of the interval, shifts this one poll only;
+        the cadence itself does not move.
+        """
+        now = self.clock()
+        self.next_due += self.interval
+        if self.next_due < now:
+            # Пропущенные циклы не догоняем пачкой
+            self.next_due = now
+        return max(0.0, self.next_due + jitter * self.interval - now)
+
+
+class TimingWheel:
+    """Hashed timing wheel of due times keyed by tenant.
+
+    A due time falls into slot `tick % slots`, one dict per slot, so
+    scheduling, cancelling and rescheduling a key are O(1) whatever the
+    number of keys. `advance` walks only the ticks that have passed
+    since the last call; keys due in a later round of the wheel stay in
+    their slot. A key has at most one due time.
+    """
+
+    def __init__(self, resolution=WHEEL_RESOLUTION, slots=WHEEL_SLOTS,
+                 clock=time.monotonic) -> None:
+        """Starts empty at the current tick of `clock`."""
+        self.resolution = resolution
+        self.clock = clock
+        self._slots = [{} for _ in range(slots)]
+        self._slot_of = {}
+        self._tick = self._tick_of(clock())
+
+    def _tick_of(self, when) -> int:
+        return int(when // self.resolution)
+
+    def __len__(self) -> int:
+        """Number of scheduled keys."""
+        return len(self._slot_of)
+
+    def __contains__(self, key) -> bool:
+        """Whether the key has a due time."""
+        return key in self._slot_of
+
+    def schedule(self, key, due) -> None:
+        """Fires the key at `due` on `clock`, replacing its earlier due."""
+        self.cancel(key)
+        # Прошедший срок срабатывает на ближайшем тике
+        tick = max(self._tick_of(due), self._tick)
+        index = tick % len(self._slots)
+        self._slots[index][key] = tick
+        self._slot_of[key] = index
+
+    def cancel(self, key) -> bool:
+        """Forgets the due time of the key; False if it had none."""
+        index = self._slot_of.pop(key, None)
+        if index is None:
+            return False
+        del self._slots[index][key]
+        return True
+
+    def advance(self, now=None) -> list:
+        """Removes and returns the keys due by `now`."""
+        now_tick = self._tick_of(self.clock() if now is None else now)
+        fired = []
+        # Дальше круга идти незачем: все слоты уже осмотрены
+        last = min(now_tick, self._tick + len(self._slots) - 1)
+        for tick in range(self._tick, last + 1):
+            slot = self._slots[tick % len(self._slots)]
+            due = [key for key, key_tick in slot.items()
+                   if key_tick <= now_tick]
+            for key in due:
+                del slot[key]
+                del self._slot_of[key]
+            fired.extend(due)
+        self._tick = max(self._tick, now_tick + 1)
+        return fired
+
+    def next_tick(self) -> float:
+        """Seconds until the tick `advance` has not covered yet."""
+        return max(0.0, self._tick * self.resolution - self.clock())
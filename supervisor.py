@@ -0,0 +1,266 @@
+"""Tenants sharded across worker processes by consistent hashing."""
+import asyncio
+import bisect
+import fcntl
+import glob
+import hashlib
+import multiprocessing
+import os
+import signal
+import sys
+import time
+
+from checkpoint import CheckpointState, tenant_key
+from homework import logger
+from ratelimit import TELEGRAM_GLOBAL_RATE, RateLimiter
+
+
+WORKER_PROCESSES = int(os.getenv('WORKER_PROCESSES', 1))
+LEASE_DIR = os.getenv('LEASE_DIR', 'leases')
+REBALANCE_INTERVAL = float(os.getenv('REBALANCE_INTERVAL', 5))
+RESPAWN_DELAY = float(os.getenv('RESPAWN_DELAY', 10))
+RING_REPLICAS = 100
+
+
+def _point(value) -> int:
+    return int.from_bytes(hashlib.md5(value.encode()).digest()[:8], 'big')
+
+
+class HashRing:
+    """Consistent hashing of tenant keys onto worker indexes.
+
+    When a worker leaves the ring only its own tenants move, the rest
+    stay where their checkpoints and keep-alive connections are.
+    """
+
+    def __init__(self, nodes, replicas=RING_REPLICAS) -> None:
+        """Places `replicas` points of every node on the ring."""
+        points = sorted(
+            (_point(f'{node}:{replica}'), node)
+            for node in nodes for replica in range(replicas)
+        )
+        self._points = [point for point, _ in points]
+        self._nodes = [node for _, node in points]
+
+    def node(self, key):
+        """Worker owning the key or None for an empty ring."""
+        if not self._nodes:
+            return None
+        index = bisect.bisect(self._points, _point(key))
+        return self._nodes[index % len(self._nodes)]
+
+
+class LeaseManager:
+    """Exclusive `flock` per tenant in a shared directory.
+
+    The kernel drops the lock when its holder dies, so a token is never
+    polled by two processes, even by a worker orphaned from an old
+    supervisor.
+    """
+
+    def __init__(self, directory=LEASE_DIR) -> None:
+        """Creates `directory` if needed; no lease is held yet."""
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._files = {}
+
+    def acquire(self, token) -> bool:
+        """Takes the lease without waiting; False if someone else holds it."""
+        if token in self._files:
+            return True
+        path = os.path.join(self.directory, f'{tenant_key(token)}.lock')
+        file = open(path, 'a')
+        try:
+            fcntl.flock(file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            file.close()
+            return False
+        self._files[token] = file
+        return True
+
+    def release(self, token) -> None:
+        """Gives the lease up if this process holds it."""
+        file = self._files.pop(token, None)
+        if file is not None:
+            fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+            file.close()
+
+    @property
+    def held(self) -> set:
+        """Tokens whose leases this process holds."""
+        return set(self._files)
+
+
+class ShardWorker:
+    """Keeps an engine polling exactly the tenants hashed to this worker.
+
+    `live` is the supervisor's shared table of running workers. Every
+    `interval` seconds the ring is rebuilt from it: tenants that moved
+    away are dropped and their leases released, new ones are adopted as
+    soon as their lease is free. An adopted tenant resumes from the
+    freshest checkpoint of all workers.
+    """
+
+    def __init__(self, index, live, subscriptions, engine, leases,
+                 interval=REBALANCE_INTERVAL, parent=None) -> None:
+        """Adopts nothing until the first `rebalance`."""
+        self.index = index
+        self.live = live
+        self.subscriptions = {
+            subscription.token: subscription for subscription in subscriptions
+        }
+        self.engine = engine
+        self.leases = leases
+        self.interval = interval
+        self.parent = parent
+
+    def assigned(self) -> set:
+        """Tokens the ring of live workers gives to this one."""
+        ring = HashRing(
+            [index for index, alive in enumerate(self.live) if alive]
+        )
+        return {
+            token for token in self.subscriptions
+            if ring.node(tenant_key(token)) == self.index
+        }
+
+    def rebalance(self) -> None:
+        """Drops tenants that moved away and adopts the new ones."""
+        assigned = self.assigned()
+        for token in self.leases.held - assigned:
+            self.engine.remove_tenant(token)
+            self.leases.release(token)
+        states = None
+        for token in sorted(assigned - self.leases.held):
+            if not self.leases.acquire(token):
+                # Прежний владелец ещё не отпустил токен
+                continue
+            if states is None:
+                states = self._checkpoint_states()
+            self._resume(token, states)
+            self.engine.add_tenant(self.subscriptions[token])
+
+    def _checkpoint_states(self) -> list:
+        checkpoint = self.engine.checkpoint
+        if checkpoint is None:
+            return []
+        base = checkpoint.path.rsplit('.', 1)[0]
+        return [
+            CheckpointState(path) for path in glob.glob(f'{base}.*')
+            if path != checkpoint.path and not path.endswith('.tmp')
+        ]
+
+    def _resume(self, token, states) -> None:
+        """Copies the freshest checkpoint of the token into ours."""
+        checkpoint = self.engine.checkpoint
+        freshest = checkpoint
+        for state in states:
+            if (state.current_date(token) or 0) > (
+                    freshest.current_date(token) or 0):
+                freshest = state
+        if freshest is checkpoint:
+            return
+        for homework, status in freshest.last_statuses(token).items():
+            checkpoint.save_status(token, homework, status)
+        checkpoint.save_date(token, freshest.current_date(token))
+
+    async def run(self) -> None:
+        """Polls and rebalances until the supervisor is gone."""
+        engine = asyncio.ensure_future(self.engine.run_forever())
+        try:
+            while self.parent is None or os.getppid() == self.parent:
+                self.rebalance()
+                await asyncio.sleep(self.interval)
+            logger.error(f'Supervisor is gone, worker {self.index} exits')
+        finally:
+            engine.cancel()
+
+
+def run_worker(index, live, subscriptions, make_engine,
+               lease_dir=LEASE_DIR, interval=REBALANCE_INTERVAL) -> None:
+    """Worker process body: `make_engine(index)` builds its engine."""
+    engine = make_engine(index)
+    # Лимит Telegram общий на бота, делим его между воркерами
+    engine.outbox.limiter = RateLimiter(
+        global_rate=TELEGRAM_GLOBAL_RATE / len(live)
+    )
+    worker = ShardWorker(
+        index, live, subscriptions, engine, LeaseManager(lease_dir),
+        interval=interval, parent=os.getppid()
+    )
+    try:
+        asyncio.run(worker.run())
+    finally:
+        engine._executor.shutdown(wait=False)
+
+
+class Supervisor:
+    """Forks the workers and respawns the ones that die.
+
+    A dead worker is marked down in the shared `live` table at once, so
+    the survivors take over its tenants at their next rebalance; it is
+    restarted `respawn_delay` seconds later and gets them back.
+    """
+
+    def __init__(self, workers, target, respawn_delay=RESPAWN_DELAY,
+                 clock=time.monotonic) -> None:
+        """Nothing is forked until `start`."""
+        self.workers = workers
+        self.target = target
+        self.respawn_delay = respawn_delay
+        self.clock = clock
+        self.context = multiprocessing.get_context('fork')
+        self.live = self.context.Array('b', workers, lock=False)
+        self.processes = {}
+        self._respawn_at = {}
+
+    def _spawn(self, index) -> None:
+        process = self.context.Process(
+            target=self.target, args=(index, self.live),
+            name=f'worker-{index}', daemon=True
+        )
+        # Воркер сразу должен видеть себя в кольце
+        self.live[index] = 1
+        process.start()
+        self.processes[index] = process
+
+    def start(self) -> None:
+        """Forks every worker."""
+        for index in range(self.workers):
+            self._spawn(index)
+        logger.info(f'Started {self.workers} worker processes')
+
+    def check(self) -> None:
+        """Marks dead workers down and respawns them after `respawn_delay`."""
+        now = self.clock()
+        for index, process in self.processes.items():
+            if process.is_alive() or index in self._respawn_at:
+                continue
+            self.live[index] = 0
+            logger.error(
+                f'Worker {index} exited with code {process.exitcode}, '
+                f'rebalancing its tenants'
+            )
+            self._respawn_at[index] = now + self.respawn_delay
+        for index, due in list(self._respawn_at.items()):
+            if now >= due:
+                del self._respawn_at[index]
+                self._spawn(index)
+
+    def stop(self) -> None:
+        """Terminates the workers and waits for them."""
+        for process in self.processes.values():
+            process.terminate()
+        for process in self.processes.values():
+            process.join()
+
+    def run(self, interval=1) -> None:
+        """Blocking entry point for `main()`."""
+        signal.signal(signal.SIGTERM, lambda *args: sys.exit(0))
+        self.start()
+        try:
+            while True:
+                time.sleep(interval)
+                self.check()
+        finally:
+            self.stop()
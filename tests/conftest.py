@@ -1,9 +1,30 @@
 import sys
 from os.path import abspath, dirname
 
+import pytest
+import requests
+
 root_dir = dirname(dirname(abspath(__file__)))
 sys.path.append(root_dir)
 
 pytest_plugins = [
     'tests.fixtures.fixture_data'
 ]
+
+
+@pytest.fixture(autouse=True)
+def pooled_session_via_requests_get(monkeypatch):
+    """Routes the shared session through `requests.get` so tests can mock it.
+
+    Backoff sleeps are skipped to keep retried 5xx answers fast, and
+    every test starts with closed circuit breakers.
+    """
+    import breaker
+    import transport
+
+    def session_get(self, url, **kwargs):
+        return requests.get(url, **kwargs)
+
+    monkeypatch.setattr(requests.Session, 'get', session_get)
+    monkeypatch.setattr(transport, 'sleep', lambda seconds: None)
+    monkeypatch.setattr(breaker, '_breakers', {})
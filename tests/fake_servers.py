@@ -0,0 +1,251 @@
+"""Local stand-ins for the Practicum API and the Telegram Bot API."""
+import json
+import threading
+import time
+from datetime import datetime, timezone
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def _answer(self, status, payload) -> None:
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _inject(self) -> bool:
+        """Applies the scripted latency and error; True if answered."""
+        fake = self.server.fake
+        if fake.latency:
+            time.sleep(fake.latency)
+        status = fake.next_error()
+        if status is None:
+            return False
+        self._answer(status, fake.error_payload(status))
+        return True
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+class FakeServer:
+    """Threaded HTTP server on a free local port."""
+
+    handler = _Handler
+
+    def __init__(self, latency=0.0) -> None:
+        self.latency = latency
+        self.requests = 0
+        self._errors = []
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self.handler)
+        self._server.daemon_threads = True
+        self._server.fake = self
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        return f'http://127.0.0.1:{self._server.server_port}'
+
+    def fail(self, status, times=1) -> None:
+        """Answers the next `times` requests with `status`."""
+        with self._lock:
+            self._errors.extend([status] * times)
+
+    def next_error(self):
+        with self._lock:
+            self.requests += 1
+            if self._errors:
+                return self._errors.pop(0)
+        return None
+
+    def error_payload(self, status) -> dict:
+        return {'code': status}
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, args=(0.05,), daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args) -> None:
+        self.stop()
+
+
+class _PracticumHandler(_Handler):
+
+    def do_GET(self) -> None:
+        if self._inject():
+            return
+        fake = self.server.fake
+        authorization = self.headers.get('Authorization', '')
+        token = authorization[len('OAuth '):]
+        if not authorization.startswith('OAuth ') or token not in fake.tokens:
+            self._answer(HTTPStatus.UNAUTHORIZED, {'code': 'not_authenticated'})
+            return
+        query = parse_qs(urlparse(self.path).query)
+        try:
+            from_date = int(query['from_date'][0])
+        except (KeyError, ValueError):
+            self._answer(HTTPStatus.BAD_REQUEST, {'code': 'UnknownError'})
+            return
+        self._answer(HTTPStatus.OK, fake.answer(token, from_date))
+
+
+class FakePracticum(FakeServer):
+    """Homework statuses API with scriptable transitions.
+
+    Like the real one, it returns every homework updated at or after
+    `from_date`, newest first, plus `current_date`.
+    """
+
+    handler = _PracticumHandler
+
+    def __init__(self, latency=0.0) -> None:
+        super().__init__(latency)
+        self.tokens = set()
+        self._homeworks = {}
+        self._next_id = 1
+
+    @property
+    def endpoint(self) -> str:
+        return f'{self.url}/api/user_api/homework_statuses/'
+
+    def add_token(self, token) -> None:
+        with self._lock:
+            self.tokens.add(token)
+            self._homeworks.setdefault(token, {})
+
+    def set_status(self, token, homework_name, status) -> float:
+        """Moves a homework to `status`; returns the change time."""
+        now = time.time()
+        with self._lock:
+            self.tokens.add(token)
+            homeworks = self._homeworks.setdefault(token, {})
+            homework = homeworks.get(homework_name)
+            if homework is None:
+                homework = homeworks[homework_name] = {
+                    'id': self._next_id,
+                    'homework_name': homework_name,
+                    'lesson_name': homework_name,
+                    'reviewer_comment': '',
+                }
+                self._next_id += 1
+            homework['status'] = status
+            homework['updated'] = now
+        return now
+
+    def answer(self, token, from_date) -> dict:
+        with self._lock:
+            homeworks = [
+                homework for homework in self._homeworks[token].values()
+                if homework['updated'] >= from_date
+            ]
+        homeworks.sort(key=lambda homework: homework['updated'], reverse=True)
+        return {
+            'homeworks': [
+                {
+                    **{key: value for key, value in homework.items()
+                       if key != 'updated'},
+                    'date_updated': datetime.fromtimestamp(
+                        homework['updated'], timezone.utc
+                    ).strftime('%Y-%m-%dT%H:%M:%SZ'),
+                }
+                for homework in homeworks
+            ],
+            'current_date': int(time.time()),
+        }
+
+
+class _TelegramHandler(_Handler):
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get('Content-Length', 0))
+        raw = self.rfile.read(length)
+        if self._inject():
+            return
+        if self.headers.get('Content-Type', '').startswith('application/json'):
+            data = json.loads(raw or b'{}')
+        else:
+            data = {
+                key: values[0]
+                for key, values in parse_qs(raw.decode()).items()
+            }
+        method = self.path.rsplit('/', 1)[-1]
+        fake = self.server.fake
+        if method == 'sendMessage':
+            result = fake.record(data['chat_id'], data['text'])
+        elif method == 'getMe':
+            result = {'id': 1, 'is_bot': True, 'first_name': 'fake',
+                      'username': 'fake_bot'}
+        else:
+            self._answer(HTTPStatus.NOT_FOUND, {
+                'ok': False, 'error_code': 404, 'description': 'Not Found'
+            })
+            return
+        self._answer(HTTPStatus.OK, {'ok': True, 'result': result})
+
+
+class SentMessage:
+    __slots__ = ('chat_id', 'text', 'received')
+
+    def __init__(self, chat_id, text, received) -> None:
+        self.chat_id = chat_id
+        self.text = text
+        self.received = received
+
+
+class FakeTelegram(FakeServer):
+    """Bot API accepting `sendMessage` and recording what was sent.
+
+    Pass `base_url` to `telegram.Bot`. `fail(429)` answers with a
+    flood-control error carrying `retry_after`.
+    """
+
+    handler = _TelegramHandler
+
+    def __init__(self, latency=0.0, retry_after=1) -> None:
+        super().__init__(latency)
+        self.retry_after = retry_after
+        self.messages = []
+        self._message_id = 0
+
+    @property
+    def base_url(self) -> str:
+        return f'{self.url}/bot'
+
+    def error_payload(self, status) -> dict:
+        payload = {
+            'ok': False, 'error_code': status, 'description': 'Fake error'
+        }
+        if status == HTTPStatus.TOO_MANY_REQUESTS:
+            payload['parameters'] = {'retry_after': self.retry_after}
+        return payload
+
+    def record(self, chat_id, text) -> dict:
+        now = time.time()
+        with self._lock:
+            self.messages.append(SentMessage(str(chat_id), text, now))
+            self._message_id += 1
+            message_id = self._message_id
+        return {
+            'message_id': message_id,
+            'date': int(now),
+            'chat': {'id': int(chat_id), 'type': 'private'},
+            'text': text,
+        }
@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+
+import metrics
+from breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from engine import PollingEngine, Subscription
+from exceptions import ApiConnectionFailed, CircuitOpenError
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def failing():
+    raise ApiConnectionFailed(503)
+
+
+def trip(breaker, times):
+    for _ in range(times):
+        with pytest.raises(ApiConnectionFailed):
+            breaker.call(failing)
+
+
+class TestCircuitBreaker:
+
+    def test_opens_after_threshold_and_fails_fast(self):
+        breaker = CircuitBreaker('api', failure_threshold=3, reset_timeout=60,
+                                 clock=FakeClock())
+        trip(breaker, 3)
+        assert breaker.state == OPEN
+        assert metrics.CIRCUIT_STATE.value == 2
+        calls = []
+        with pytest.raises(CircuitOpenError):
+            breaker.call(calls.append, 1)
+        assert calls == []
+
+    def test_one_probe_decides(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker('api', failure_threshold=1, reset_timeout=60,
+                                 clock=clock)
+        trip(breaker, 1)
+        clock.now = 60
+        breaker.before_call()
+        assert breaker.state == HALF_OPEN
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()
+        breaker.record_failure()
+        assert breaker.state == OPEN
+
+        clock.now = 120
+        assert breaker.call(lambda: 'ok') == 'ok'
+        assert breaker.state == CLOSED
+
+    def test_token_errors_do_not_trip(self):
+        breaker = CircuitBreaker('api', failure_threshold=1)
+
+        def unauthorized():
+            raise ApiConnectionFailed(401)
+
+        with pytest.raises(ApiConnectionFailed):
+            breaker.call(unauthorized)
+        assert breaker.state == CLOSED
+
+
+def test_engine_skips_open_circuit_quietly():
+    def fetch(token, current_timestamp):
+        raise CircuitOpenError('api', 30)
+
+    sent = []
+
+    def send(bot, chat_id, message):
+        sent.append(message)
+
+    engine = PollingEngine(None, [Subscription('token', ('1',))], fetch=fetch,
+                           send=send)
+    asyncio.run(engine.poll_all())
+    assert sent == []
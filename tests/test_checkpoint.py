@@ -0,0 +1,77 @@
+import asyncio
+
+from checkpoint import CheckpointStore
+from engine import PollingEngine, Subscription
+
+
+class TestCheckpointStore:
+
+    def test_state_survives_restart(self, tmp_path):
+        path = str(tmp_path / 'checkpoint.log')
+        store = CheckpointStore(path)
+        store.save_date('token', 100)
+        store.save_date('token', 200)
+        store.save_status('token', '1', 'reviewing')
+        store.close()
+
+        store = CheckpointStore(path)
+        assert store.current_date('token') == 200
+        assert store.last_statuses('token') == {'1': 'reviewing'}
+        assert store.current_date('other') is None
+        assert 'token' not in open(path).read()
+
+    def test_unchanged_state_is_not_written(self, tmp_path):
+        path = tmp_path / 'checkpoint.log'
+        store = CheckpointStore(str(path))
+        store.save_date('token', 100)
+        size = path.stat().st_size
+        store.save_date('token', 100)
+        assert path.stat().st_size == size
+
+    def test_torn_tail_is_dropped(self, tmp_path):
+        path = tmp_path / 'checkpoint.log'
+        store = CheckpointStore(str(path))
+        store.save_date('token', 100)
+        store.close()
+        with open(path, 'a') as file:
+            file.write('["d","abc",2')
+
+        store = CheckpointStore(str(path))
+        store.save_date('token', 300)
+        store.close()
+        assert CheckpointStore(str(path)).current_date('token') == 300
+
+    def test_compaction_keeps_live_state(self, tmp_path):
+        path = tmp_path / 'checkpoint.log'
+        store = CheckpointStore(str(path), compact_every=10)
+        for current_date in range(100):
+            store.save_date('token', current_date)
+        store.close()
+        assert len(path.read_text().splitlines()) <= 10
+        assert CheckpointStore(str(path)).current_date('token') == 99
+
+
+def test_engine_resumes_from_checkpoint(tmp_path, random_timestamp):
+    path = str(tmp_path / 'checkpoint.log')
+    requested = []
+    sent = []
+
+    def fetch(token, current_timestamp):
+        requested.append(current_timestamp)
+        return {
+            'homeworks': [{'id': 7, 'homework_name': 'hw', 'status': 'approved'}],
+            'current_date': random_timestamp,
+        }
+
+    def send(bot, chat_id, message):
+        if message is not None:
+            sent.append(message)
+
+    for _ in range(2):
+        engine = PollingEngine(None, [Subscription('token', ('1',))], fetch=fetch,
+                               send=send, checkpoint=CheckpointStore(path))
+        asyncio.run(engine.poll_all())
+        engine.checkpoint.close()
+
+    assert requested[1] == random_timestamp
+    assert len(sent) == 1
@@ -0,0 +1,118 @@
+import threading
+import time
+from types import SimpleNamespace
+
+from commands import BotCommands, SingleFlight, StatusCache
+from engine import Subscription
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_update(chat_id):
+    replies = []
+    message = SimpleNamespace(reply_text=replies.append)
+    update = SimpleNamespace(
+        effective_chat=SimpleNamespace(id=chat_id), message=message
+    )
+    return update, replies
+
+
+def answer(*homeworks):
+    return {'homeworks': list(homeworks), 'current_date': 1}
+
+
+class TestStatusCache:
+
+    def test_single_flight_collapses_misses(self):
+        calls = []
+
+        def fetch(token, current_timestamp):
+            calls.append(current_timestamp)
+            time.sleep(0.05)
+            return answer({'id': 1, 'homework_name': 'hw', 'status': 'approved'})
+
+        cache = StatusCache(fetch=fetch)
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(
+                cache.homeworks('token')
+            ))
+            for _ in range(10)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert calls == [0]
+        assert len(results) == 10
+
+    def test_ttl_and_merge(self):
+        calls = []
+
+        def fetch(token, current_timestamp):
+            calls.append(token)
+            return answer({'id': 1, 'homework_name': 'hw1', 'status': 'reviewing'})
+
+        clock = FakeClock()
+        cache = StatusCache(fetch=fetch, ttl=10, clock=clock)
+        cache.update('token', [{'id': 2, 'status': 'approved'}])
+        assert cache.homeworks('token')[0]['id'] == 1
+
+        cache.update('token', [
+            {'id': 2, 'homework_name': 'hw2', 'status': 'approved'}
+        ])
+        assert [hw['id'] for hw in cache.homeworks('token')] == [2, 1]
+        clock.now = 10
+        cache.homeworks('token')
+        assert calls == ['token', 'token']
+
+    def test_errors_are_shared_and_not_cached(self):
+        flight = SingleFlight()
+
+        def fail():
+            raise ValueError('boom')
+
+        for _ in range(2):
+            try:
+                flight.do('key', fail)
+            except ValueError:
+                pass
+            else:
+                assert False
+        assert flight._calls == {}
+
+
+class TestBotCommands:
+
+    def make_commands(self):
+        def fetch(token, current_timestamp):
+            return answer(
+                {'id': 2, 'homework_name': 'hw2', 'status': 'reviewing'},
+                {'id': 1, 'homework_name': 'hw1', 'status': 'approved'},
+            )
+
+        return BotCommands(
+            StatusCache(fetch=fetch), [Subscription('token', ('1', '2'))]
+        )
+
+    def test_status_and_history(self):
+        commands = self.make_commands()
+        update, replies = make_update(2)
+        commands.status(update, None)
+        commands.history(update, None)
+        assert replies[0] == (
+            'Последняя работа "hw2". Работа взята на проверку ревьюером.'
+        )
+        assert replies[1].splitlines()[1].startswith('"hw1". Работа проверена')
+
+    def test_unknown_chat(self):
+        update, replies = make_update(3)
+        self.make_commands().status(update, None)
+        assert replies == ['Этот чат не подписан на статусы.']
@@ -0,0 +1,205 @@
+import asyncio
+import time
+
+import pytest
+import requests
+
+import engine as engine_module
+import metrics
+from deadline import Deadline, applied, current
+from engine import PollingEngine, Subscription
+from exceptions import DeadlineExceeded
+from outbox import Outbox
+from ratelimit import RateLimiter
+from tests.test_transport import scripted_get
+from transport import HttpTransport
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def answer(status='approved'):
+    return {
+        'homeworks': [{'id': 1, 'homework_name': 'hw', 'status': status}],
+        'current_date': 100,
+    }
+
+
+def make_engine(fetch, send=lambda *args: None, budget=10):
+    engine = PollingEngine(
+        None, [Subscription('token', ('1',))], fetch=fetch, send=send,
+        cycle_budget=budget
+    )
+    engine.outbox.limiter = RateLimiter(global_rate=10 ** 6, chat_rate=10 ** 6)
+    engine.tenants[0].current_timestamp = 0
+    return engine
+
+
+def abandoned(stage):
+    return metrics.CYCLES_ABANDONED.values.get((stage,), 0)
+
+
+class TestDeadline:
+
+    def test_budget_runs_out(self):
+        clock = FakeClock()
+        deadline = Deadline(10, clock=clock)
+        assert deadline.timeout(3) == 3
+        clock.now = 8
+        assert deadline.remaining() == 2
+        assert deadline.timeout(3) == 2
+        clock.now = 10
+        assert deadline.expired
+        with pytest.raises(DeadlineExceeded):
+            deadline.check('fetch')
+
+    def test_applied_is_scoped(self):
+        deadline = Deadline(10)
+        with applied(deadline):
+            assert current() is deadline
+        assert current() is None
+
+
+class TestCycleDeadline:
+
+    def test_hung_fetch_is_abandoned(self):
+        def fetch(token, current_timestamp):
+            time.sleep(1)
+            return answer()
+
+        before = abandoned('fetch')
+        engine = make_engine(fetch, budget=0.05)
+        started = time.perf_counter()
+        asyncio.run(engine.poll_all())
+        assert time.perf_counter() - started < 0.5
+        assert abandoned('fetch') == before + 1
+        assert engine.tenants[0].retry_in is not None
+        engine._executor.shutdown(wait=False)
+
+    def test_parse_out_of_budget_leaves_state_untouched(self, monkeypatch):
+        clock = FakeClock()
+        monkeypatch.setattr(
+            engine_module, 'Deadline',
+            lambda budget: Deadline(budget, clock=clock)
+        )
+
+        def fetch(token, current_timestamp):
+            clock.now = 11
+            return answer()
+
+        sent = []
+        before = abandoned('parse')
+        engine = make_engine(fetch, lambda bot, chat, text: sent.append(text))
+        asyncio.run(engine.poll_all())
+        tenant = engine.tenants[0]
+        assert abandoned('parse') == before + 1
+        assert sent == []
+        assert tenant.statuses == {}
+        assert tenant.current_timestamp == 0
+
+    def test_fetch_sees_the_deadline(self):
+        seen = []
+
+        def fetch(token, current_timestamp):
+            seen.append(current())
+            return answer()
+
+        engine = make_engine(fetch)
+        asyncio.run(engine.poll_all())
+        assert isinstance(seen[0], Deadline)
+        assert seen[0].budget == 10
+
+
+class TestSendDeadline:
+
+    def test_expired_message_is_dropped_and_forgotten(self):
+        def fetch(token, current_timestamp):
+            return answer()
+
+        def send(bot, chat_id, text):
+            time.sleep(0.3)
+
+        before = abandoned('send')
+        engine = make_engine(fetch, send, budget=0.1)
+        asyncio.run(engine.poll_all())
+        tenant = engine.tenants[0]
+        assert engine.outbox.expired == 1
+        assert abandoned('send') == before + 1
+        # Следующий цикл найдёт переход снова
+        assert tenant.statuses == {}
+        assert tenant.current_timestamp == 0
+        engine._executor.shutdown(wait=False)
+
+    def test_broadcast_tail_is_delivered_past_the_deadline(self):
+        sent = []
+
+        def fetch(token, current_timestamp):
+            return answer()
+
+        def send(bot, chat_id, text):
+            time.sleep(0.05)
+            sent.append(chat_id)
+
+        chat_ids = tuple(str(number) for number in range(20))
+        engine = PollingEngine(
+            None, [Subscription('token', chat_ids)], fetch=fetch, send=send,
+            cycle_budget=0.3
+        )
+        engine.outbox.limiter = RateLimiter(
+            global_rate=10 ** 6, chat_rate=10 ** 6
+        )
+        asyncio.run(engine.poll_all())
+        tenant = engine.tenants[0]
+        assert engine.outbox.expired > 0
+        # Переход уже не найдётся снова, поэтому хвост дослан без срока
+        assert set(sent) == set(chat_ids)
+        assert tenant.statuses == {'1': 'approved'}
+        engine._executor.shutdown(wait=False)
+
+    def test_no_retry_past_the_deadline(self):
+        calls = []
+
+        async def send(chat_id, text):
+            calls.append(text)
+            raise RuntimeError('network')
+
+        async def run():
+            outbox = Outbox(send, workers=1, backoff=1, limiter=RateLimiter(
+                global_rate=10 ** 6, chat_rate=10 ** 6
+            ))
+            outbox.start()
+            outbox.put('1', 'text', deadline=Deadline(0.5))
+            await outbox.join()
+            await outbox.stop()
+            return outbox
+
+        outbox = asyncio.run(run())
+        assert calls == ['text']
+        assert outbox.expired == 1
+        assert outbox.failed == 0
+
+
+class TestTransportDeadline:
+
+    def test_attempts_fit_into_the_deadline(self, monkeypatch):
+        calls = scripted_get(monkeypatch, [requests.ConnectionError()] * 3)
+        transport = HttpTransport(connect_timeout=3, read_timeout=10)
+        transport.backoff_delay = lambda attempt, response=None: 5
+        with applied(Deadline(1)):
+            with pytest.raises(requests.ConnectionError):
+                transport.get('http://api')
+        assert len(calls) == 1
+        assert all(limit <= 1 for limit in calls[0]['timeout'])
+
+    def test_expired_deadline_makes_no_request(self, monkeypatch):
+        calls = scripted_get(monkeypatch, [])
+        with applied(Deadline(0)):
+            with pytest.raises(DeadlineExceeded):
+                HttpTransport().get('http://api')
+        assert calls == []
@@ -0,0 +1,60 @@
+from deduper import ErrorDeduper, fingerprint
+from exceptions import ApiConnectionFailed, ApiNotFoundError
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def raised(error):
+    try:
+        raise error
+    except Exception as caught:
+        return caught
+
+
+class TestErrorDeduper:
+
+    def test_fingerprint_ignores_message(self):
+        assert fingerprint(raised(ApiConnectionFailed(500))) == fingerprint(
+            raised(ApiConnectionFailed(502))
+        )
+        assert fingerprint(raised(ApiConnectionFailed(500))) != fingerprint(
+            raised(ApiNotFoundError())
+        )
+
+    def test_alternating_errors_reported_once(self):
+        deduper = ErrorDeduper(window=60, clock=FakeClock())
+        reports = [
+            deduper.report(raised(error))
+            for error in [ApiConnectionFailed(500), ApiNotFoundError()] * 5
+        ]
+        sent = [report for report in reports if report is not None]
+        assert len(sent) == 2
+        assert sent[0].startswith('Сбой в работе программы:')
+        assert 'Traceback' in sent[0]
+
+    def test_summary_after_window(self):
+        clock = FakeClock()
+        deduper = ErrorDeduper(window=60, clock=clock)
+        for _ in range(38):
+            deduper.report(raised(ApiConnectionFailed(500)))
+        assert deduper.flush() == []
+        clock.now = 60
+        assert deduper.flush() == [
+            'Сбой повторился 37 раз: ApiConnectionFailed: '
+            'Connection problem code: 500'
+        ]
+        assert deduper.flush() == []
+
+    def test_lru_is_bounded(self):
+        deduper = ErrorDeduper(size=2, clock=FakeClock())
+        for error in [ValueError(), KeyError(), TypeError()]:
+            deduper.report(raised(error))
+        assert len(deduper._seen) == 2
+        assert deduper.report(raised(ValueError())) is not None
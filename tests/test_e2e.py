@@ -0,0 +1,82 @@
+import asyncio
+from http import HTTPStatus
+
+import pytest
+import telegram
+
+import homework
+from engine import PollingEngine, Subscription
+from ratelimit import RateLimiter
+from tests.fake_servers import FakePracticum, FakeTelegram
+
+
+@pytest.fixture
+def practicum(monkeypatch):
+    with FakePracticum() as fake:
+        monkeypatch.setattr(homework, 'ENDPOINT', fake.endpoint)
+        yield fake
+
+
+@pytest.fixture
+def telegram_api():
+    with FakeTelegram(retry_after=0.01) as fake:
+        yield fake
+
+
+def make_engine(telegram_api, subscriptions, stream=False):
+    bot = telegram.Bot(token='123:fake', base_url=telegram_api.base_url)
+    engine = PollingEngine(bot, subscriptions, stream=stream)
+    engine.outbox.limiter = RateLimiter(global_rate=10 ** 6, chat_rate=10 ** 6)
+    for tenant in engine.tenants:
+        tenant.current_timestamp = 0
+    return engine
+
+
+class TestEndToEnd:
+
+    def test_status_change_is_delivered(self, practicum, telegram_api):
+        practicum.set_status('token', 'hw1', 'reviewing')
+        engine = make_engine(telegram_api, [Subscription('token', ('42',))])
+        asyncio.run(engine.poll_all())
+        assert [message.chat_id for message in telegram_api.messages] == ['42']
+        assert telegram_api.messages[0].text == homework.parse_status(
+            {'homework_name': 'hw1', 'status': 'reviewing'}
+        )
+
+        asyncio.run(engine.poll_all())
+        assert len(telegram_api.messages) == 1
+
+    def test_injected_errors_are_retried(self, practicum, telegram_api):
+        practicum.set_status('token', 'hw1', 'approved')
+        practicum.fail(HTTPStatus.BAD_GATEWAY)
+        telegram_api.fail(HTTPStatus.TOO_MANY_REQUESTS)
+        engine = make_engine(telegram_api, [Subscription('token', ('42',))])
+        asyncio.run(engine.poll_all())
+        assert practicum.requests == 2
+        assert telegram_api.requests == 2
+        assert len(telegram_api.messages) == 1
+
+    def test_unknown_token_is_reported_and_stopped(self, practicum,
+                                                   telegram_api):
+        engine = make_engine(telegram_api, [Subscription('stranger', ('42',))])
+        asyncio.run(engine.poll_all())
+        assert telegram_api.messages[0].text.startswith('Опрос остановлен')
+        assert engine.tenants == []
+
+    def test_streamed_backfill(self, practicum, telegram_api):
+        for number in range(30):
+            practicum.set_status('token', f'hw{number}', 'approved')
+        engine = make_engine(telegram_api, [Subscription('token', ('42',))],
+                             stream=True)
+        asyncio.run(engine.poll_all())
+        names = {
+            line.split('"')[1]
+            for message in telegram_api.messages
+            for line in message.text.split('\n\n')
+        }
+        assert names == {f'hw{number}' for number in range(30)}
+        assert engine.tenants[0].current_timestamp > 0
+
+        practicum.set_status('token', 'hw0', 'unknown')
+        asyncio.run(engine.poll_all())
+        assert telegram_api.messages[-1].text.startswith('Сбой')
@@ -0,0 +1,249 @@
+import asyncio
+import json
+
+import pytest
+
+from engine import (
+    PollingEngine, Subscription, load_subscriptions, parse_chat_ids
+)
+from exceptions import ApiConnectionFailed, KeyNotExistsError
+from homework import Homework, new_statuses, parse_homeworks, parse_status
+from jsonstream import HomeworkStream
+from outbox import SEPARATOR
+from ratelimit import RateLimiter
+
+
+def make_engine(fetch, sent):
+    def send(bot, chat_id, message):
+        if message is not None:
+            sent.append((chat_id, message))
+
+    subscriptions = [Subscription('token-1', ('1',)),
+                     Subscription('token-2', ('2',))]
+    engine = PollingEngine(None, subscriptions, concurrency=2,
+                           fetch=fetch, send=send)
+    engine.outbox.limiter = RateLimiter(global_rate=10 ** 6, chat_rate=10 ** 6)
+    return engine
+
+
+class TestPollingEngine:
+
+    def test_polls_every_tenant(self, random_timestamp):
+        def fetch(token, current_timestamp):
+            return {
+                'homeworks': [{'homework_name': token, 'status': 'approved'}],
+                'current_date': random_timestamp,
+            }
+
+        sent = []
+        engine = make_engine(fetch, sent)
+        asyncio.run(engine.poll_all())
+        assert sorted(chat_id for chat_id, _ in sent) == ['1', '2']
+        for tenant in engine.tenants:
+            assert tenant.current_timestamp == random_timestamp
+
+    def test_status_is_broadcast_failure_goes_to_owner(self):
+        def fetch(token, current_timestamp):
+            if token == 'broken':
+                raise KeyNotExistsError('homeworks')
+            return {
+                'homeworks': [{'homework_name': 'hw', 'status': 'approved'}],
+                'current_date': 1,
+            }
+
+        sent = []
+        engine = make_engine(fetch, sent)
+        engine.tenants[0].subscription = Subscription('ok', ('1', '2', '3'))
+        engine.tenants[1].subscription = Subscription('broken', ('4', '5'))
+        asyncio.run(engine.poll_all())
+        assert sorted(chat_id for chat_id, _ in sent) == ['1', '2', '3', '4']
+
+    def test_failure_is_reported_once(self):
+        def fetch(token, current_timestamp):
+            raise KeyNotExistsError('homeworks')
+
+        sent = []
+        engine = make_engine(fetch, sent)
+        asyncio.run(engine.poll_all())
+        asyncio.run(engine.poll_all())
+        assert len(sent) == 2
+        assert all('Сбой' in message for _, message in sent)
+
+    def test_transient_failure_is_retried_before_alerting(self, monkeypatch):
+        monkeypatch.setattr('engine.RETRY_ATTEMPTS', 2)
+
+        def fetch(token, current_timestamp):
+            raise ApiConnectionFailed(502)
+
+        sent = []
+        engine = make_engine(fetch, sent)
+        tenant = engine.tenants[0]
+        engine.tenants = [tenant]
+        for _ in range(2):
+            asyncio.run(engine.poll_all())
+            assert sent == []
+            assert 0 <= tenant.retry_in <= 120
+        asyncio.run(engine.poll_all())
+        assert len(sent) == 1
+
+    def test_permanent_failure_stops_the_tenant(self):
+        def fetch(token, current_timestamp):
+            if token == 'token-1':
+                raise ApiConnectionFailed(401)
+            return {'homeworks': [], 'current_date': 1}
+
+        sent = []
+        engine = make_engine(fetch, sent)
+        asyncio.run(engine.poll_all())
+        assert sent == [('1', 'Опрос остановлен: Connection problem code: 401')]
+        assert [tenant.subscription.token for tenant in engine.tenants] == [
+            'token-2'
+        ]
+
+    def test_retry_shortens_the_sleep_once(self, monkeypatch):
+        monkeypatch.setattr('engine.retry_delay', lambda attempt: 0.01)
+        calls = []
+
+        def fetch(token, current_timestamp):
+            calls.append(token)
+            if len(calls) == 1:
+                raise ApiConnectionFailed(503)
+            return {'homeworks': [], 'current_date': 1}
+
+        engine = make_engine(fetch, [])
+        tenant = engine.tenants[0]
+
+        async def scenario():
+            engine.outbox.start()
+            task = asyncio.ensure_future(engine._run_tenant(tenant))
+            await asyncio.sleep(0.2)
+            task.cancel()
+            await engine.outbox.stop()
+
+        tenant.schedule.base = tenant.schedule.interval = 1000
+        asyncio.run(scenario())
+        # Один повтор через секунды, затем ждём по расписанию
+        assert calls == ['token-1', 'token-1']
+
+    def test_every_transition_is_sent_once(self, random_timestamp):
+        homeworks = [
+            {'id': 2, 'homework_name': 'hw2', 'status': 'approved'},
+            {'id': 1, 'homework_name': 'hw1', 'status': 'rejected'},
+        ]
+
+        def fetch(token, current_timestamp):
+            return {'homeworks': homeworks, 'current_date': random_timestamp}
+
+        sent = []
+        engine = make_engine(fetch, sent)
+        engine.tenants = engine.tenants[:1]
+        asyncio.run(engine.poll_all())
+        assert [message.split('"')[1] for message in sent[0][1].split(
+            SEPARATOR)] == ['hw1', 'hw2']
+
+        homeworks[0] = {'id': 2, 'homework_name': 'hw2', 'status': 'reviewing'}
+        asyncio.run(engine.poll_all())
+        assert len(sent) == 2
+        assert engine.tenants[0].statuses == {'1': 'rejected', '2': 'reviewing'}
+
+    @pytest.mark.parametrize('stream', [False, True])
+    def test_unknown_status_does_not_hold_back_the_rest(self, stream):
+        answer = {
+            'homeworks': [
+                {'id': 2, 'homework_name': 'hw2', 'status': 'on_hold'},
+                {'id': 1, 'homework_name': 'hw1', 'status': 'approved'},
+                {'id': 3, 'homework_name': 'hw3', 'status': 'rejected'},
+            ],
+            'current_date': 100,
+        }
+        since = []
+
+        def fetch(token, current_timestamp):
+            since.append(current_timestamp)
+            if stream:
+                return HomeworkStream([json.dumps(answer).encode()])
+            return answer
+
+        sent = []
+        engine = make_engine(fetch, sent)
+        engine.stream = stream
+        engine.tenants = engine.tenants[:1]
+        for _ in range(3):
+            asyncio.run(engine.poll_all())
+        text = SEPARATOR.join(message for _, message in sent)
+        assert text.count('"hw1"') == 1
+        assert text.count('"hw3"') == 1
+        assert text.count('Сбой') == 1
+        assert since[1:] == [100, 100]
+        assert engine.tenants[0].statuses == {
+            '1': 'approved', '2': 'on_hold', '3': 'rejected'
+        }
+
+
+def test_new_statuses():
+    last_statuses = {'1': 'reviewing', '2': 'approved'}
+    homeworks = [
+        {'id': 3, 'status': 'reviewing'},
+        {'id': 2, 'status': 'approved'},
+        {'id': 1, 'status': 'approved'},
+    ]
+    assert [hw['id'] for hw in new_statuses(homeworks, last_statuses)] == [1, 3]
+
+
+class TestHomework:
+
+    def test_payload_is_parsed_once(self):
+        answer = json.loads(
+            '{"homeworks": [{"id": 1, "homework_name": "hw", '
+            '"status": "approved", "lesson_name": "Спринт 1", '
+            '"reviewer_comment": "ok"}, {"id": 2, "homework_name": "hw", '
+            '"status": "approved", "lesson_name": "Спринт 1"}]}'
+        )
+        first, second = parse_homeworks(answer)
+        assert first.status is second.status
+        assert first.lesson_name is second.lesson_name
+        assert first.key == '1'
+        assert first['id'] == 1
+        assert first.get('reviewer_comment') is None
+        assert 'date_updated' not in first
+        assert not hasattr(first, '__dict__')
+        assert parse_status(first) == parse_status(answer['homeworks'][0])
+
+    def test_broken_items_raise_like_payloads(self):
+        with pytest.raises(KeyNotExistsError):
+            parse_status(Homework.from_api({'status': 'approved'}))
+        with pytest.raises(KeyNotExistsError):
+            Homework.from_api('hw')
+
+    def test_engine_keeps_records(self):
+        def fetch(token, current_timestamp):
+            return {
+                'homeworks': [{'id': 1, 'homework_name': 'hw',
+                               'status': 'approved'}],
+                'current_date': 1,
+            }
+
+        engine = make_engine(fetch, [])
+        engine.status_cache._entries['token-1'] = (0, {})
+        asyncio.run(engine.poll_all())
+        cached = engine.status_cache._entries['token-1'][1]['1']
+        assert isinstance(cached, Homework)
+        key, status = next(iter(engine.tenants[0].statuses.items()))
+        assert key is cached.key
+        assert status is cached.status
+
+
+def test_load_subscriptions(tmp_path):
+    path = tmp_path / 'subscriptions.json'
+    path.write_text(json.dumps([
+        {'token': 'abc', 'chat_id': 42},
+        {'token': 'def', 'chat_ids': [1, '2']},
+    ]))
+    assert load_subscriptions(path) == [
+        Subscription('abc', ('42',)), Subscription('def', ('1', '2'))
+    ]
+    assert parse_chat_ids(' 1, 2,,3 ') == ('1', '2', '3')
+
+    path.write_text(json.dumps([{'token': 'abc'}]))
+    with pytest.raises(KeyNotExistsError):
+        load_subscriptions(path)
@@ -0,0 +1,55 @@
+import json
+
+import pytest
+
+from exceptions import (
+    HomeworksNotListError, KeyNotExistsError, ResponseNotDictError
+)
+from jsonstream import HomeworkStream
+
+
+def chunked(body, size):
+    data = body.encode()
+    return [data[start:start + size] for start in range(0, len(data), size)]
+
+
+def parse(body, size):
+    stream = HomeworkStream(chunked(body, size))
+    return list(stream), stream.fields
+
+
+class TestHomeworkStream:
+
+    @pytest.mark.parametrize('size', [1, 2, 7, 4096])
+    def test_matches_json_loads(self, size):
+        answer = {
+            'homeworks': [
+                {'id': number, 'homework_name': f'работа {number}',
+                 'status': 'approved', 'reviewer_comment': 'Всё \"ок\"'}
+                for number in range(20)
+            ],
+            'current_date': 1234567890,
+        }
+        body = json.dumps(answer, ensure_ascii=False, indent=1)
+        homeworks, fields = parse(body, size)
+        assert homeworks == answer['homeworks']
+        assert fields == {'current_date': 1234567890}
+
+    def test_current_date_first_and_empty_list(self):
+        assert parse('{"current_date": 12, "homeworks": []}', 1) == (
+            [], {'current_date': 12}
+        )
+        assert parse('{"homeworks":[],"current_date":12}', 3) == (
+            [], {'current_date': 12}
+        )
+
+    @pytest.mark.parametrize('body, error', [
+        ('[1, 2]', ResponseNotDictError),
+        ('{"current_date": 1}', KeyNotExistsError),
+        ('{}', KeyNotExistsError),
+        ('{"homeworks": {"a": 1}}', HomeworksNotListError),
+        ('{"homeworks": [{"a": 1}', json.JSONDecodeError),
+    ])
+    def test_errors(self, body, error):
+        with pytest.raises(error):
+            parse(body, 2)
@@ -0,0 +1,163 @@
+import asyncio
+import threading
+
+from engine import PollingEngine, Subscription
+from ledger import BUSY, CLAIMED, SENT, NotificationLedger, notification_key
+from outbox import Outbox
+from ratelimit import RateLimiter
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def open_ledger(tmp_path, owner, **kwargs):
+    ledger = NotificationLedger(str(tmp_path / 'ledger.log'), **kwargs)
+    ledger.owner = owner
+    return ledger
+
+
+class TestNotificationLedger:
+
+    def test_index_is_rebuilt_from_the_log(self, tmp_path):
+        ledger = open_ledger(tmp_path, 'a')
+        sent = notification_key('1', '7', 'approved', '2022-01-01')
+        pending = notification_key('1', '8', 'approved', '2022-01-01')
+        assert ledger.claim(sent) == CLAIMED
+        ledger.commit(sent)
+        assert ledger.claim(pending) == CLAIMED
+        ledger.close()
+        with open(tmp_path / 'ledger.log', 'a') as file:
+            file.write('["c","torn')
+
+        ledger = open_ledger(tmp_path, 'b')
+        assert ledger.sent == {sent}
+        assert ledger.claim(sent) == SENT
+        assert ledger.claims[pending][0] == 'a'
+
+    def test_processes_share_the_log(self, tmp_path):
+        clock = FakeClock()
+        first = open_ledger(tmp_path, 'first', clock=clock, claim_ttl=60)
+        second = open_ledger(tmp_path, 'second', clock=clock, claim_ttl=60)
+        key = notification_key('1', '7', 'approved', None)
+        assert first.claim(key) == CLAIMED
+        assert second.claim(key) == BUSY
+        first.commit(key)
+        assert second.claim(key) == SENT
+
+        # Упавший процесс не держит сообщение вечно
+        orphan = notification_key('1', '8', 'approved', None)
+        assert first.claim(orphan) == CLAIMED
+        clock.now += 61
+        assert second.claim(orphan) == CLAIMED
+        second.release(orphan)
+        assert first.claim(orphan) == CLAIMED
+
+    def test_compaction_keeps_every_reader_in_sync(self, tmp_path):
+        first = open_ledger(tmp_path, 'first', compact_every=10)
+        second = open_ledger(tmp_path, 'second', compact_every=10)
+        keys = [notification_key('1', number, 'approved', None)
+                for number in range(30)]
+        for key in keys:
+            first.claim(key)
+            first.commit(key)
+        with open(tmp_path / 'ledger.log') as file:
+            assert len(file.readlines()) < 2 * len(keys)
+        assert all(second.claim(key) == SENT for key in keys)
+        extra = notification_key('2', 1, 'approved', None)
+        assert second.claim(extra) == CLAIMED
+        second.commit(extra)
+        assert first.claim(extra) == SENT
+
+
+def send_twice(ledger, send):
+    sent, dropped = [], []
+
+    async def run():
+        outbox = Outbox(send, workers=1, retries=0, ledger=ledger,
+                        limiter=RateLimiter(global_rate=10 ** 6,
+                                            chat_rate=10 ** 6))
+        outbox.start()
+        for _ in range(2):
+            outbox.put('1', 'text', on_sent=lambda: sent.append(1),
+                       on_dropped=lambda: dropped.append(1),
+                       idempotency=('7', 'approved', '2022-01-01'))
+            await outbox.join()
+        await outbox.stop()
+        return outbox
+
+    return asyncio.run(run()), sent, dropped
+
+
+class TestOutboxLedger:
+
+    def test_delivered_message_is_not_sent_again(self, tmp_path):
+        calls = []
+
+        async def send(chat_id, text):
+            calls.append(text)
+
+        outbox, sent, _ = send_twice(open_ledger(tmp_path, 'a'), send)
+        assert calls == ['text']
+        assert sent == [1, 1]
+        assert outbox.duplicates == 1
+
+    def test_failed_send_gives_up_the_claim(self, tmp_path):
+        async def send(chat_id, text):
+            raise RuntimeError('network')
+
+        ledger = open_ledger(tmp_path, 'a')
+        outbox, _, dropped = send_twice(ledger, send)
+        assert dropped == [1, 1]
+        assert outbox.failed == 2
+        assert ledger.claims == {}
+        assert ledger.sent == set()
+
+    def test_ledger_is_not_called_on_the_event_loop(self, tmp_path):
+        threads = []
+
+        class Ledger(NotificationLedger):
+
+            def claim(self, key):
+                threads.append(threading.current_thread())
+                return super().claim(key)
+
+            def commit(self, key):
+                threads.append(threading.current_thread())
+                super().commit(key)
+
+        async def send(chat_id, text):
+            pass
+
+        send_twice(Ledger(str(tmp_path / 'ledger.log')), send)
+        assert len(threads) == 3
+        assert threading.main_thread() not in threads
+
+
+def test_restart_without_checkpoint_does_not_notify_twice(tmp_path):
+    def fetch(token, current_timestamp):
+        return {
+            'homeworks': [{'id': 1, 'homework_name': 'hw',
+                           'status': 'approved',
+                           'date_updated': '2022-01-01T00:00:00Z'}],
+            'current_date': 1,
+        }
+
+    sent = []
+    for owner in ('before crash', 'after crash'):
+        engine = PollingEngine(
+            None, [Subscription('token', ('1', '2'))], fetch=fetch,
+            send=lambda bot, chat_id, text: sent.append(chat_id),
+            ledger=open_ledger(tmp_path, owner)
+        )
+        engine.outbox.limiter = RateLimiter(
+            global_rate=10 ** 6, chat_rate=10 ** 6
+        )
+        asyncio.run(engine.poll_all())
+    assert sorted(sent) == ['1', '2']
+    assert engine.outbox.duplicates == 2
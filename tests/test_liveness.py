@@ -0,0 +1,119 @@
+import asyncio
+import logging
+import threading
+
+import requests
+
+from engine import PollingEngine, Subscription
+from liveness import Heartbeat, Watchdog, thread_stacks
+from metrics import Registry, serve
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestHeartbeat:
+
+    def test_silence_is_a_stall(self):
+        clock = FakeClock()
+        heartbeat = Heartbeat(clock=clock)
+        clock.now = 100
+        assert heartbeat.stall(150) is None
+        clock.now = 200
+        assert heartbeat.stall(150) == 'no heartbeat for 200 s'
+        heartbeat.beat(cycle=True)
+        assert heartbeat.stall(150) is None
+        assert heartbeat.cycles == 1
+
+    def test_hung_call_is_a_stall_while_the_loop_beats(self):
+        clock = FakeClock()
+        heartbeat = Heartbeat(clock=clock)
+        with heartbeat.running('request_homeworks'):
+            clock.now = 200
+            heartbeat.beat()
+            assert heartbeat.stall(150) == (
+                'request_homeworks running for 200 s'
+            )
+        assert heartbeat.stall(150) is None
+
+
+class TestWatchdog:
+
+    def test_reports_once_per_stall(self, caplog):
+        clock = FakeClock()
+        heartbeat = Heartbeat(clock=clock)
+        watchdog = Watchdog(heartbeat, limit=10)
+        clock.now = 20
+        with caplog.at_level(logging.WARNING):
+            watchdog.check()
+            watchdog.check()
+            heartbeat.beat()
+            watchdog.check()
+        messages = [record.getMessage() for record in caplog.records]
+        assert len(messages) == 2
+        assert messages[0].startswith('Polling loop stalled: no heartbeat')
+        assert 'Thread MainThread' in messages[0]
+        assert messages[1] == 'Polling loop recovered'
+
+    def test_thread_stacks_show_every_thread(self):
+        stop = threading.Event()
+        thread = threading.Thread(target=stop.wait, name='stuck-sender')
+        thread.start()
+        try:
+            assert 'Thread stuck-sender' in thread_stacks()
+        finally:
+            stop.set()
+            thread.join()
+
+
+def test_healthz():
+    clock = FakeClock()
+    heartbeat = Heartbeat(clock=clock)
+    server = serve(0, registry=Registry(),
+                   health=lambda: heartbeat.health(10))
+    try:
+        url = f'http://127.0.0.1:{server.server_port}/healthz'
+        response = requests.get(url)
+        assert response.status_code == 200
+        assert response.json()['status'] == 'ok'
+        assert set(response.json()) >= {'last_fetch', 'last_send'}
+        clock.now = 60
+        response = requests.get(url)
+        assert response.status_code == 503
+        assert response.json()['stall'] == 'no heartbeat for 60 s'
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_engine_tracks_blocking_calls():
+    release = threading.Event()
+    seen = []
+
+    def fetch(token, current_timestamp):
+        release.wait(5)
+        return {'homeworks': [], 'current_date': 1}
+
+    engine = PollingEngine(
+        None, [Subscription('token', ('1',))], fetch=fetch,
+        send=lambda *args: None
+    )
+
+    async def run():
+        polling = asyncio.ensure_future(engine.poll_all())
+        while engine.heartbeat.oldest_call() is None:
+            await asyncio.sleep(0.001)
+        seen.append(engine.heartbeat.oldest_call()[0])
+        release.set()
+        await polling
+
+    asyncio.run(run())
+    assert seen == ['fetch']
+    assert engine.heartbeat.oldest_call() is None
+    assert engine.heartbeat.cycles == 1
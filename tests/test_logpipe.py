@@ -0,0 +1,126 @@
+import json
+import logging
+import threading
+import time
+
+from logpipe import (
+    JsonFormatter, SamplingFilter, TextFormatter, background_handler
+)
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class SlowHandler(logging.Handler):
+
+    def __init__(self, delay=0, gate=None):
+        super().__init__()
+        self.delay = delay
+        self.gate = gate
+        self.lines = []
+
+    def emit(self, record):
+        if self.gate is not None:
+            self.gate.wait()
+        time.sleep(self.delay)
+        self.lines.append(self.format(record))
+
+
+def make_record(msg, level=logging.DEBUG, exc_info=None):
+    return logging.LogRecord(
+        'homework', level, __file__, 1, msg, None, exc_info, 'parse_status'
+    )
+
+
+def raise_here():
+    raise ValueError('boom')
+
+
+def failure():
+    try:
+        raise_here()
+    except ValueError as error:
+        return (ValueError, error, error.__traceback__)
+
+
+class TestSamplingFilter:
+
+    def test_burst_then_summary_after_window(self):
+        clock = FakeClock()
+        sampler = SamplingFilter(burst=2, window=10, clock=clock)
+        passed = [sampler.filter(make_record('No new statuses'))
+                  for _ in range(5)]
+        assert passed == [True, True, False, False, False]
+
+        clock.now = 10
+        record = make_record('No new statuses')
+        assert sampler.filter(record)
+        assert record.suppressed == 3
+
+    def test_info_is_never_sampled(self):
+        sampler = SamplingFilter(burst=1, window=10, clock=FakeClock())
+        assert all(sampler.filter(make_record('sent', logging.INFO))
+                   for _ in range(5))
+
+    def test_failures_are_keyed_by_raise_site(self):
+        sampler = SamplingFilter(burst=1, window=10, clock=FakeClock())
+        first = make_record('first', logging.ERROR, failure())
+        second = make_record('second', logging.ERROR, failure())
+        assert sampler.filter(first)
+        assert not sampler.filter(second)
+        assert sampler.filter(make_record('other', logging.ERROR))
+
+
+class TestFormatters:
+
+    def test_json_line(self):
+        record = make_record('Статус', logging.ERROR, failure())
+        record.suppressed = 4
+        entry = json.loads(JsonFormatter().format(record))
+        assert entry['message'] == 'Статус'
+        assert entry['level'] == 'ERROR'
+        assert entry['suppressed'] == 4
+        assert 'raise_here' in entry['exc']
+
+    def test_text_mentions_suppressed_records(self):
+        record = make_record('idle')
+        record.suppressed = 2
+        text = TextFormatter('%(message)s').format(record)
+        assert text == 'idle [2 similar records suppressed]'
+
+
+class TestBackgroundHandler:
+
+    def test_slow_target_does_not_block_the_caller(self):
+        target = SlowHandler(delay=0.05)
+        handler, listener = background_handler(
+            target, '%(message)s', sampler=SamplingFilter(burst=100)
+        )
+        started = time.perf_counter()
+        for number in range(10):
+            handler.handle(make_record(f'record {number}', logging.INFO))
+        elapsed = time.perf_counter() - started
+        listener.stop()
+
+        assert elapsed < 0.05
+        assert target.lines == [f'record {number}' for number in range(10)]
+
+    def test_full_queue_drops_records(self):
+        gate = threading.Event()
+        target = SlowHandler(gate=gate)
+        handler, listener = background_handler(
+            target, '%(message)s', queue_size=1
+        )
+        for number in range(5):
+            handler.handle(make_record(f'record {number}', logging.INFO))
+        gate.set()
+        listener.stop()
+
+        assert handler.dropped >= 3
+        assert len(target.lines) == 5 - handler.dropped
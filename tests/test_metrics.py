@@ -0,0 +1,63 @@
+import threading
+
+import requests
+
+from metrics import Counter, Gauge, Histogram, Registry, serve
+
+
+class TestMetrics:
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = Histogram('latency', 'Latency.', buckets=(0.1, 1))
+        for value in (0.05, 0.1, 0.5, 3):
+            histogram.observe(value)
+        samples = dict(histogram.samples())
+        assert samples['latency_bucket{le="0.1"}'] == 2
+        assert samples['latency_bucket{le="1"}'] == 3
+        assert samples['latency_bucket{le="+Inf"}'] == 4
+        assert samples['latency_count'] == 4
+        assert samples['latency_sum'] == 3.65
+
+    def test_render(self):
+        registry = Registry()
+        errors = registry.register(Counter('errors_total', 'Errors.', ('error',)))
+        errors.inc('ApiNotFoundError')
+        errors.inc('ApiNotFoundError')
+        registry.register(Gauge('depth', 'Depth.', function=lambda: 7))
+        assert registry.render() == (
+            '# HELP errors_total Errors.\n'
+            '# TYPE errors_total counter\n'
+            'errors_total{error="ApiNotFoundError"} 2\n'
+            '# HELP depth Depth.\n'
+            '# TYPE depth gauge\n'
+            'depth 7\n'
+        )
+
+    def test_render_while_new_series_appear(self):
+        registry = Registry()
+        errors = registry.register(Counter('errors_total', 'Errors.', ('error',)))
+
+        def increment():
+            for number in range(20000):
+                errors.inc(str(number))
+
+        thread = threading.Thread(target=increment)
+        thread.start()
+        while thread.is_alive():
+            registry.render()
+        thread.join()
+        assert len(errors.values) == 20000
+
+    def test_scrape_endpoint(self):
+        registry = Registry()
+        registry.register(Counter('polls_total', 'Polls.')).inc()
+        server = serve(0, registry=registry)
+        try:
+            url = f'http://127.0.0.1:{server.server_port}'
+            response = requests.get(f'{url}/metrics')
+            assert response.status_code == 200
+            assert 'polls_total 1' in response.text
+            assert requests.get(f'{url}/other').status_code == 404
+        finally:
+            server.shutdown()
+            server.server_close()
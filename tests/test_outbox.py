@@ -0,0 +1,137 @@
+import asyncio
+
+from outbox import MESSAGE_MAX_LENGTH, SEPARATOR, Outbox
+from ratelimit import RateLimiter
+
+
+def unlimited():
+    return RateLimiter(global_rate=10 ** 6, chat_rate=10 ** 6)
+
+
+def deliver(outbox, messages):
+    async def run():
+        outbox.start()
+        for chat_id, text, on_sent in messages:
+            outbox.put(chat_id, text, on_sent)
+        await outbox.join()
+        await outbox.stop()
+
+    asyncio.run(run())
+
+
+class TestOutbox:
+
+    def test_keeps_order_per_chat(self):
+        sent = []
+
+        async def send(chat_id, text):
+            await asyncio.sleep(0.001)
+            sent.extend((chat_id, part) for part in text.split(SEPARATOR))
+
+        outbox = Outbox(send, workers=3, limiter=unlimited())
+        deliver(outbox, [(chat_id, str(text), None)
+                         for text in range(10) for chat_id in 'abc'])
+        for chat_id in 'abc':
+            assert [text for chat, text in sent if chat == chat_id] == [
+                str(text) for text in range(10)
+            ]
+        assert outbox.stats()['sent'] == 30
+        assert outbox.depth == 0
+
+    def test_depth_counts_queued_messages(self):
+        async def send(chat_id, text):
+            pass
+
+        async def run():
+            outbox = Outbox(send, workers=1, limiter=unlimited())
+            outbox.start()
+            for text in 'abc':
+                outbox.put('1', text)
+            outbox.put('2', 'd')
+            depth = outbox.depth
+            await outbox.join()
+            await outbox.stop()
+            return depth, outbox.depth
+
+        assert asyncio.run(run()) == (4, 0)
+
+    def test_retries_then_confirms(self):
+        attempts = []
+        confirmed = []
+
+        async def send(chat_id, text):
+            attempts.append(text)
+            if len(attempts) < 3:
+                raise ConnectionError
+
+        outbox = Outbox(send, workers=1, retries=2, backoff=0,
+                        limiter=unlimited())
+        deliver(outbox, [('a', 'hi', lambda: confirmed.append('hi'))])
+        assert len(attempts) == 3
+        assert confirmed == ['hi']
+
+    def test_gives_up_without_confirming(self):
+        confirmed = []
+
+        async def send(chat_id, text):
+            raise ConnectionError
+
+        outbox = Outbox(send, workers=1, retries=1, backoff=0,
+                        limiter=unlimited())
+        deliver(outbox, [('a', 'hi', lambda: confirmed.append('hi'))])
+        assert confirmed == []
+        assert outbox.stats()['failed'] == 1
+
+    def test_coalesces_burst_for_one_chat(self):
+        sent = []
+
+        async def send(chat_id, text):
+            sent.append(text)
+
+        outbox = Outbox(send, workers=1, limiter=RateLimiter(chat_rate=50))
+        long_text = 'x' * (MESSAGE_MAX_LENGTH // 2)
+        deliver(outbox, [('a', text, None)
+                         for text in ['1', '2', '3', long_text, long_text]])
+        assert sent == [SEPARATOR.join(['1', '2', '3', long_text]), long_text]
+        assert outbox.stats()['coalesced'] == 3
+
+    def test_honours_retry_after(self):
+        class RetryAfter(Exception):
+            retry_after = 0.01
+
+        attempts = []
+
+        async def send(chat_id, text):
+            attempts.append(text)
+            if len(attempts) == 1:
+                raise RetryAfter
+
+        limiter = unlimited()
+        outbox = Outbox(send, workers=1, retries=0, limiter=limiter)
+        deliver(outbox, [('a', 'hi', None)])
+        assert attempts == ['hi', 'hi']
+        assert limiter.paused_until > 0
+
+    def test_fan_out_isolates_failed_recipient(self):
+        sent = []
+        confirmed = []
+
+        async def send(chat_id, text):
+            if chat_id == 'blocked':
+                raise ConnectionError
+            sent.append(chat_id)
+
+        outbox = Outbox(send, workers=4, retries=1, backoff=0,
+                        limiter=unlimited())
+
+        async def run():
+            outbox.start()
+            outbox.put_many(['a', 'blocked', 'b', 'c'], 'hi',
+                            lambda: confirmed.append('hi'))
+            await outbox.join()
+            await outbox.stop()
+
+        asyncio.run(run())
+        assert sorted(sent) == ['a', 'b', 'c']
+        assert confirmed == ['hi']
+        assert outbox.stats()['failed'] == 1
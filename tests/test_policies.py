@@ -0,0 +1,44 @@
+import pytest
+import requests
+
+from exceptions import (
+    ApiConnectionFailed, ApiNotFoundError, CheckTokensError,
+    CircuitOpenError, HomeworkStatusError, KeyNotExistsError
+)
+from policies import (
+    ALERT_ONCE, DEGRADE, RETRY, STOP, Rule, policy_for, retry_delay
+)
+
+
+@pytest.mark.parametrize('error, action', [
+    (ApiConnectionFailed(502), RETRY),
+    (ApiConnectionFailed(429), RETRY),
+    (requests.ConnectionError(), RETRY),
+    (requests.Timeout(), RETRY),
+    (ApiConnectionFailed(401), STOP),
+    (ApiConnectionFailed(400), ALERT_ONCE),
+    (ApiNotFoundError(), STOP),
+    (CheckTokensError('TELEGRAM_TOKEN'), STOP),
+    (HomeworkStatusError('frozen'), ALERT_ONCE),
+    (KeyNotExistsError('homeworks'), ALERT_ONCE),
+    (CircuitOpenError('endpoint', 10), DEGRADE),
+    (RuntimeError(), ALERT_ONCE),
+])
+def test_policy_for(error, action):
+    assert policy_for(error) == action
+
+
+def test_first_matching_rule_wins():
+    policies = (
+        Rule(KeyError, STOP, when=lambda error: error.args == ('id',)),
+        Rule(LookupError, DEGRADE),
+    )
+    assert policy_for(KeyError('id'), policies) == STOP
+    assert policy_for(KeyError('name'), policies) == DEGRADE
+    assert policy_for(ValueError(), policies) == ALERT_ONCE
+
+
+def test_retry_delay_grows_and_is_capped():
+    assert all(0 <= retry_delay(0, backoff=2) <= 2 for _ in range(100))
+    assert all(0 <= retry_delay(10, backoff=2, backoff_max=30) <= 30
+               for _ in range(100))
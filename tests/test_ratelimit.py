@@ -0,0 +1,37 @@
+from ratelimit import RateLimiter
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestRateLimiter:
+
+    def test_per_chat_limit(self):
+        clock = FakeClock()
+        limiter = RateLimiter(global_rate=30, chat_rate=1, clock=clock)
+        assert limiter.delay('a') == 0
+        assert limiter.delay('a') == 1
+        assert limiter.delay('b') == 0
+        clock.now = 1
+        assert limiter.delay('a') == 0
+
+    def test_global_limit(self):
+        clock = FakeClock()
+        limiter = RateLimiter(global_rate=2, chat_rate=10, clock=clock)
+        assert limiter.delay('a') == 0
+        assert limiter.delay('b') == 0
+        assert limiter.delay('c') == 0.5
+
+    def test_pause(self):
+        clock = FakeClock()
+        limiter = RateLimiter(clock=clock)
+        limiter.pause(5)
+        assert limiter.delay('a') == 5
+        clock.now = 5
+        assert limiter.delay('a') == 0
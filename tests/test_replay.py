@@ -0,0 +1,117 @@
+import json
+
+import pytest
+
+import homework
+import replay
+from replay import Recorder, Recording, read_recordings, worker_path
+from tests.fake_servers import FakePracticum
+
+
+@pytest.fixture
+def recorder(monkeypatch, tmp_path):
+    recorder = Recorder(str(tmp_path / 'answers.log.gz'))
+    monkeypatch.setattr(replay, '_recorder', recorder)
+    yield recorder
+    recorder.close()
+
+
+@pytest.fixture
+def practicum(monkeypatch):
+    with FakePracticum() as fake:
+        monkeypatch.setattr(homework, 'ENDPOINT', fake.endpoint)
+        yield fake
+
+
+def answer(*statuses):
+    return json.dumps({
+        'homeworks': [
+            {'homework_name': f'hw{number}', 'status': status}
+            for number, status in enumerate(statuses)
+        ],
+        'current_date': 100,
+    })
+
+
+class TestRecorder:
+
+    def test_answers_are_recorded(self, recorder, practicum):
+        practicum.set_status('token', 'hw1', 'approved')
+        homework.request_homeworks('token', 0)
+        stream = homework.stream_homeworks('token', 0)
+        assert [hw['homework_name'] for hw in stream] == ['hw1']
+        del stream
+        practicum.fail(500, times=10)
+        with pytest.raises(Exception):
+            homework.request_homeworks('token', 0)
+
+        recordings = list(read_recordings(recorder.path))
+        assert [recording.status_code for recording in recordings][:2] == [
+            200, 200
+        ]
+        assert recordings[0].body == recordings[1].body
+        assert recordings[0].answer()['homeworks'][0]['status'] == 'approved'
+        assert recordings[-1].status_code == 500
+        assert all(recording.tenant != 'token' for recording in recordings)
+
+    def test_torn_tail_is_skipped(self, tmp_path):
+        path = str(tmp_path / 'answers.log')
+        recorder = Recorder(path)
+        recorder.record('token', 0, 200, answer('approved'))
+        recorder.close()
+        with open(path, 'a') as file:
+            file.write('[1.0,"abc",0,20')
+
+        assert len(list(read_recordings(path))) == 1
+
+
+class TestReplay:
+
+    def test_messages_and_failures(self):
+        recordings = [
+            Recording(1.0, 'a', 0, 200, answer('approved')),
+            Recording(2.0, 'a', 0, 200, answer()),
+            Recording(3.0, 'a', 0, 200, answer('frozen')),
+            Recording(4.0, 'a', 0, 503, ''),
+        ]
+        messages = []
+        failures = []
+        stats = replay.replay(
+            recordings, messages.append,
+            on_error=lambda recording, error: failures.append(recording)
+        )
+
+        assert messages == [homework.parse_status(
+            {'homework_name': 'hw0', 'status': 'approved'}
+        )]
+        assert stats == {
+            'answers': 4, 'messages': 1, 'HomeworkStatusError': 1,
+            'ApiConnectionFailed': 1,
+        }
+        assert [recording.recorded_at for recording in failures] == [3.0, 4.0]
+
+    def test_every_homework_is_checked_once_per_transition(self):
+        recordings = [
+            Recording(1.0, 'a', 0, 200, answer('approved')),
+            Recording(2.0, 'a', 0, 200, answer('approved')),
+            Recording(3.0, 'b', 0, 200, answer('approved')),
+            Recording(4.0, 'a', 0, 200, answer('approved', 'brand_new')),
+        ]
+        messages = []
+        stats = replay.replay(recordings, messages.append)
+
+        assert len(messages) == 2
+        assert stats['HomeworkStatusError'] == 1
+
+    def test_speed_shortens_recorded_pauses(self):
+        recordings = [
+            Recording(at, 'a', 0, 200, answer()) for at in (10.0, 30.0, 90.0)
+        ]
+        pauses = []
+        replay.replay(recordings, print, speed=10, sleep=pauses.append)
+        assert pauses == [2.0, 6.0]
+
+
+def test_worker_path():
+    assert worker_path('logs/answers.log.gz', 2) == 'logs/answers.2.log.gz'
+    assert worker_path('answers', 0) == 'answers.0'
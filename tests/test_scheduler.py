@@ -0,0 +1,130 @@
+import asyncio
+
+from engine import PollingEngine, Subscription
+from exceptions import ApiConnectionFailed, ApiNotFoundError
+from scheduler import AdaptiveSchedule, TimingWheel, jitter, phase
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_schedule(clock):
+    return AdaptiveSchedule(base=100, min_interval=10, max_interval=400,
+                            idle_cycles=2, clock=clock)
+
+
+class TestAdaptiveSchedule:
+
+    def test_no_drift(self):
+        clock = FakeClock()
+        schedule = make_schedule(clock)
+        clock.now += 7
+        assert schedule.delay() == 93
+        clock.now += 93 + 5
+        assert schedule.delay() == 95
+
+    def test_jitter_does_not_move_the_cadence(self):
+        clock = FakeClock()
+        schedule = make_schedule(clock)
+        assert schedule.start_at(0.25) == 25
+        clock.now += 25
+        assert schedule.delay(jitter=0.1) == 110
+        clock.now += 110
+        assert schedule.delay(jitter=-0.1) == 80
+
+    def test_missed_cycles_not_replayed(self):
+        clock = FakeClock()
+        schedule = make_schedule(clock)
+        clock.now += 1000
+        assert schedule.delay() == 0
+        assert schedule.delay() == 100
+
+    def test_reviewing_polls_faster_until_verdict(self):
+        schedule = make_schedule(FakeClock())
+        schedule.record_statuses(['reviewing'])
+        assert schedule.interval == 10
+        schedule.record_statuses([])
+        assert schedule.interval == 10
+        schedule.record_statuses(['approved'])
+        assert schedule.interval == 100
+
+    def test_idle_and_failures_slow_down_within_bounds(self):
+        schedule = make_schedule(FakeClock())
+        schedule.record_statuses([])
+        assert schedule.interval == 100
+        for _ in range(10):
+            schedule.record_statuses([])
+        assert schedule.interval == 400
+
+        schedule = make_schedule(FakeClock())
+        schedule.record_failure(ApiNotFoundError())
+        assert schedule.interval == 100
+        schedule.record_failure(ApiConnectionFailed(502))
+        assert schedule.interval == 200
+        schedule.record_statuses([])
+        assert schedule.interval == 100
+
+
+class TestTimingWheel:
+
+    def test_fires_due_keys_only(self):
+        clock = FakeClock()
+        wheel = TimingWheel(resolution=1, slots=8, clock=clock)
+        wheel.schedule('soon', 1002.5)
+        wheel.schedule('later', 1020)
+        wheel.schedule('late', 990)
+        assert len(wheel) == 3
+        assert wheel.advance(1000) == ['late']
+        assert wheel.advance(1003) == ['soon']
+        # Тот же слот через круг: ещё не пора
+        assert wheel.advance(1012) == []
+        assert wheel.advance(1100) == ['later']
+        assert len(wheel) == 0
+
+    def test_reschedule_and_cancel(self):
+        clock = FakeClock()
+        wheel = TimingWheel(resolution=1, slots=8, clock=clock)
+        wheel.schedule('a', 1005)
+        wheel.schedule('a', 1001)
+        wheel.schedule('b', 1002)
+        assert wheel.cancel('b')
+        assert not wheel.cancel('b')
+        assert 'b' not in wheel
+        assert wheel.advance(1010) == ['a']
+
+    def test_phase_and_jitter_are_stable(self):
+        assert phase('token') == phase('token')
+        assert jitter('token', 3) == jitter('token', 3)
+        assert jitter('token', 3) != jitter('token', 4)
+        assert all(abs(jitter('token', cycle, 0.1)) <= 0.1
+                   for cycle in range(100))
+
+
+def test_tenants_started_together_poll_apart():
+    subscriptions = [Subscription(f'token-{number}', (str(number),))
+                     for number in range(50)]
+    engine = PollingEngine(None, subscriptions, fetch=lambda *args: None,
+                           send=lambda *args: None)
+    for tenant in engine.tenants:
+        tenant.schedule.interval = 100
+
+    async def scenario():
+        task = asyncio.ensure_future(engine.run_forever())
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        delays = [tenant.schedule.next_due - engine.wheel.clock()
+                  for tenant in engine.tenants]
+        task.cancel()
+        return delays
+
+    delays = asyncio.run(scenario())
+    assert len(engine.wheel) == 0
+    assert all(0 <= delay < 100 for delay in delays)
+    # Первые опросы разнесены по всему интервалу
+    assert len({int(delay // 10) for delay in delays}) >= 8
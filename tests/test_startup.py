@@ -0,0 +1,34 @@
+import subprocess
+import sys
+from os.path import abspath, dirname
+
+ROOT_DIR = dirname(dirname(abspath(__file__)))
+HEAVY_MODULES = ('telegram', 'requests', 'dotenv')
+
+
+def test_import_does_not_load_heavy_dependencies():
+    code = (
+        'import sys, homework; '
+        f'print([name for name in {HEAVY_MODULES!r} if name in sys.modules])'
+    )
+    result = subprocess.run(
+        [sys.executable, '-c', code], cwd=ROOT_DIR, capture_output=True,
+        text=True, check=True
+    )
+    assert result.stdout.strip() == '[]'
+
+
+def test_setup_logging_is_idempotent():
+    import logging
+
+    import homework
+
+    root = logging.getLogger()
+    before = list(root.handlers)
+    try:
+        homework.setup_logging()
+        homework.setup_logging()
+        added = [handler for handler in root.handlers if handler not in before]
+        assert len(added) <= 1
+    finally:
+        root.handlers = before
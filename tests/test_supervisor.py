@@ -0,0 +1,151 @@
+import asyncio
+import os
+
+from checkpoint import CheckpointStore, tenant_key
+from engine import PollingEngine, Subscription
+from supervisor import HashRing, LeaseManager, ShardWorker, Supervisor
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_worker(index, live, tmp_path, tokens):
+    subscriptions = [Subscription(token, ('1',)) for token in tokens]
+    checkpoint = CheckpointStore(str(tmp_path / f'checkpoint.log.{index}'))
+    engine = PollingEngine(
+        None, [], fetch=lambda *args: None, checkpoint=checkpoint
+    )
+    leases = LeaseManager(str(tmp_path / 'leases'))
+    return ShardWorker(index, live, subscriptions, engine, leases)
+
+
+def polled(worker):
+    return {tenant.subscription.token for tenant in worker.engine.tenants}
+
+
+def exit_at_once(index, live):
+    os._exit(3)
+
+
+class TestHashRing:
+
+    def test_only_tenants_of_a_removed_node_move(self):
+        keys = [tenant_key(f'token-{number}') for number in range(1000)]
+        before = HashRing([0, 1, 2, 3])
+        after = HashRing([0, 1, 3])
+        owners = {key: before.node(key) for key in keys}
+
+        assert set(owners.values()) == {0, 1, 2, 3}
+        for key in keys:
+            if owners[key] != 2:
+                assert after.node(key) == owners[key]
+            else:
+                assert after.node(key) in (0, 1, 3)
+
+    def test_empty_ring(self):
+        assert HashRing([]).node('key') is None
+
+
+class TestLeaseManager:
+
+    def test_lease_is_exclusive_until_released(self, tmp_path):
+        first = LeaseManager(str(tmp_path))
+        second = LeaseManager(str(tmp_path))
+
+        assert first.acquire('token')
+        assert not second.acquire('token')
+        first.release('token')
+        assert second.acquire('token')
+        assert second.held == {'token'}
+
+
+class TestShardWorker:
+
+    def test_tenants_are_split_and_rebalanced(self, tmp_path):
+        live = [1, 1]
+        tokens = [f'token-{number}' for number in range(20)]
+        workers = [make_worker(index, live, tmp_path, tokens)
+                   for index in range(2)]
+        for worker in workers:
+            worker.rebalance()
+
+        assert polled(workers[0]) and polled(workers[1])
+        assert polled(workers[0]) | polled(workers[1]) == set(tokens)
+        assert not polled(workers[0]) & polled(workers[1])
+
+        # Второй воркер умер: его блокировки сняло ядро
+        live[1] = 0
+        for token in list(workers[1].leases.held):
+            workers[1].leases.release(token)
+        workers[0].rebalance()
+        assert polled(workers[0]) == set(tokens)
+
+    def test_busy_lease_is_not_adopted(self, tmp_path):
+        worker = make_worker(0, [1], tmp_path, ['token'])
+        other = LeaseManager(str(tmp_path / 'leases'))
+        other.acquire('token')
+
+        worker.rebalance()
+        assert polled(worker) == set()
+        other.release('token')
+        worker.rebalance()
+        assert polled(worker) == {'token'}
+
+    def test_adopted_tenant_resumes_freshest_checkpoint(self, tmp_path):
+        stale = CheckpointStore(str(tmp_path / 'checkpoint.log.1'))
+        stale.save_date('token', 100)
+        fresh = CheckpointStore(str(tmp_path / 'checkpoint.log.2'))
+        fresh.save_date('token', 200)
+        fresh.save_status('token', '7', 'reviewing')
+
+        worker = make_worker(0, [1], tmp_path, ['token'])
+        worker.rebalance()
+        tenant = worker.engine.tenants[0]
+        assert tenant.current_timestamp == 200
+        assert tenant.statuses == {'7': 'reviewing'}
+        assert worker.engine.checkpoint.current_date('token') == 200
+
+    def test_removed_tenant_stops_polling(self, tmp_path):
+        live = [1, 1]
+        worker = make_worker(0, live, tmp_path, ['a', 'b', 'c', 'd'])
+
+        async def scenario():
+            task = asyncio.ensure_future(worker.engine.run_forever())
+            worker.rebalance()
+            await asyncio.sleep(0)
+            tasks = dict(worker.engine._tasks)
+            live[0] = 0
+            worker.rebalance()
+            await asyncio.sleep(0)
+            task.cancel()
+            return tasks
+
+        tasks = asyncio.run(scenario())
+        assert tasks
+        assert all(task.cancelled() for task in tasks.values())
+        assert worker.engine.tenants == []
+        assert worker.leases.held == set()
+
+
+class TestSupervisor:
+
+    def test_dead_worker_is_marked_down_and_respawned(self):
+        clock = FakeClock()
+        supervisor = Supervisor(2, exit_at_once, respawn_delay=10,
+                                clock=clock)
+        supervisor.start()
+        for process in supervisor.processes.values():
+            process.join()
+
+        supervisor.check()
+        assert list(supervisor.live) == [0, 0]
+        clock.now = 10
+        supervisor.check()
+        assert list(supervisor.live) == [1, 1]
+        supervisor.stop()
@@ -0,0 +1,113 @@
+import asyncio
+import math
+
+import pytest
+
+from engine import PollingEngine, Subscription
+from timeline import TimelineStore, analyze, load, parse_date
+
+np = pytest.importorskip('numpy')
+
+HOUR = 3600
+
+
+def transition(homework_id, name, status, hours, lesson='Спринт 1'):
+    return {
+        'id': homework_id, 'homework_name': name, 'lesson_name': lesson,
+        'status': status,
+        'date_updated': f'2022-01-01T{hours:02d}:00:00Z',
+    }
+
+
+def fill(store):
+    # Студент a: сдал hw1, отклонили через 2 ч, пересдал, приняли через 4 ч
+    store.append('a', transition(1, 'hw1', 'reviewing', 0), 0)
+    store.append('a', transition(1, 'hw1', 'rejected', 2), 0)
+    store.append('a', transition(1, 'hw1', 'reviewing', 5), 0)
+    store.append('a', transition(1, 'hw1', 'approved', 9), 0)
+    # Студент b: hw1 приняли через 1 ч, hw2 ещё на проверке
+    store.append('b', transition(2, 'hw1', 'reviewing', 3), 0)
+    store.append('b', transition(2, 'hw1', 'approved', 4), 0)
+    store.append('b', transition(3, 'hw2', 'reviewing', 6, 'Спринт 2'), 0)
+
+
+class TestTimelineStore:
+
+    def test_rows_survive_reopen_and_torn_writes(self, tmp_path):
+        store = TimelineStore(str(tmp_path))
+        fill(store)
+        store.close()
+        with open(tmp_path / 'time.d', 'ab') as file:
+            file.write(b'\x00' * 5)
+        with open(tmp_path / 'status.B', 'ab') as file:
+            file.write(b'\x01')
+
+        store = TimelineStore(str(tmp_path))
+        assert store.rows == 7
+        store.append('c', transition(4, 'hw3', 'reviewing', 1), 0)
+        store.close()
+
+        columns, strings = load(str(tmp_path))
+        assert len(columns['time']) == 8
+        assert strings[columns['name'][-1]] == 'hw3'
+
+    def test_seen_time_without_date_updated(self):
+        assert parse_date(None, 100) == 100.0
+        assert parse_date('garbage', 100) == 100.0
+        assert parse_date('1970-01-01T00:01:00Z', 0) == 60.0
+
+
+class TestAnalyze:
+
+    def test_per_homework(self, tmp_path):
+        store = TimelineStore(str(tmp_path))
+        fill(store)
+        store.close()
+
+        results = analyze(*load(str(tmp_path)))
+        assert set(results) == {'hw1'}
+        hw1 = results['hw1']
+        assert hw1['reviews'] == 3
+        assert hw1['rejection_rate'] == pytest.approx(1 / 3)
+        assert hw1['review_p50'] == pytest.approx(2)
+        # Раунды 2 ч, 4 ч и 1 ч; полный путь 9 ч и 1 ч
+        assert hw1['turnaround_p50'] == pytest.approx(5)
+
+    def test_stores_of_several_workers(self, tmp_path):
+        first = TimelineStore(str(tmp_path / 'worker-0'))
+        first.append('a', transition(1, 'hw1', 'reviewing', 0), 0)
+        first.close()
+        second = TimelineStore(str(tmp_path / 'worker-1'))
+        second.append('b', transition(2, 'hw9', 'reviewing', 0), 0)
+        second.append('a', transition(1, 'hw1', 'approved', 3, 'x'), 0)
+        second.close()
+
+        results = analyze(*load(str(tmp_path)), by='all')
+        assert results['all']['reviews'] == 1
+        assert results['all']['turnaround_p99'] == pytest.approx(3)
+
+    def test_group_without_finished_rounds(self, tmp_path):
+        store = TimelineStore(str(tmp_path))
+        store.append('a', transition(1, 'hw1', 'approved', 1), 0)
+        store.close()
+        results = analyze(*load(str(tmp_path)), by='lesson')
+        assert results['Спринт 1']['reviews'] == 1
+        assert math.isnan(results['Спринт 1']['turnaround_p50'])
+
+
+def test_engine_records_transitions(tmp_path):
+    timeline = TimelineStore(str(tmp_path))
+
+    def fetch(token, current_timestamp):
+        return {
+            'homeworks': [transition(1, 'hw1', 'reviewing', 0)],
+            'current_date': 1,
+        }
+
+    engine = PollingEngine(
+        None, [Subscription('token', ('1',))], fetch=fetch,
+        send=lambda *args: None, timeline=timeline
+    )
+    asyncio.run(engine.poll_all())
+    asyncio.run(engine.poll_all())
+    assert timeline.rows == 1
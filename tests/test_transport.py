@@ -0,0 +1,63 @@
+from http import HTTPStatus
+
+import pytest
+import requests
+
+from transport import HttpTransport
+
+
+class FakeResponse:
+
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+def scripted_get(monkeypatch, answers):
+    calls = []
+
+    def get(url, **kwargs):
+        calls.append(kwargs)
+        answer = answers.pop(0)
+        if isinstance(answer, Exception):
+            raise answer
+        return FakeResponse(answer)
+
+    monkeypatch.setattr(requests, 'get', get)
+    return calls
+
+
+class TestHttpTransport:
+
+    def test_retries_transient_statuses(self, monkeypatch):
+        calls = scripted_get(monkeypatch, [
+            HTTPStatus.BAD_GATEWAY, HTTPStatus.TOO_MANY_REQUESTS, HTTPStatus.OK
+        ])
+        response = HttpTransport(retries=3).get('http://api')
+        assert response.status_code == HTTPStatus.OK
+        assert len(calls) == 3
+        assert all(call['timeout'] for call in calls)
+
+    def test_gives_up_after_retries(self, monkeypatch):
+        calls = scripted_get(monkeypatch, [HTTPStatus.SERVICE_UNAVAILABLE] * 3)
+        response = HttpTransport(retries=2).get('http://api')
+        assert response.status_code == HTTPStatus.SERVICE_UNAVAILABLE
+        assert len(calls) == 3
+
+    def test_permanent_status_not_retried(self, monkeypatch):
+        calls = scripted_get(monkeypatch, [HTTPStatus.NOT_FOUND])
+        HttpTransport(retries=3).get('http://api')
+        assert len(calls) == 1
+
+    def test_connection_errors_reraised(self, monkeypatch):
+        scripted_get(monkeypatch, [requests.ConnectionError()] * 2)
+        with pytest.raises(requests.ConnectionError):
+            HttpTransport(retries=1).get('http://api')
+
+    def test_backoff_delay(self):
+        transport = HttpTransport(backoff=1, backoff_max=5)
+        for attempt in range(6):
+            assert 0 <= transport.backoff_delay(attempt) <= 5
+        response = FakeResponse(HTTPStatus.TOO_MANY_REQUESTS,
+                                {'Retry-After': '3'})
+        assert transport.backoff_delay(0, response) == 3
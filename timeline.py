@@ -0,0 +1,314 @@
+"""Columnar, append-only timeline of status transitions and its analytics.
+
+    TIMELINE_DIR=timeline python homework.py
+    python timeline.py timeline --by homework
+
+Writing needs only the standard library. The analytics need NumPy,
+which is an optional dependency: `pip install numpy`.
+"""
+import argparse
+import json
+import os
+import threading
+from array import array
+from datetime import datetime
+
+from checkpoint import tenant_key
+from homework import HOMEWORK_STATUSES
+
+
+TIMELINE_DIR = os.getenv('TIMELINE_DIR')
+STATUSES = tuple(HOMEWORK_STATUSES)
+STRINGS_FILE = 'strings.jsonl'
+# Колонка -> код типа `array`; в NumPy это те же типы
+COLUMNS = {
+    'time': 'd',
+    'tenant': 'Q',
+    'homework': 'q',
+    'name': 'I',
+    'lesson': 'I',
+    'status': 'B',
+}
+DTYPES = {
+    'd': '<f8', 'Q': '<u8', 'q': '<i8', 'I': '<u4', 'B': 'u1',
+}
+PERCENTILES = (50, 90, 99)
+
+
+def parse_date(value, default) -> float:
+    """`date_updated` of the API as a POSIX timestamp."""
+    if not value:
+        return float(default)
+    try:
+        return datetime.fromisoformat(
+            value.replace('Z', '+00:00')
+        ).timestamp()
+    except ValueError:
+        return float(default)
+
+
+class TimelineStore:
+    """One file of fixed-width little-endian values per column.
+
+    A row is appended to every column file; strings are replaced by
+    codes from an append-only dictionary. Rows left half-written by a
+    crash are cut off on open, so the columns always line up.
+    """
+
+    def __init__(self, path=TIMELINE_DIR) -> None:
+        """Opens or creates the store in the `path` directory."""
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self._lock = threading.Lock()
+        self._strings = {}
+        strings_path = os.path.join(path, STRINGS_FILE)
+        valid = 0
+        if os.path.exists(strings_path):
+            with open(strings_path, 'rb') as file:
+                for line in file:
+                    try:
+                        self._strings.setdefault(
+                            json.loads(line), len(self._strings)
+                        )
+                    except ValueError:
+                        break
+                    valid += len(line)
+        self._strings_file = open(strings_path, 'a', encoding='utf-8')
+        # Оборванную строку словаря отрезаем, иначе следующие потеряются
+        self._strings_file.truncate(valid)
+        self.rows = min(self._column_rows(name) for name in COLUMNS)
+        self._files = {}
+        for name, typecode in COLUMNS.items():
+            file = open(self._column_path(name), 'ab')
+            file.truncate(self.rows * array(typecode).itemsize)
+            self._files[name] = file
+
+    def _column_path(self, name) -> str:
+        return os.path.join(self.path, f'{name}.{COLUMNS[name]}')
+
+    def _column_rows(self, name) -> int:
+        try:
+            size = os.path.getsize(self._column_path(name))
+        except FileNotFoundError:
+            return 0
+        return size // array(COLUMNS[name]).itemsize
+
+    def _code(self, value) -> int:
+        value = str(value or '')
+        code = self._strings.get(value)
+        if code is None:
+            code = self._strings[value] = len(self._strings)
+            self._strings_file.write(json.dumps(value, ensure_ascii=False))
+            self._strings_file.write('\n')
+            self._strings_file.flush()
+        return code
+
+    def append(self, token, homework, seen_at) -> None:
+        """Stores one transition; `seen_at` is used without `date_updated`."""
+        homework_id = homework.get('id')
+        row = {
+            'time': parse_date(homework.get('date_updated'), seen_at),
+            'tenant': int(tenant_key(token), 16),
+            'homework': homework_id if isinstance(homework_id, int) else -1,
+            'status': STATUSES.index(homework['status']),
+        }
+        with self._lock:
+            row['name'] = self._code(homework.get('homework_name'))
+            row['lesson'] = self._code(homework.get('lesson_name'))
+            for name, typecode in COLUMNS.items():
+                array(typecode, [row[name]]).tofile(self._files[name])
+            for file in self._files.values():
+                file.flush()
+            self.rows += 1
+
+    def close(self) -> None:
+        """Closes the column and string files."""
+        for file in self._files.values():
+            file.close()
+        self._strings_file.close()
+
+
+def _store_paths(path):
+    for directory, _, files in sorted(os.walk(path)):
+        if STRINGS_FILE in files:
+            yield directory
+
+
+def load(path):
+    """Columns of every store under `path` as NumPy arrays.
+
+    Supervisor workers keep a store each; their string codes are mapped
+    onto one shared dictionary. Returns `(columns, strings)`.
+    """
+    import numpy as np
+
+    strings = {}
+    parts = {name: [] for name in COLUMNS}
+    for directory in _store_paths(path):
+        local = []
+        with open(os.path.join(directory, STRINGS_FILE),
+                  encoding='utf-8') as file:
+            for line in file:
+                try:
+                    local.append(json.loads(line))
+                except ValueError:
+                    break
+        remap = np.array(
+            [strings.setdefault(value, len(strings)) for value in local]
+            or [0], dtype='<u4'
+        )
+        columns = {
+            name: np.fromfile(
+                os.path.join(directory, f'{name}.{typecode}'),
+                dtype=DTYPES[typecode]
+            )
+            for name, typecode in COLUMNS.items()
+        }
+        rows = min(len(column) for column in columns.values())
+        for name, column in columns.items():
+            column = column[:rows]
+            if name in ('name', 'lesson'):
+                column = remap[column]
+            parts[name].append(column)
+    columns = {
+        name: (np.concatenate(chunks) if chunks
+               else np.empty(0, dtype=DTYPES[COLUMNS[name]]))
+        for name, chunks in parts.items()
+    }
+    return columns, list(strings)
+
+
+def _percentiles(hours, groups, count):
+    """`PERCENTILES` of `hours` in every group, NaN for empty groups.
+
+    One sort by (group, hours) for all groups at once; the linear
+    interpolation is the one `np.percentile` does by default.
+    """
+    import numpy as np
+
+    # Стабильная сортировка по группе сохраняет порядок часов внутри неё
+    order = np.argsort(hours)
+    order = order[np.argsort(groups[order], kind='stable')]
+    hours = hours[order]
+    sizes = np.bincount(groups, minlength=count)
+    starts = np.cumsum(sizes) - sizes
+    result = np.full((count, len(PERCENTILES)), np.nan)
+    present = np.flatnonzero(sizes)
+    for column, percentile in enumerate(PERCENTILES):
+        rank = (sizes[present] - 1) * (percentile / 100)
+        low = np.floor(rank).astype(np.int64)
+        high = np.minimum(low + 1, sizes[present] - 1)
+        below = hours[starts[present] + low]
+        above = hours[starts[present] + high]
+        result[present, column] = below + (above - below) * (rank - low)
+    return result
+
+
+def analyze(columns, strings, by='homework'):
+    """Review statistics per group, sorted by group name.
+
+    `by` is "homework" (homework_name), "lesson" (lesson_name, the
+    cohort of students doing it) or "all". For every group:
+    `reviews` (verdicts seen), `rejection_rate`, `review_p*` (hours a
+    round spent in `reviewing` before its verdict) and `turnaround_p*`
+    (hours from the first `reviewing` to `approved`).
+    """
+    import numpy as np
+
+    reviewing = STATUSES.index('reviewing')
+    approved = STATUSES.index('approved')
+    rejected = STATUSES.index('rejected')
+
+    # Одна работа одного студента: tenant + id (или имя без id)
+    homework = np.where(
+        columns['homework'] >= 0, columns['homework'],
+        -1 - columns['name'].astype('<i8')
+    )
+    order = np.lexsort((columns['time'], homework, columns['tenant']))
+    time = columns['time'][order]
+    status = columns['status'][order]
+    tenant = columns['tenant'][order]
+    homework = homework[order]
+    if by == 'all':
+        group = np.zeros(len(order), dtype='<u4')
+        names = ['all']
+    else:
+        group = columns['name' if by == 'homework' else 'lesson'][order]
+        names = strings
+
+    same = np.zeros(len(order), dtype=bool)
+    same[1:] = (tenant[1:] == tenant[:-1]) & (homework[1:] == homework[:-1])
+    verdict = (status == approved) | (status == rejected)
+    # Раунд проверки: reviewing и следующий за ним вердикт той же работы
+    rounds = np.flatnonzero(
+        verdict[1:] & same[1:] & (status[:-1] == reviewing)
+    )
+    review_hours = (time[rounds + 1] - time[rounds]) / 3600
+    review_group = group[rounds + 1]
+
+    starts = np.flatnonzero(~same)
+    first_review = np.minimum.reduceat(
+        np.where(status == reviewing, time, np.inf), starts
+    ) if len(starts) else np.empty(0)
+    first_approval = np.minimum.reduceat(
+        np.where(status == approved, time, np.inf), starts
+    ) if len(starts) else np.empty(0)
+    done = np.isfinite(first_review) & np.isfinite(first_approval) & (
+        first_approval >= first_review
+    )
+    turnaround_hours = (first_approval[done] - first_review[done]) / 3600
+    turnaround_group = group[starts][done]
+
+    results = {}
+    verdict_groups = group[verdict]
+    rejections = np.bincount(
+        verdict_groups[status[verdict] == rejected], minlength=len(names)
+    )
+    reviews = np.bincount(verdict_groups, minlength=len(names))
+    fields = [f'{label}_p{percentile}'
+              for label in ('review', 'turnaround')
+              for percentile in PERCENTILES]
+    present = np.flatnonzero(reviews)
+    # Списки Python: поэлементный доступ к массивам тут дороже расчёта
+    percentiles = np.hstack([
+        _percentiles(review_hours, review_group, len(names)),
+        _percentiles(turnaround_hours, turnaround_group, len(names)),
+    ])[present].tolist()
+    counts = reviews[present].tolist()
+    rates = (rejections[present] / reviews[present]).tolist()
+    for code, count, rate, values in zip(
+            present.tolist(), counts, rates, percentiles):
+        stats = results[names[code]] = {
+            'reviews': count, 'rejection_rate': rate,
+        }
+        stats.update(zip(fields, values))
+    return dict(sorted(results.items()))
+
+
+def main():
+    """Prints the review statistics of a timeline as a tab-separated table."""
+    parser = argparse.ArgumentParser(description='Review analytics')
+    parser.add_argument('path', nargs='?', default=TIMELINE_DIR)
+    parser.add_argument('--by', choices=('homework', 'lesson', 'all'),
+                        default='homework')
+    args = parser.parse_args()
+    try:
+        columns, strings = load(args.path)
+    except ImportError:
+        parser.exit(1, 'NumPy is needed for the analytics: '
+                       'pip install numpy\n')
+    results = analyze(columns, strings, by=args.by)
+    header = ['reviews', 'rejection_rate'] + [
+        f'{label}_p{percentile}' for label in ('review', 'turnaround')
+        for percentile in PERCENTILES
+    ]
+    print('\t'.join(['group'] + header))
+    for name, stats in results.items():
+        print('\t'.join([name or '-'] + [
+            f'{stats[key]:.3f}' if isinstance(stats[key], float)
+            else str(stats[key]) for key in header
+        ]))
+
+
+if __name__ == '__main__':
+    main()
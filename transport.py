@@ -0,0 +1,129 @@
+"""Shared keep-alive HTTP session for the Practicum API."""
+import os
+import random
+import threading
+from http import HTTPStatus
+from time import sleep
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from deadline import current as current_deadline
+from homework import logger
+
+
+API_CONNECT_TIMEOUT = float(os.getenv('API_CONNECT_TIMEOUT', 3.05))
+API_READ_TIMEOUT = float(os.getenv('API_READ_TIMEOUT', 10))
+API_RETRIES = int(os.getenv('API_RETRIES', 3))
+API_BACKOFF = float(os.getenv('API_BACKOFF', 0.5))
+API_BACKOFF_MAX = float(os.getenv('API_BACKOFF_MAX', 30))
+API_POOL_SIZE = int(os.getenv('API_POOL_SIZE', 10))
+
+RETRY_STATUSES = frozenset({
+    HTTPStatus.TOO_MANY_REQUESTS,
+    HTTPStatus.INTERNAL_SERVER_ERROR,
+    HTTPStatus.BAD_GATEWAY,
+    HTTPStatus.SERVICE_UNAVAILABLE,
+    HTTPStatus.GATEWAY_TIMEOUT,
+})
+TRANSIENT_ERRORS = (requests.ConnectionError, requests.Timeout)
+
+
+def _cut(timeout, deadline):
+    if deadline is None:
+        return timeout
+    if isinstance(timeout, tuple):
+        return tuple(deadline.timeout(limit) for limit in timeout)
+    return deadline.timeout(timeout)
+
+
+def _too_late(delay, deadline) -> bool:
+    return deadline is not None and delay >= deadline.remaining()
+
+
+class HttpTransport:
+    """Pooled session with timeouts and jittered exponential backoff.
+
+    Transient answers (5xx, 429) and connection errors are retried
+    `retries` times; the last response is returned as is, so status code
+    handling stays in `request_homeworks`.
+    """
+
+    def __init__(self, connect_timeout=API_CONNECT_TIMEOUT,
+                 read_timeout=API_READ_TIMEOUT, retries=API_RETRIES,
+                 backoff=API_BACKOFF, backoff_max=API_BACKOFF_MAX,
+                 pool_size=API_POOL_SIZE) -> None:
+        """Opens the session; `pool_size` bounds the kept-alive connections."""
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def backoff_delay(self, attempt, response=None) -> float:
+        """Full-jitter delay, or the server's Retry-After if it sent one."""
+        if response is not None:
+            retry_after = getattr(response, 'headers', {}).get('Retry-After')
+            if retry_after and retry_after.isdigit():
+                return min(float(retry_after), self.backoff_max)
+        return random.uniform(
+            0, min(self.backoff_max, self.backoff * 2 ** attempt)
+        )
+
+    def get(self, url, **kwargs):
+        """GET with retries on transient failures.
+
+        Inside a polling cycle every attempt and pause is cut down to the
+        time left in its `deadline`; a retry that would not fit is not
+        made.
+        """
+        timeout = kwargs.pop('timeout', self.timeout)
+        deadline = current_deadline()
+        attempt = 0
+        while True:
+            if deadline is not None:
+                deadline.check('fetch')
+            kwargs['timeout'] = _cut(timeout, deadline)
+            try:
+                response = self.session.get(url, **kwargs)
+            except TRANSIENT_ERRORS as error:
+                delay = self.backoff_delay(attempt)
+                if attempt >= self.retries or _too_late(delay, deadline):
+                    raise
+                logger.warning(f'{error!r}, retry in {delay:.2f} s')
+            else:
+                if response.status_code not in RETRY_STATUSES:
+                    return response
+                delay = self.backoff_delay(attempt, response)
+                if attempt >= self.retries or _too_late(delay, deadline):
+                    return response
+                if kwargs.get('stream'):
+                    # Иначе соединение не вернётся в пул
+                    response.close()
+                logger.warning(
+                    f'API answered {response.status_code}, '
+                    f'retry in {delay:.2f} s'
+                )
+            attempt += 1
+            sleep(delay)
+
+    def close(self) -> None:
+        """Closes the pooled connections."""
+        self.session.close()
+
+
+_transport = None
+_transport_lock = threading.Lock()
+
+
+def get_transport() -> HttpTransport:
+    """Process-wide transport, created on first use."""
+    global _transport
+    if _transport is None:
+        with _transport_lock:
+            if _transport is None:
+                _transport = HttpTransport()
+    return _transport